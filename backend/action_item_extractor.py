@@ -1,26 +1,16 @@
 # action_item_extractor.py
-import os
 import json
-from dotenv import load_dotenv
-from langchain_groq import ChatGroq
-from langchain_core.messages import HumanMessage
+from llm_provider import get_llm
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, timedelta
+from concurrency import gather_bounded, map_bounded
+from keywords import KEYWORD_MATCHER
+from email_normalizer import normalize_content
+from metrics import record_parse_failure
 
-# Load .env
-load_dotenv()
-
-# Initialize LLM for action item extraction
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
-    raise ValueError("GROQ_API_KEY environment variable not set")
-
-llm = ChatGroq(
-    model="openai/gpt-oss-120b",
-    temperature=0.3,  # Slightly higher for more creative suggestions
-    api_key=GROQ_API_KEY
-)
+# Shared LLM view for action item extraction
+llm = get_llm(temperature=0.3, module="action_items")  # Slightly higher for more creative suggestions
 
 # Pydantic models
 class ActionItem(BaseModel):
@@ -49,18 +39,7 @@ class ActionItemExtractionResponse(BaseModel):
     action_items: List[ActionItem]
     total_items: int
 
-def extract_action_items(subject: str, sender: str, content: str) -> List[ActionItem]:
-    """
-    Extract action items from email using AI.
-    
-    Looks for:
-    - Tasks (requests to do something)
-    - Deadlines (dates, time references)
-    - Requests (questions, asks)
-    - Ownership clues (who should do it)
-    """
-    
-    extraction_prompt = f"""You are an action item extraction AI. Analyze the following email and extract ALL action items.
+EXTRACTION_PROMPT = """You are an action item extraction AI. Analyze the following email and extract ALL action items.
 
 Email Subject: {subject}
 From: {sender}
@@ -100,67 +79,102 @@ Example output:
 ]
 
 Analyze the email now:"""
+
+def _parse_action_items(response_text: str) -> List[ActionItem]:
+    """
+    Parse the model's JSON array reply into ActionItem objects. Raises
+    ValueError on a malformed reply.
+    """
+    # Extract JSON from response
+    start_idx = response_text.find('[')
+    end_idx = response_text.rfind(']') + 1
     
     try:
-        response = llm.invoke([HumanMessage(content=extraction_prompt)])
-        response_text = response.content.strip()
-        
-        # Extract JSON from response
-        start_idx = response_text.find('[')
-        end_idx = response_text.rfind(']') + 1
-        
         if start_idx == -1 or end_idx == 0:
-            return []
-        
+            raise ValueError("No JSON array in the reply")
         json_str = response_text[start_idx:end_idx]
-        items_data = json.loads(json_str)
-        
-        # Convert to ActionItem objects
-        action_items = []
-        for idx, item in enumerate(items_data):
-            action_item = ActionItem(
-                id=idx + 1,
-                title=item.get('title', 'Untitled'),
-                description=item.get('description'),
-                due_date=item.get('due_date'),
-                priority=item.get('priority', 'medium').lower(),
-                suggested_assignee=item.get('suggested_assignee'),
-                confidence=float(item.get('confidence', 0.5)),
-                reasoning=item.get('reasoning', '')
-            )
-            action_items.append(action_item)
-        
-        return action_items
+        return _action_items_from_data(json.loads(json_str))
+    except (ValueError, TypeError, AttributeError) as e:
+        record_parse_failure("action_items")
+        raise ValueError(str(e)) from e
+
+def _action_items_from_data(items_data: List[dict]) -> List[ActionItem]:
+    """Convert parsed JSON objects into ActionItem objects."""
+    action_items = []
+    for idx, item in enumerate(items_data):
+        action_item = ActionItem(
+            id=idx + 1,
+            title=item.get('title', 'Untitled'),
+            description=item.get('description'),
+            due_date=item.get('due_date'),
+            priority=item.get('priority', 'medium').lower(),
+            suggested_assignee=item.get('suggested_assignee'),
+            confidence=float(item.get('confidence', 0.5)),
+            reasoning=item.get('reasoning', '')
+        )
+        action_items.append(action_item)
     
-    except json.JSONDecodeError as e:
+    return action_items
+
+def extract_action_items(subject: str, sender: str, content: str) -> List[ActionItem]:
+    """
+    Extract action items from email using AI.
+    
+    Looks for:
+    - Tasks (requests to do something)
+    - Deadlines (dates, time references)
+    - Requests (questions, asks)
+    - Ownership clues (who should do it)
+    """
+    content = normalize_content(content, "action_items")
+    extraction_prompt = EXTRACTION_PROMPT.format(
+        subject=subject, sender=sender, content=content
+    )
+    
+    try:
+        response = llm.invoke(extraction_prompt)
+        return _parse_action_items(response.content.strip())
+    
+    except ValueError as e:
         print(f"JSON parsing error: {str(e)}")
         return []
     except Exception as e:
         print(f"Error extracting action items: {str(e)}")
         return []
 
-def batch_extract_action_items(emails: List[dict]) -> dict:
+async def aextract_action_items(subject: str, sender: str, content: str) -> List[ActionItem]:
     """
-    Extract action items from multiple emails.
+    Async version of extract_action_items built on ainvoke.
+    """
+    try:
+        return await aextract_action_items_or_raise(subject, sender, content)
     
-    Returns:
-    {
-        "results": [ActionItemExtractionResponse],
-        "total_items": int,
-        "high_priority_count": int
-    }
+    except ValueError as e:
+        print(f"JSON parsing error: {str(e)}")
+        return []
+    except Exception as e:
+        print(f"Error extracting action items: {str(e)}")
+        return []
+
+async def aextract_action_items_or_raise(subject: str, sender: str, content: str) -> List[ActionItem]:
+    """
+    Like aextract_action_items, but an LLM error or a malformed reply is
+    raised instead of being returned as an empty list. Background jobs use
+    it so a failed email is not checkpointed as having no action items.
     """
+    content = normalize_content(content, "action_items")
+    extraction_prompt = EXTRACTION_PROMPT.format(
+        subject=subject, sender=sender, content=content
+    )
+    response = await llm.ainvoke(extraction_prompt)
+    return _parse_action_items(response.content.strip())
+
+def _summarize_batch(emails: List[dict], action_item_lists: List[List[ActionItem]]) -> dict:
     results = []
     total_items = 0
     high_priority_count = 0
     
-    for email in emails:
-        action_items = extract_action_items(
-            email.get('subject', ''),
-            email.get('sender', ''),
-            email.get('content', '')
-        )
-        
+    for email, action_items in zip(emails, action_item_lists):
         response = ActionItemExtractionResponse(
             email_id=email.get('id', 0),
             subject=email.get('subject', ''),
@@ -178,6 +192,54 @@ def batch_extract_action_items(emails: List[dict]) -> dict:
         "high_priority_count": high_priority_count
     }
 
+def batch_extract_action_items(
+    emails: List[dict],
+    max_concurrency: Optional[int] = None
+) -> dict:
+    """
+    Extract action items from multiple emails.
+    
+    Up to max_concurrency extractions run at once (LLM_MAX_CONCURRENCY by
+    default); results keep the order of the input emails.
+    
+    Returns:
+    {
+        "results": [ActionItemExtractionResponse],
+        "total_items": int,
+        "high_priority_count": int
+    }
+    """
+    action_item_lists = map_bounded(
+        lambda email: extract_action_items(
+            email.get('subject', ''),
+            email.get('sender', ''),
+            email.get('content', '')
+        ),
+        emails,
+        max_concurrency
+    )
+    
+    return _summarize_batch(emails, action_item_lists)
+
+async def abatch_extract_action_items(
+    emails: List[dict],
+    max_concurrency: Optional[int] = None
+) -> dict:
+    """
+    Async version of batch_extract_action_items.
+    """
+    action_item_lists = await gather_bounded(
+        lambda email: aextract_action_items(
+            email.get('subject', ''),
+            email.get('sender', ''),
+            email.get('content', '')
+        ),
+        emails,
+        max_concurrency
+    )
+    
+    return _summarize_batch(emails, action_item_lists)
+
 def suggest_due_date(text: str) -> Optional[str]:
     """
     Parse due date from text using simple heuristics.
@@ -221,15 +283,11 @@ def calculate_priority(text: str, due_date: Optional[str] = None) -> str:
     """
     Calculate priority based on keywords and urgency.
     """
-    text_lower = text.lower()
+    # One pass over the text for every keyword list (whole words only)
+    hits = KEYWORD_MATCHER.groups(text)
     
     # High priority indicators
-    high_priority_keywords = [
-        'urgent', 'asap', 'critical', 'emergency', 'immediately',
-        'important!!', 'crucial', 'blocking', 'stopped', 'down'
-    ]
-    
-    if any(keyword in text_lower for keyword in high_priority_keywords):
+    if hits.get('high_priority'):
         return 'high'
     
     # Check if due date is soon
@@ -245,8 +303,7 @@ def calculate_priority(text: str, due_date: Optional[str] = None) -> str:
             pass
     
     # Medium priority indicators
-    medium_keywords = ['important', 'needed', 'required', 'please', 'soon']
-    if any(keyword in text_lower for keyword in medium_keywords):
+    if hits.get('medium_priority'):
         return 'medium'
     
     return 'low'
@@ -0,0 +1,224 @@
+# action_item_store.py
+import os
+import time
+import sqlite3
+import threading
+from typing import List, Optional, Tuple
+from action_item_extractor import ActionItem
+
+ACTION_ITEM_DB_PATH = os.getenv("ACTION_ITEM_DB_PATH", "action_items.sqlite3")
+
+# Email ids are only unique within the mailbox or client that sent them;
+# requests that do not name a source share this one
+DEFAULT_SOURCE = "default"
+
+ACTION_ITEM_STATUSES = ["pending", "confirmed", "rejected"]
+ACTION_ITEM_PRIORITIES = ["high", "medium", "low"]
+
+_COLUMNS = [
+    "id", "source", "email_id", "email_subject", "title", "description", "due_date", "priority",
+    "suggested_assignee", "status", "confidence", "reasoning", "created_at", "updated_at"
+]
+
+class ActionItemStore:
+    """
+    SQLite table of extracted action items, indexed for the filtered views,
+    with aggregate counters kept in memory and adjusted on every write so
+    /action-items-stats never scans the table. Items belong to an email by
+    (source, email_id), so two sources may reuse the same email ids.
+    """
+
+    def __init__(self, db_path: str = ACTION_ITEM_DB_PATH):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS action_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source TEXT NOT NULL DEFAULT 'default',
+                email_id INTEGER,
+                email_subject TEXT,
+                title TEXT NOT NULL,
+                description TEXT,
+                due_date TEXT,
+                priority TEXT NOT NULL,
+                suggested_assignee TEXT,
+                status TEXT NOT NULL,
+                confidence REAL NOT NULL,
+                reasoning TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            """
+        )
+        # Tables created before items were scoped by source
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(action_items)")]
+        if "source" not in columns:
+            self._db.execute("ALTER TABLE action_items ADD COLUMN source TEXT NOT NULL DEFAULT 'default'")
+        self._db.executescript(
+            """
+            CREATE INDEX IF NOT EXISTS idx_action_items_status ON action_items (status);
+            CREATE INDEX IF NOT EXISTS idx_action_items_priority ON action_items (priority);
+            CREATE INDEX IF NOT EXISTS idx_action_items_assignee ON action_items (suggested_assignee);
+            CREATE INDEX IF NOT EXISTS idx_action_items_due_date ON action_items (due_date);
+            CREATE INDEX IF NOT EXISTS idx_action_items_email ON action_items (email_id, status);
+            CREATE INDEX IF NOT EXISTS idx_action_items_source_email ON action_items (source, email_id, status);
+            """
+        )
+        self._db.commit()
+        self._load_counters()
+
+    def _load_counters(self):
+        self._total = 0
+        self._confidence_sum = 0.0
+        self._by_priority = {priority: 0 for priority in ACTION_ITEM_PRIORITIES}
+        self._by_status = {status: 0 for status in ACTION_ITEM_STATUSES}
+        rows = self._db.execute(
+            "SELECT priority, status, COUNT(*), SUM(confidence) FROM action_items GROUP BY priority, status"
+        ).fetchall()
+        for priority, status, count, confidence_sum in rows:
+            self._count(priority, status, confidence_sum or 0.0, count)
+
+    def _count(self, priority: str, status: str, confidence: float, delta: int):
+        self._total += delta
+        self._confidence_sum += confidence if delta > 0 else -confidence
+        self._by_priority[priority] = self._by_priority.get(priority, 0) + delta
+        self._by_status[status] = self._by_status.get(status, 0) + delta
+
+    def save_items(
+        self,
+        email_id: Optional[int],
+        email_subject: str,
+        items: List[ActionItem],
+        source: str = DEFAULT_SOURCE
+    ) -> List[ActionItem]:
+        """
+        Store an email's extracted items and return them with their stored ids.
+
+        When email_id is set, the pending items stored earlier for the same
+        (source, email_id) are replaced, so re-extracting an email does not
+        duplicate them; confirmed and rejected items are kept.
+        """
+        now = time.time()
+        saved = []
+        with self._lock:
+            if email_id is not None:
+                old_rows = self._db.execute(
+                    "SELECT id, priority, status, confidence FROM action_items "
+                    "WHERE source = ? AND email_id = ? AND status = 'pending'",
+                    (source, email_id)
+                ).fetchall()
+                for item_id, priority, status, confidence in old_rows:
+                    self._count(priority, status, confidence, -1)
+                self._db.execute(
+                    "DELETE FROM action_items WHERE source = ? AND email_id = ? AND status = 'pending'",
+                    (source, email_id)
+                )
+
+            for item in items:
+                cursor = self._db.execute(
+                    "INSERT INTO action_items (source, email_id, email_subject, title, description, due_date, "
+                    "priority, suggested_assignee, status, confidence, reasoning, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        source, email_id, email_subject, item.title, item.description, item.due_date,
+                        item.priority, item.suggested_assignee, item.status, item.confidence,
+                        item.reasoning, now, now
+                    )
+                )
+                self._count(item.priority, item.status, item.confidence, 1)
+                saved.append(ActionItem(**{**item.model_dump(), "id": cursor.lastrowid}))
+            self._db.commit()
+        return saved
+
+    def update_status(self, item_id: int, status: str) -> Optional[dict]:
+        """Set an item's status (pending, confirmed or rejected); None if it does not exist."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT priority, status, confidence FROM action_items WHERE id = ?", (item_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            priority, old_status, confidence = row
+            if old_status != status:
+                self._db.execute(
+                    "UPDATE action_items SET status = ?, updated_at = ? WHERE id = ?",
+                    (status, time.time(), item_id)
+                )
+                self._db.commit()
+                self._count(priority, old_status, confidence, -1)
+                self._count(priority, status, confidence, 1)
+        return self.get_item(item_id)
+
+    def get_item(self, item_id: int) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM action_items WHERE id = ?", (item_id,)
+            ).fetchone()
+        return dict(zip(_COLUMNS, row)) if row is not None else None
+
+    def query(
+        self,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        assignee: Optional[str] = None,
+        email_id: Optional[int] = None,
+        due_after: Optional[str] = None,
+        due_before: Optional[str] = None,
+        source: Optional[str] = None,
+        cursor: Optional[int] = None,
+        limit: int = 100
+    ) -> Tuple[List[dict], int, Optional[int]]:
+        """
+        Filtered page of items, newest first, plus the number of matching
+        items and the cursor of the next page (None on the last page). Due
+        dates are compared as YYYY-MM-DD strings (inclusive).
+
+        Pages are keyed on the id of the last item returned instead of an
+        OFFSET, so deep pages cost the same as the first one.
+        """
+        conditions = []
+        params = []
+        for column, value in (
+            ("status", status),
+            ("priority", priority),
+            ("suggested_assignee", assignee),
+            ("source", source),
+            ("email_id", email_id)
+        ):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if due_after is not None:
+            conditions.append("due_date >= ?")
+            params.append(due_after)
+        if due_before is not None:
+            conditions.append("due_date <= ?")
+            params.append(due_before)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        page_conditions = conditions + (["id < ?"] if cursor is not None else [])
+        page_where = f" WHERE {' AND '.join(page_conditions)}" if page_conditions else ""
+        page_params = params + ([cursor] if cursor is not None else [])
+
+        with self._lock:
+            total = self._db.execute(
+                f"SELECT COUNT(*) FROM action_items{where}", params
+            ).fetchone()[0]
+            rows = self._db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM action_items{page_where} ORDER BY id DESC LIMIT ?",
+                page_params + [limit]
+            ).fetchall()
+        items = [dict(zip(_COLUMNS, row)) for row in rows]
+        next_cursor = items[-1]["id"] if len(items) == limit else None
+        return items, total, next_cursor
+
+    def stats(self) -> dict:
+        """Aggregate counts, read from the in-memory counters."""
+        with self._lock:
+            return {
+                "total_action_items": self._total,
+                "by_priority": dict(self._by_priority),
+                "by_status": dict(self._by_status),
+                "average_confidence": self._confidence_sum / self._total if self._total else 0.0
+            }
@@ -1,26 +1,90 @@
 # app.py
 import os
-from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+import json
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware  # Add this line
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
 from pydantic import BaseModel
-from langchain_groq import ChatGroq
-from langchain_core.messages import HumanMessage
-from email_classifier import classify_email, get_inbox_statistics
-from action_item_extractor import extract_action_items, batch_extract_action_items
-from draft_reply_generator import generate_draft_reply, generate_all_tone_variants, refine_draft
+import llm_provider
+from thread_summarizer import asummarize_thread, astream_summary, stream_timings, summary_mode_stats
+from email_classifier import (
+    CLASSIFICATION_PROMPT_VERSION,
+    aclassify_email,
+    aclassify_emails,
+    aclassify_emails_packed,
+    classification_index,
+    get_inbox_statistics
+)
+from action_item_extractor import aextract_action_items, aextract_action_items_or_raise, abatch_extract_action_items
+from email_priority_detector import (
+    PriorityDetectionRequest,
+    adetect_email_priority,
+    abatch_detect_priorities,
+    afilter_by_priority,
+    aget_priority_recommendations,
+    priority_index,
+    priority_memo
+)
+from email_analyzer import EmailAnalysisRequest, aanalyze_email, abatch_analyze_emails
+from draft_reply_generator import agenerate_draft_reply, agenerate_all_tone_variants, arefine_draft, draft_cache
+from concurrency import gather_bounded, iter_bounded
+from response_cache import response_cache
+from fast_tier import tier_stats
+from llm_scheduler import scheduler
+from singleflight import llm_singleflight
+from email_normalizer import normalization_stats, normalize_with_report
+from metrics import CONTENT_TYPE, HTTP_IN_FLIGHT, HTTP_LATENCY, HTTP_REQUESTS, registry
+from job_queue import JOB_DB_PATH, JobQueue, JobStore
+from classification_store import CLASSIFICATION_DB_PATH, ClassificationStore
+from action_item_store import ACTION_ITEM_DB_PATH, ACTION_ITEM_STATUSES, DEFAULT_SOURCE, ActionItemStore
 from typing import List, Optional
 
-# Load .env
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Background worker pool for large batches, created on startup
+job_queue: Optional[JobQueue] = None
+
+# Stored categories behind /classification-stats, created on startup; the
+# seed task classifies threads that are new or changed since the last run
+classification_store: Optional[ClassificationStore] = None
+classification_seed: Optional[asyncio.Task] = None
 
-# Read API key
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
-    raise ValueError("GROQ_API_KEY environment variable not set")
+# Every extracted action item, created on startup
+action_item_store: Optional[ActionItemStore] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global job_queue, classification_store, classification_seed, action_item_store
+    # Fail fast on a missing key without importing the LLM stack
+    llm_provider.get_api_key()
+    # Optionally build the HTTP pool before the first request instead of on it
+    if os.getenv("LLM_EAGER_INIT", "0") == "1":
+        await run_in_threadpool(llm_provider.warm_up)
+    action_item_store = ActionItemStore(ACTION_ITEM_DB_PATH)
+    # Resumes any job a previous worker left unfinished
+    job_queue = JobQueue(JobStore(JOB_DB_PATH), {"action_items": _action_items_job})
+    await job_queue.start()
+    classification_store = ClassificationStore(CLASSIFICATION_PROMPT_VERSION, CLASSIFICATION_DB_PATH)
+    # Classifies new or changed threads in the background. Benchmarks and
+    # test clients set CLASSIFICATION_SEED_ON_STARTUP=0 so that starting the
+    # app never calls the model
+    classification_seed = None
+    if os.getenv("CLASSIFICATION_SEED_ON_STARTUP", "1") == "1":
+        classification_seed = asyncio.create_task(_seed_thread_classifications())
+    yield
+    if classification_seed is not None:
+        classification_seed.cancel()
+    await job_queue.stop()
+    await llm_provider.aclose()
 
 # Initialize FastAPI app
-app = FastAPI(title="Email Thread Summarizer")
+app = FastAPI(title="Email Thread Summarizer", lifespan=lifespan)
 
 
 # Allow frontend to access backend
@@ -36,13 +100,83 @@ app.add_middleware(
     allow_methods=["*"],     # allow POST, GET, OPTIONS, etc.
     allow_headers=["*"],
 )
-# Initialize LLM
-llm = ChatGroq(
-    model="openai/gpt-oss-120b",
-    temperature=1,
-    api_key=GROQ_API_KEY
-)
 
+def _route_label(request: Request) -> str:
+    """The matched route's path template, so /action-items/{item_id} is one series."""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+@app.middleware("http")
+async def record_http_metrics(request: Request, call_next):
+    route = _route_label(request)
+    HTTP_IN_FLIGHT.inc(route=route)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_LATENCY.observe(time.perf_counter() - start, route=route, method=request.method)
+        HTTP_REQUESTS.inc(route=route, method=request.method, status=str(status))
+        HTTP_IN_FLIGHT.dec(route=route)
+
+def _collect_stats_metrics() -> list:
+    """Expose the existing /*-stats counters as metrics, read at scrape time."""
+    cache_hits = []
+    cache_misses = []
+    for cache_name, cache in (
+        ("response", response_cache), ("priority_memo", priority_memo), ("draft", draft_cache)
+    ):
+        stats = cache.stats()
+        cache_hits.append(({"cache": cache_name, "layer": "memory"}, stats["memory_hits"]))
+        cache_hits.append(({"cache": cache_name, "layer": "disk"}, stats["disk_hits"]))
+        cache_misses.append(({"cache": cache_name}, stats["misses"]))
+
+    tiers = [
+        ({"analyzer": analyzer, "tier": tier}, count)
+        for analyzer, counters in tier_stats().items()
+        for tier, count in counters.items()
+        if tier not in ("total", "skipped_network_fraction")
+    ]
+
+    scheduler_stats = scheduler.stats()
+    coalescing = llm_singleflight.stats()
+    normalization = normalization_stats()
+    summary_modes = [({"mode": mode}, count) for mode, count in summary_mode_stats().items()]
+    tokens_saved = [
+        ({"analyzer": analyzer}, counters["tokens_saved"])
+        for analyzer, counters in normalization.items()
+        if analyzer != "enabled"
+    ]
+
+    return [
+        ("cache_hits_total", "counter", "Response cache hits by cache and layer.", cache_hits),
+        ("cache_misses_total", "counter", "Response cache misses by cache.", cache_misses),
+        ("analyzer_tier_answers_total", "counter",
+         "Answers by analyzer and the tier that produced them (rules, cache, near_duplicate, local, llm).",
+         tiers),
+        ("llm_scheduler_concurrency_limit", "gauge", "Current adaptive LLM concurrency limit.",
+         [({}, scheduler_stats["concurrency_limit"])]),
+        ("llm_scheduler_waiting", "gauge", "LLM calls waiting for a concurrency slot or rate budget.",
+         [({}, scheduler_stats["waiting"])]),
+        ("llm_scheduler_retries_total", "counter", "LLM calls retried after a throttle or server error.",
+         [({}, scheduler_stats["retries"])]),
+        ("llm_scheduler_throttled_total", "counter", "LLM calls the provider rejected with 429.",
+         [({}, scheduler_stats["throttled"])]),
+        ("llm_coalesced_calls_total", "counter", "Identical concurrent LLM calls served by an in-flight call.",
+         [({}, coalescing["coalesced_calls"])]),
+        ("email_normalization_tokens_saved_total", "counter",
+         "Estimated prompt tokens removed by email normalization, by analyzer.", tokens_saved),
+        ("thread_summaries_total", "counter",
+         "Thread summaries by how they were served (cached, incremental, full) and how many were map-reduced.",
+         summary_modes),
+    ]
+
+registry.register_collector(_collect_stats_metrics)
 DUMMY_THREADS = [
     {
         "id": 1,
@@ -189,6 +323,9 @@ class EmailForClassification(BaseModel):
 
 class ClassifyEmailsRequest(BaseModel):
     emails: List[EmailForClassification]
+    max_concurrency: Optional[int] = None  # Defaults to LLM_MAX_CONCURRENCY
+    packed: bool = False  # Classify several emails per prompt
+    stream: bool = False  # Respond with NDJSON lines as emails finish
 
 class ClassificationResult(BaseModel):
     id: int
@@ -209,22 +346,49 @@ async def summarize_thread(request: EmailThreadRequest):
     if not request.thread_content.strip():
         raise HTTPException(status_code=400, detail="Email thread cannot be empty")
     
-    prompt = f"""
-Summarize the following email thread at the top level:
-- Highlight Decisions
-- Highlight Action Items
-- Highlight Open Questions
-
-Email Thread:
-{request.thread_content}
-"""
-    
     try:
-        response = llm.invoke([HumanMessage(content=prompt)])
-        return {"summary": response.content}
+        summary = await asummarize_thread(request.thread_content)
+        return {"summary": summary}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/summarize-thread/stream")
+async def summarize_thread_stream(request: EmailThreadRequest):
+    """
+    Stream the thread summary as server-sent events while it is generated.
+    
+    Events:
+        event: token  data: {"text": "..."}
+        event: done   data: {"ttft_ms": ..., "total_ms": ...}
+        event: error  data: {"detail": "..."}
+    """
+    if not request.thread_content.strip():
+        raise HTTPException(status_code=400, detail="Email thread cannot be empty")
+    
+    async def event_stream():
+        try:
+            async for event in astream_summary(request.thread_content):
+                event_type = event.pop("type")
+                yield f"event: {event_type}\ndata: {json.dumps(event)}\n\n"
+        except Exception as e:
+            logger.exception("Error in summarize_thread_stream")
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/summarize-thread/stream-stats")
+async def get_summary_stream_stats():
+    """
+    Get time-to-first-token and total duration percentiles for streamed
+    summaries, plus how all summary requests were served (modes: cached,
+    incremental or full, and how many of them needed map-reduce).
+    """
+    return {**stream_timings.stats(), "modes": summary_mode_stats()}
+
 
 @app.get("/threads")
 async def get_threads():
@@ -238,39 +402,130 @@ async def classify_single_email(request: EmailForClassification):
     Classify a single email into Support, Sales, Billing, Urgent, or FYI.
     """
     try:
-        result = classify_email(request.subject, request.sender, request.content)
+        result = await aclassify_email(request.subject, request.sender, request.content, request.id)
+        await _record_classifications("inbox", [request], [result])
         return {
             "email_id": request.id,
             "category": result.category,
             "confidence": result.confidence,
-            "reasoning": result.reasoning
+            "reasoning": result.reasoning,
+            "tier": result.tier,
+            "reused_from": result.reused_from
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _record_classifications(source: str, emails: list, results: list):
+    """
+    Store classification results so the stats endpoint stays current.
+    """
+    if classification_store is None:
+        return
+    entries = []
+    for email, result in zip(emails, results):
+        # Failed classifications report zero confidence; leave them out so
+        # they are retried instead of being counted as FYI
+        if result.confidence <= 0:
+            continue
+        entries.append({
+            "email_key": str(email.id),
+            "subject": email.subject,
+            "sender": email.sender,
+            "content": email.content,
+            "category": result.category,
+            "confidence": result.confidence,
+            "tier": result.tier
+        })
+    if entries:
+        await run_in_threadpool(classification_store.record_many, source, entries)
+
+def _empty_classification_stats() -> dict:
+    return {
+        "total_emails": 0,
+        "support": 0,
+        "sales": 0,
+        "billing": 0,
+        "urgent": 0,
+        "fyi": 0
+    }
+
+async def _stream_classifications(request: ClassifyEmailsRequest):
+    """
+    Yield one NDJSON line per email as soon as its classification finishes,
+    then a final stats line. Only the counters are kept in memory.
+    """
+    stats = _empty_classification_stats()
+    try:
+        async for idx, classification_result in iter_bounded(
+            lambda email: aclassify_email(email.subject, email.sender, email.content, email.id),
+            request.emails,
+            request.max_concurrency
+        ):
+            email = request.emails[idx]
+            await _record_classifications("inbox", [email], [classification_result])
+            stats["total_emails"] += 1
+            category_key = classification_result.category.lower()
+            if category_key in stats:
+                stats[category_key] += 1
+            yield json.dumps({
+                "type": "result",
+                "id": email.id,
+                "subject": email.subject,
+                "sender": email.sender,
+                "content": email.content,
+                "timestamp": email.timestamp,
+                "category": classification_result.category,
+                "tier": classification_result.tier,
+                "reused_from": classification_result.reused_from
+            }) + "\n"
+        
+        yield json.dumps({"type": "stats", "stats": stats}) + "\n"
+    except Exception as e:
+        logger.exception("Error in _stream_classifications")
+        yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+
 @app.post("/classify-emails")
 async def classify_multiple_emails(request: ClassifyEmailsRequest):
     """
     Classify multiple emails and return classified emails with statistics.
+    
+    With stream=true the response is NDJSON: one {"type": "result", ...}
+    line per email in completion order, then a {"type": "stats", ...} line.
+    Streaming classifies emails individually, so packed is ignored.
     """
+    if request.stream:
+        return StreamingResponse(
+            _stream_classifications(request),
+            media_type="application/x-ndjson"
+        )
+    
     try:
-        classified_emails = []
-        
-        for email in request.emails:
-            classification_result = classify_email(
-                email.subject, 
-                email.sender, 
-                email.content
+        if request.packed:
+            classification_results = await aclassify_emails_packed(
+                [email.model_dump() for email in request.emails],
+                max_concurrency=request.max_concurrency
             )
-            
-            classified_emails.append({
+        else:
+            classification_results = await aclassify_emails(
+                [email.model_dump() for email in request.emails],
+                request.max_concurrency
+            )
+        
+        await _record_classifications("inbox", request.emails, classification_results)
+        
+        classified_emails = [
+            {
                 "id": email.id,
                 "subject": email.subject,
                 "sender": email.sender,
                 "content": email.content,
                 "timestamp": email.timestamp,
-                "category": classification_result.category
-            })
+                "category": classification_result.category,
+                "tier": classification_result.tier,
+                "reused_from": classification_result.reused_from
+            }
+            for email, classification_result in zip(request.emails, classification_results)
+        ]
         
         # Calculate statistics
         stats = {
@@ -289,39 +544,126 @@ async def classify_multiple_emails(request: ClassifyEmailsRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _thread_email(thread: dict) -> EmailForClassification:
+    return EmailForClassification(
+        id=thread["id"],
+        subject=thread.get("subject", ""),
+        sender=thread.get("sender", "Unknown"),
+        content=thread.get("content", ""),
+        timestamp=thread.get("timestamp", "")
+    )
+
+async def _seed_thread_classifications():
+    """
+    Classify the threads that have no stored category for their current
+    content and prompt version, and drop stored threads that no longer
+    exist. Unchanged threads cost nothing.
+    """
+    try:
+        emails = [_thread_email(thread) for thread in DUMMY_THREADS]
+        stale = [
+            email for email in emails
+            if classification_store.lookup(
+                "threads", str(email.id), email.subject, email.sender, email.content
+            ) is None
+        ]
+        if stale:
+            logger.info("Classifying %d new or changed threads", len(stale))
+            results = await gather_bounded(
+                lambda email: aclassify_email(email.subject, email.sender, email.content, email.id),
+                stale
+            )
+            await _record_classifications("threads", stale, results)
+        classification_store.prune("threads", [str(email.id) for email in emails])
+    except Exception as e:
+        logger.exception("Error in _seed_thread_classifications")
+
 @app.get("/classification-stats")
-async def get_classification_stats():
+async def get_classification_stats(source: str = "threads"):
     """
     Get classification statistics for the current threads.
+    
+    Counts are read from the classification store, which is updated as
+    emails are classified, so this does not call the model. Pass
+    source=inbox for the emails classified through /classify-email(s).
     """
+    if classification_store is None:
+        raise HTTPException(status_code=503, detail="Classification store not initialized")
     try:
-        stats = {
-            "total_emails": len(DUMMY_THREADS),
-            "support": 0,
-            "sales": 0,
-            "billing": 0,
-            "urgent": 0,
-            "fyi": 0
-        }
-        
-        for thread in DUMMY_THREADS:
-            classification_result = classify_email(
-                thread.get("subject", ""),
-                thread.get("sender", "Unknown"),
-                thread.get("content", "")
-            )
-            
-            category = classification_result.category.lower()
-            if category in stats:
-                stats[category] += 1
-        
-        return stats
+        if source == "threads" and classification_seed is not None and not classification_seed.done():
+            # Only the first requests after startup wait for the seed
+            await asyncio.shield(classification_seed)
+        return classification_store.stats(source)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # ============= ACTION ITEM EXTRACTION ENDPOINTS =============
 
+def _action_item_dict(item) -> dict:
+    return {
+        "id": item.id,
+        "title": item.title,
+        "description": item.description,
+        "due_date": item.due_date,
+        "priority": item.priority,
+        "suggested_assignee": item.suggested_assignee,
+        "confidence": item.confidence,
+        "reasoning": item.reasoning,
+        "status": item.status
+    }
+
+def _email_source(email: dict, default: Optional[str] = None) -> str:
+    """Mailbox or client an email id belongs to: the email's own "source", else the request's."""
+    return email.get('source') or default or DEFAULT_SOURCE
+
+async def _store_action_items(email_id: Optional[int], subject: str, action_items: list, source: str) -> list:
+    """Persist an email's extracted items; the returned items carry their stored ids."""
+    if action_item_store is None:
+        return action_items
+    return await run_in_threadpool(action_item_store.save_items, email_id, subject, action_items, source)
+
+async def _stream_action_items(emails: List[dict], max_concurrency: Optional[int], source: Optional[str]):
+    """
+    Yield one NDJSON line per email as soon as its extraction finishes,
+    then a final stats line. Only the counters are kept in memory.
+    """
+    total_items = 0
+    high_priority_count = 0
+    try:
+        async for idx, action_items in iter_bounded(
+            lambda email: aextract_action_items(
+                email.get('subject', ''),
+                email.get('sender', ''),
+                email.get('content', '')
+            ),
+            emails,
+            max_concurrency
+        ):
+            email = emails[idx]
+            action_items = await _store_action_items(
+                email.get('id'), email.get('subject', ''), action_items, _email_source(email, source)
+            )
+            total_items += len(action_items)
+            high_priority_count += sum(1 for item in action_items if item.priority == 'high')
+            yield json.dumps({
+                "type": "result",
+                "email_id": email.get('id', 0),
+                "subject": email.get('subject', ''),
+                "action_items": [_action_item_dict(item) for item in action_items],
+                "total_items": len(action_items)
+            }) + "\n"
+        
+        yield json.dumps({
+            "type": "stats",
+            "total_emails": len(emails),
+            "total_items": total_items,
+            "high_priority_count": high_priority_count
+        }) + "\n"
+    except Exception as e:
+        logger.exception("Error in _stream_action_items")
+        yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+
 @app.post("/extract-action-items")
 async def extract_actions_from_email(request: dict):
     """
@@ -329,7 +671,8 @@ async def extract_actions_from_email(request: dict):
     
     Identifies tasks, deadlines, requests, and ownership clues.
     AI suggests: task title, due date, priority, suggested assignee.
-    User confirms extraction.
+    User confirms extraction. Stored items are keyed by (source, email_id);
+    pass "source" to keep email ids from different mailboxes apart.
     """
     try:
         email_id = request.get('email_id', 0)
@@ -337,23 +680,14 @@ async def extract_actions_from_email(request: dict):
         sender = request.get('sender', '')
         content = request.get('content', '')
         
-        action_items = extract_action_items(subject, sender, content)
+        action_items = await aextract_action_items(subject, sender, content)
+        action_items = await _store_action_items(request.get('email_id'), subject, action_items, _email_source(request))
         
         return {
             "email_id": email_id,
             "subject": subject,
             "action_items": [
-                {
-                    "id": item.id,
-                    "title": item.title,
-                    "description": item.description,
-                    "due_date": item.due_date,
-                    "priority": item.priority,
-                    "suggested_assignee": item.suggested_assignee,
-                    "confidence": item.confidence,
-                    "reasoning": item.reasoning,
-                    "status": item.status
-                }
+                _action_item_dict(item)
                 for item in action_items
             ],
             "total_items": len(action_items)
@@ -366,34 +700,35 @@ async def extract_actions_batch(request: dict):
     """
     Extract action items from multiple emails.
     
-    Returns all extracted action items with statistics.
+    Returns all extracted action items with statistics. With "stream": true
+    the response is NDJSON: one {"type": "result", ...} line per email in
+    completion order, then a {"type": "stats", ...} line.
     """
     try:
         emails = request.get('emails', [])
-        print(f"DEBUG: Received {len(emails)} emails for batch processing")
+        logger.debug("Received %d emails for batch processing", len(emails))
         
-        result = batch_extract_action_items(emails)
-        print(f"DEBUG: Batch processing completed, got {result['total_items']} total items")
+        if request.get('stream'):
+            return StreamingResponse(
+                _stream_action_items(emails, request.get('max_concurrency'), request.get('source')),
+                media_type="application/x-ndjson"
+            )
+        
+        result = await abatch_extract_action_items(emails, request.get('max_concurrency'))
+        logger.debug("Batch processing completed, got %d total items", result['total_items'])
         
         # Convert response objects to dicts for JSON serialization
         results_dicts = []
-        for res in result['results']:
+        for email, res in zip(emails, result['results']):
+            action_items = await _store_action_items(
+                email.get('id'), res.subject, res.action_items, _email_source(email, request.get('source'))
+            )
             results_dicts.append({
                 "email_id": res.email_id,
                 "subject": res.subject,
                 "action_items": [
-                    {
-                        "id": item.id,
-                        "title": item.title,
-                        "description": item.description,
-                        "due_date": item.due_date,
-                        "priority": item.priority,
-                        "suggested_assignee": item.suggested_assignee,
-                        "confidence": item.confidence,
-                        "reasoning": item.reasoning,
-                        "status": item.status
-                    }
-                    for item in res.action_items
+                    _action_item_dict(item)
+                    for item in action_items
                 ],
                 "total_items": res.total_items
             })
@@ -409,31 +744,327 @@ async def extract_actions_batch(request: dict):
         print(f"ERROR in extract_actions_batch: {error_detail}")
         raise HTTPException(status_code=500, detail=error_detail)
 
+# ============= PRIORITY DETECTION ENDPOINTS =============
+
+@app.post("/detect-priority")
+async def detect_priority(request: PriorityDetectionRequest):
+    """
+    Detect the priority level (high/medium/low) of a single email.
+    """
+    try:
+        result = await adetect_email_priority(
+            request.subject,
+            request.sender,
+            request.content,
+            request.sender_history
+        )
+        return result.model_dump()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/detect-priorities-batch")
+async def detect_priorities_batch(request: dict):
+    """
+    Detect priorities for multiple emails.
+    
+    Request body:
+    {
+        "emails": [{"id": 1, "subject": "...", "sender": "...", "content": "...", "sender_history": null}],
+        "max_concurrency": 8,
+        "packed": false
+    }
+    
+    Results are memoized per email, so repeated calls over the same inbox
+    (and the filter/recommendation endpoints) do not re-run the model.
+    """
+    try:
+        result = await abatch_detect_priorities(
+            request.get('emails', []),
+            request.get('max_concurrency'),
+            request.get('packed', False)
+        )
+        return {
+            "results": [analysis.model_dump() for analysis in result['results']],
+            "stats": result['stats']
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/filter-by-priority")
+async def filter_emails_by_priority(request: dict):
+    """
+    Get the analyses of emails with the requested priority level.
+    
+    Request body:
+    {
+        "emails": [...],
+        "priority_level": "high|medium|low"
+    }
+    """
+    try:
+        priority_level = request.get('priority_level', 'high')
+        results = await afilter_by_priority(
+            request.get('emails', []),
+            priority_level,
+            request.get('max_concurrency')
+        )
+        return {
+            "priority_level": priority_level.lower(),
+            "results": [analysis.model_dump() for analysis in results],
+            "count": len(results)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/priority-recommendations")
+async def get_priority_recommendations_endpoint(request: dict):
+    """
+    Get high-priority emails sorted by urgency score, with recommendations.
+    
+    Request body:
+    {
+        "emails": [...]
+    }
+    """
+    try:
+        result = await aget_priority_recommendations(
+            request.get('emails', []),
+            request.get('max_concurrency')
+        )
+        return {
+            **result,
+            "high_priority_emails": [analysis.model_dump() for analysis in result['high_priority_emails']]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ============= COMBINED ANALYSIS ENDPOINTS =============
+
+class AnalyzeEmailsRequest(BaseModel):
+    emails: List[dict]
+    max_concurrency: Optional[int] = None  # Defaults to LLM_MAX_CONCURRENCY
+
+@app.post("/analyze-email")
+async def analyze_single_email(request: EmailAnalysisRequest):
+    """
+    Classify an email, detect its priority and extract its action items
+    with one LLM call instead of three.
+    """
+    try:
+        result = await aanalyze_email(
+            request.subject,
+            request.sender,
+            request.content,
+            request.sender_history,
+            request.email_id
+        )
+        return result.model_dump()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/analyze-emails")
+async def analyze_multiple_emails(request: AnalyzeEmailsRequest):
+    """
+    Run the combined analysis over multiple emails (one LLM call each).
+    
+    Returns the per-email analyses in input order plus category, priority
+    and action item counts.
+    """
+    try:
+        results = await abatch_analyze_emails(request.emails, request.max_concurrency)
+        
+        stats = _empty_classification_stats()
+        stats["total_emails"] = len(results)
+        priority_counts = {"high": 0, "medium": 0, "low": 0}
+        total_action_items = 0
+        for result in results:
+            category = result.classification.category.lower()
+            if category in stats:
+                stats[category] += 1
+            if result.priority.priority_level in priority_counts:
+                priority_counts[result.priority.priority_level] += 1
+            total_action_items += len(result.action_items)
+        
+        return {
+            "results": [result.model_dump() for result in results],
+            "stats": {
+                **stats,
+                "priority_counts": priority_counts,
+                "total_action_items": total_action_items
+            }
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ============= BACKGROUND JOB ENDPOINTS =============
+
+async def _action_items_job(email: dict) -> list:
+    """
+    Job handler: extract one email's action items as plain dicts. LLM and
+    parse errors propagate, so the email is not checkpointed as done.
+    """
+    action_items = await aextract_action_items_or_raise(
+        email.get('subject', ''),
+        email.get('sender', ''),
+        email.get('content', '')
+    )
+    action_items = await _store_action_items(
+        email.get('id'), email.get('subject', ''), action_items, _email_source(email)
+    )
+    return [_action_item_dict(item) for item in action_items]
+
+def _get_job_or_404(job_id: str) -> dict:
+    job = job_queue.store.get_job(job_id) if job_queue else None
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.post("/jobs/action-items")
+async def submit_action_items_job(request: dict):
+    """
+    Queue action item extraction for a large batch of emails.
+    
+    Returns a job id immediately; poll GET /jobs/{job_id} for progress and
+    fetch GET /jobs/{job_id}/results when it completes. Finished emails are
+    checkpointed, so a restarted server resumes the job where it stopped.
+    """
+    emails = request.get('emails', [])
+    if not emails:
+        raise HTTPException(status_code=400, detail="No emails to process")
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="Job queue is not running")
+    
+    # The source is stored with each email, so a resumed job still has it
+    job_id = await job_queue.submit(
+        "action_items",
+        [{**email, "source": _email_source(email, request.get('source'))} for email in emails]
+    )
+    return {"job_id": job_id, "status": "queued", "total": len(emails)}
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """
+    Get a job's status (queued, running, completed, failed) and progress.
+    """
+    return _get_job_or_404(job_id)
+
+@app.post("/jobs/{job_id}/resume")
+async def resume_job(job_id: str):
+    """
+    Run a failed job again. Emails that already finished keep their results;
+    only the ones that failed are processed.
+    """
+    _get_job_or_404(job_id)
+    try:
+        await job_queue.resume(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return _get_job_or_404(job_id)
+
+@app.get("/jobs/{job_id}/results")
+async def get_job_results(job_id: str, offset: int = 0, limit: int = 100):
+    """
+    Get the finished emails of a job in input order, one page at a time.
+    Counts under "page" cover only the returned emails.
+    """
+    job = _get_job_or_404(job_id)
+    rows = await run_in_threadpool(job_queue.store.results, job_id, offset, limit)
+    
+    results = [
+        {
+            "email_id": email.get('id', 0),
+            "subject": email.get('subject', ''),
+            "action_items": action_items,
+            "total_items": len(action_items)
+        }
+        for email, action_items in rows
+    ]
+    
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        "completed": job["completed"],
+        "total": job["total"],
+        "results": results,
+        "page": {
+            "offset": offset,
+            "limit": limit,
+            "returned": len(results),
+            "total_items": sum(r["total_items"] for r in results),
+            "high_priority_count": sum(
+                1 for r in results for item in r["action_items"] if item["priority"] == 'high'
+            )
+        }
+    }
+
+def _get_action_item_store() -> ActionItemStore:
+    if action_item_store is None:
+        raise HTTPException(status_code=503, detail="Action item store not initialized")
+    return action_item_store
+
 @app.get("/action-items-stats")
 async def get_action_items_stats():
     """
     Get statistics about action items across all emails.
+    
+    Served from counters the action item store keeps up to date, so the
+    cost does not grow with the number of stored items.
+    """
+    return _get_action_item_store().stats()
+
+@app.get("/action-items")
+async def list_action_items(
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    assignee: Optional[str] = None,
+    email_id: Optional[int] = None,
+    due_after: Optional[str] = None,
+    due_before: Optional[str] = None,
+    source: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = 100
+):
+    """
+    Query stored action items, newest first, one page at a time.
+    
+    Filters are optional and combined; due_after/due_before take
+    YYYY-MM-DD dates and are inclusive. Pass the returned next_cursor as
+    cursor to fetch the following page; it is null on the last page.
     """
+    store = _get_action_item_store()
+    limit = max(1, min(limit, 1000))
     try:
-        # This would connect to a database in production
-        # For now, return template structure
+        items, total, next_cursor = await run_in_threadpool(
+            store.query, status, priority, assignee, email_id, due_after, due_before, source, cursor, limit
+        )
         return {
-            "total_action_items": 0,
-            "by_priority": {
-                "high": 0,
-                "medium": 0,
-                "low": 0
-            },
-            "by_status": {
-                "pending": 0,
-                "confirmed": 0,
-                "rejected": 0
-            },
-            "average_confidence": 0.0
+            "items": items,
+            "total": total,
+            "limit": limit,
+            "next_cursor": next_cursor
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.patch("/action-items/{item_id}")
+async def update_action_item_status(item_id: int, request: dict):
+    """
+    Confirm or reject an extracted action item.
+    
+    Request body:
+    {
+        "status": "pending|confirmed|rejected"
+    }
+    """
+    store = _get_action_item_store()
+    status = request.get('status')
+    if status not in ACTION_ITEM_STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of {ACTION_ITEM_STATUSES}")
+    item = await run_in_threadpool(store.update_status, item_id, status)
+    if item is None:
+        raise HTTPException(status_code=404, detail=f"Action item {item_id} not found")
+    return item
+
 # ============= DRAFT REPLY GENERATION ENDPOINTS =============
 
 @app.post("/draft-reply")
@@ -449,6 +1080,9 @@ async def draft_email_reply(request: dict):
         "tone": "professional|friendly|short|apologetic",
         "context": "Optional organization context"
     }
+    
+    Drafts are cached per (thread, tone), including those produced by
+    /draft-reply-all-tones, so switching tones is served from the cache.
     """
     try:
         original_subject = request.get('original_subject', 'Re: Email')
@@ -457,9 +1091,9 @@ async def draft_email_reply(request: dict):
         tone = request.get('tone', 'professional')
         context = request.get('context')
         
-        print(f"DEBUG: Generating draft reply with tone: {tone}")
+        logger.debug("Generating draft reply with tone: %s", tone)
         
-        draft = generate_draft_reply(
+        draft = await agenerate_draft_reply(
             original_subject,
             original_sender,
             thread_content,
@@ -472,7 +1106,8 @@ async def draft_email_reply(request: dict):
             "subject": draft.subject,
             "body": draft.body,
             "preview": draft.preview,
-            "timestamp": draft.timestamp
+            "timestamp": draft.timestamp,
+            "tier": draft.tier
         }
     except Exception as e:
         import traceback
@@ -490,8 +1125,12 @@ async def draft_email_all_tones(request: dict):
         "original_subject": "Subject of email",
         "original_sender": "sender@email.com",
         "thread_content": "Full email thread",
-        "context": "Optional organization context"
+        "context": "Optional organization context",
+        "single_call": true
     }
+    
+    With single_call (the default) all tones are requested in one LLM
+    call, falling back to one call per tone if the reply cannot be parsed.
     """
     try:
         original_subject = request.get('original_subject', 'Re: Email')
@@ -499,13 +1138,14 @@ async def draft_email_all_tones(request: dict):
         thread_content = request.get('thread_content', '')
         context = request.get('context')
         
-        print(f"DEBUG: Generating draft replies for all tones")
+        logger.debug("Generating draft replies for all tones")
         
-        result = generate_all_tone_variants(
+        result = await agenerate_all_tone_variants(
             original_subject,
             original_sender,
             thread_content,
-            context
+            context,
+            request.get('single_call', True)
         )
         
         return {
@@ -517,7 +1157,8 @@ async def draft_email_all_tones(request: dict):
                     "subject": draft.subject,
                     "body": draft.body,
                     "preview": draft.preview,
-                    "timestamp": draft.timestamp
+                    "timestamp": draft.timestamp,
+                    "tier": draft.tier
                 }
                 for draft in result['drafts']
             ],
@@ -547,9 +1188,9 @@ async def refine_draft_reply(request: dict):
         feedback = request.get('feedback', '')
         tone = request.get('tone', 'professional')
         
-        print(f"DEBUG: Refining draft with feedback: {feedback[:50]}...")
+        logger.debug("Refining draft with feedback: %s...", feedback[:50])
         
-        refined = refine_draft(current_draft, feedback, tone)
+        refined = await arefine_draft(current_draft, feedback, tone)
         
         return {
             "tone": refined.tone,
@@ -563,3 +1204,80 @@ async def refine_draft_reply(request: dict):
         print(f"ERROR in refine_draft_reply: {error_detail}")
         raise HTTPException(status_code=500, detail=error_detail)
 
+# ============= CACHE ENDPOINTS =============
+
+@app.get("/cache-stats")
+async def get_cache_stats():
+    """
+    Get hit/miss counters for the classification and priority response
+    cache and for the per-email priority memo.
+    """
+    return {
+        **response_cache.stats(),
+        "priority_memo": priority_memo.stats()
+    }
+
+@app.get("/tier-stats")
+async def get_tier_stats():
+    """
+    Get how many classification/priority answers came from the rule-based
+    fast tier, the response cache, a near-duplicate email, the local model
+    or the LLM.
+    """
+    return tier_stats()
+
+@app.get("/near-duplicate-stats")
+async def get_near_duplicate_stats():
+    """
+    Get how often classification and priority answers were reused from a
+    near-duplicate email, and how many candidates each lookup compared.
+    """
+    return {
+        "classification": classification_index.stats(),
+        "priority": priority_index.stats()
+    }
+
+@app.get("/scheduler-stats")
+async def get_scheduler_stats():
+    """
+    Get the LLM scheduler's current concurrency limit, retry/throttle
+    counters and queue wait percentiles.
+    """
+    return scheduler.stats()
+
+@app.get("/coalescing-stats")
+async def get_coalescing_stats():
+    """
+    Get how many identical concurrent LLM calls were coalesced into one
+    in-flight call instead of reaching the model.
+    """
+    return llm_singleflight.stats()
+
+@app.post("/normalize-email")
+async def normalize_email(request: dict):
+    """
+    Preview the text the analyzers send for an email after quoted history,
+    signatures and boilerplate are stripped, with the tokens saved.
+    
+    Request body:
+    {
+        "content": "Email body (or thread)",
+        "thread": false
+    }
+    """
+    normalized, report = normalize_with_report(request.get('content', ''), request.get('thread', False))
+    return {"normalized_content": normalized, **report}
+
+@app.get("/normalization-stats")
+async def get_normalization_stats():
+    """
+    Get the tokens saved by email normalization, per analyzer.
+    """
+    return normalization_stats()
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Request, LLM and cache metrics in the Prometheus text format.
+    """
+    return Response(registry.render(), media_type=CONTENT_TYPE)
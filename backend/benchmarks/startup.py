@@ -0,0 +1,132 @@
+# benchmarks/startup.py
+"""
+Cold-start benchmark for the backend.
+
+Reports where import time goes (python -X importtime) and how long a fresh
+worker takes to serve its first request. Run from the backend directory:
+
+    python -m benchmarks.startup --runs 5 --json startup.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter; TestClient is imported before the clock starts
+# so only the backend's own import and startup cost is measured
+FIRST_REQUEST_SCRIPT = """
+import json, time
+from fastapi.testclient import TestClient
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+with TestClient(app.app) as client:
+    started = time.perf_counter()
+    response = client.get("/")
+    done = time.perf_counter()
+print(json.dumps({
+    "import_app_ms": (imported - start) * 1000,
+    "lifespan_startup_ms": (started - imported) * 1000,
+    "first_request_ms": (done - started) * 1000,
+    "time_to_first_response_ms": (done - start) * 1000,
+    "status_code": response.status_code,
+}))
+"""
+
+def _env() -> dict:
+    env = dict(os.environ)
+    # The benchmark never reaches the network; a placeholder key lets the
+    # lifespan config check pass on machines without credentials
+    env.setdefault("GROQ_API_KEY", "benchmark-placeholder")
+    # Startup must not classify the sample threads in the background
+    env["CLASSIFICATION_SEED_ON_STARTUP"] = "0"
+    return env
+
+def measure_import_time(top: int) -> dict:
+    """Run `python -X importtime -c "import app"` and summarize the report."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing app failed:\n{proc.stderr[-2000:]}")
+
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+
+    app_entry = next((m for m in modules if m["module"] == "app"), None)
+    slowest = sorted(modules, key=lambda m: m["cumulative_ms"], reverse=True)[:top]
+    return {
+        "import_app_ms": app_entry["cumulative_ms"] if app_entry else None,
+        "modules_imported": len(modules),
+        "slowest_imports": slowest,
+    }
+
+def measure_first_request(runs: int) -> dict:
+    """Start a fresh interpreter per run and time it up to the first response."""
+    samples = []
+    for _ in range(runs):
+        wall_start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-c", FIRST_REQUEST_SCRIPT],
+            cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True
+        )
+        wall_ms = (time.perf_counter() - wall_start) * 1000
+        if proc.returncode != 0:
+            raise RuntimeError(f"First request run failed:\n{proc.stderr[-2000:]}")
+        sample = json.loads(proc.stdout.strip().splitlines()[-1])
+        sample["process_wall_ms"] = wall_ms
+        samples.append(sample)
+
+    keys = ["import_app_ms", "lifespan_startup_ms", "first_request_ms",
+            "time_to_first_response_ms", "process_wall_ms"]
+    return {
+        "runs": runs,
+        "median": {key: statistics.median(s[key] for s in samples) for key in keys},
+        "max": {key: max(s[key] for s in samples) for key in keys},
+        "samples": samples,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure backend cold-start time")
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes to time")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args()
+
+    report = {
+        "python": sys.version.split()[0],
+        "import_time": measure_import_time(args.top),
+        "first_request": measure_first_request(args.runs),
+    }
+
+    print(f"import app: {report['import_time']['import_app_ms']:.1f} ms "
+          f"({report['import_time']['modules_imported']} modules)")
+    for entry in report["import_time"]["slowest_imports"]:
+        print(f"  {entry['cumulative_ms']:9.1f} ms  {entry['module']}")
+    median = report["first_request"]["median"]
+    print(f"time to first response (median of {args.runs}): "
+          f"{median['time_to_first_response_ms']:.1f} ms in-process, "
+          f"{median['process_wall_ms']:.1f} ms including interpreter start")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.json}")
+
+if __name__ == "__main__":
+    main()
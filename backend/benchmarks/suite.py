@@ -0,0 +1,384 @@
+# benchmarks/suite.py
+"""
+Offline throughput and latency benchmark for the backend.
+
+Every LLM view is routed to benchmarks/fake_llm.py, so no network or API key
+is needed and the numbers show the backend's own overhead on top of a
+provider latency you choose. Single-email endpoints are driven by
+`concurrency` clients at once; batch endpoints and batch functions get
+`batch_size` emails per call with max_concurrency set to `concurrency`.
+Run from the backend directory:
+
+    python -m benchmarks.suite --latency lognormal:300,0.5 --json bench.json
+    python -m benchmarks.suite --latency fixed:20 --targets classify --baseline bench.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import itertools
+import subprocess
+from typing import Awaitable, Callable, List, Optional
+
+from benchmarks.fake_llm import FakeLLM, LatencyModel, install
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Message bodies in the style of test_classification.py; each generated
+# email gets a unique reference so caches and request coalescing never
+# answer for the fake model. The rule-based fast tier and the local
+# classifier are off unless --fast-tiers is given (the sales@ and billing@
+# templates are decided by the rules), and near-duplicate reuse is off unless
+# --near-duplicates is given, since these emails differ only by that reference.
+# Each result reports which tiers answered, so a baseline can be checked.
+EMAIL_TEMPLATES = [
+    ("Password Reset Request", "john.doe@customer.com",
+     "Hi, I forgot my password and cannot access the system. Could you help me reset it before my client meeting?"),
+    ("Enterprise Solution Pricing Quote", "sales@newclient.com",
+     "We are interested in your enterprise solution. Could you send us a pricing quote and availability for a demo?"),
+    ("Invoice for January services", "billing@paymentservice.com",
+     "Your invoice for January services is ready. Total amount: $5,000. Please process payment by January 31."),
+    ("API Integration Error - 500 Status Code", "dev.support@techclient.com",
+     "We are seeing errors from the API integration. Can someone from support help us troubleshoot the endpoint?"),
+    ("Weekly Team Standup Summary", "team@company.com",
+     "Here is the summary of our weekly standup. All projects are on track. Mike will share the updated figures."),
+]
+
+THREAD_TEMPLATE = """From: Sarah Johnson <sarah@company.com>
+To: Team <team@company.com>
+
+Hi team,
+We need to schedule our budget review (ref {ref}). I propose next Wednesday at 2 PM. Please confirm your availability.
+
+---
+From: Mike Chen <mike@company.com>
+
+Wednesday works for me. I will bring the updated spreadsheet with the revised figures.
+
+---
+From: Sarah Johnson <sarah@company.com>
+
+Great, I will send the invite. Lisa, can you prepare the marketing numbers by Tuesday?"""
+
+class EmailFactory:
+    """Unique synthetic emails, so every request reaches the (fake) model."""
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+
+    def email(self) -> dict:
+        email_id = next(self._ids)
+        subject, sender, content = EMAIL_TEMPLATES[email_id % len(EMAIL_TEMPLATES)]
+        return {
+            "id": email_id,
+            "email_id": email_id,
+            "subject": f"{subject} (ref {email_id})",
+            "sender": sender,
+            "content": f"{content}\n\nReference: {email_id}",
+            "timestamp": "2026-01-15T09:00:00Z",
+        }
+
+    def emails(self, count: int) -> List[dict]:
+        return [self.email() for _ in range(count)]
+
+    def thread(self) -> str:
+        return THREAD_TEMPLATE.format(ref=next(self._ids))
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def _summarize(latencies_ms: List[float], elapsed: float, items: int) -> dict:
+    return {
+        "throughput_per_s": items / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "p50": _percentile(latencies_ms, 50),
+            "p95": _percentile(latencies_ms, 95),
+            "p99": _percentile(latencies_ms, 99),
+            "mean": sum(latencies_ms) / len(latencies_ms),
+            "max": max(latencies_ms),
+        },
+    }
+
+async def _drive(call: Callable[[], Awaitable[bool]], calls: int, workers: int) -> tuple:
+    """Run `calls` calls from `workers` concurrent loops; return (latencies_ms, errors, elapsed_s)."""
+    remaining = itertools.count()
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while next(remaining) < calls:
+            start = time.perf_counter()
+            ok = await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += 0 if ok else 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, min(workers, calls)))))
+    return latencies, errors, time.perf_counter() - start
+
+def _endpoint_targets(factory: EmailFactory) -> dict:
+    """name -> (path, body builder(batch_size, concurrency), batched)."""
+    def email_body(batch_size, concurrency):
+        email = factory.email()
+        return {key: email[key] for key in ("id", "email_id", "subject", "sender", "content", "timestamp")}
+
+    def draft_body(batch_size, concurrency):
+        email = factory.email()
+        return {
+            "original_subject": email["subject"],
+            "original_sender": email["sender"],
+            "thread_content": factory.thread(),
+            "tone": "professional",
+        }
+
+    def batch_body(batch_size, concurrency):
+        return {"emails": factory.emails(batch_size), "max_concurrency": concurrency}
+
+    return {
+        "POST /classify-email": ("/classify-email", email_body, False),
+        "POST /detect-priority": ("/detect-priority", email_body, False),
+        "POST /extract-action-items": ("/extract-action-items", email_body, False),
+        "POST /analyze-email": ("/analyze-email", email_body, False),
+        "POST /draft-reply": ("/draft-reply", draft_body, False),
+        "POST /draft-reply-all-tones": ("/draft-reply-all-tones", draft_body, False),
+        "POST /summarize-thread": ("/summarize-thread", lambda b, c: {"thread_content": factory.thread()}, False),
+        "POST /classify-emails": ("/classify-emails", batch_body, True),
+        "POST /detect-priorities-batch": ("/detect-priorities-batch", batch_body, True),
+        "POST /extract-action-items-batch": ("/extract-action-items-batch", batch_body, True),
+        "POST /analyze-emails": ("/analyze-emails", batch_body, True),
+    }
+
+def _batch_targets(factory: EmailFactory) -> dict:
+    """name -> coroutine function(batch_size, concurrency)."""
+    from email_classifier import Email, abatch_classify_emails
+    from email_priority_detector import abatch_detect_priorities
+    from action_item_extractor import abatch_extract_action_items
+    from email_analyzer import abatch_analyze_emails
+
+    def classify(packed: bool):
+        async def run(batch_size, concurrency):
+            emails = [
+                Email(**{key: email[key] for key in ("id", "subject", "sender", "content", "timestamp")})
+                for email in factory.emails(batch_size)
+            ]
+            await abatch_classify_emails(emails, concurrency, packed)
+        return run
+
+    def priorities(packed: bool):
+        async def run(batch_size, concurrency):
+            await abatch_detect_priorities(factory.emails(batch_size), concurrency, packed)
+        return run
+
+    async def action_items(batch_size, concurrency):
+        await abatch_extract_action_items(factory.emails(batch_size), concurrency)
+
+    async def analyze(batch_size, concurrency):
+        await abatch_analyze_emails(factory.emails(batch_size), concurrency)
+
+    return {
+        "abatch_classify_emails": classify(False),
+        "abatch_classify_emails[packed]": classify(True),
+        "abatch_detect_priorities": priorities(False),
+        "abatch_detect_priorities[packed]": priorities(True),
+        "abatch_extract_action_items": action_items,
+        "abatch_analyze_emails": analyze,
+    }
+
+def _tier_counts() -> dict:
+    from fast_tier import tier_stats
+
+    return {
+        (analyzer, tier): count
+        for analyzer, counters in tier_stats().items()
+        for tier, count in counters.items()
+        if tier not in ("total", "skipped_network_fraction")
+    }
+
+def _tier_delta(before: dict) -> dict:
+    """{analyzer: {tier: answers}} recorded since the `before` snapshot."""
+    tiers = {}
+    for (analyzer, tier), count in _tier_counts().items():
+        delta = count - before.get((analyzer, tier), 0)
+        if delta:
+            tiers.setdefault(analyzer, {})[tier] = delta
+    return tiers
+
+def _selected(name: str, targets: Optional[List[str]]) -> bool:
+    return not targets or any(target in name for target in targets)
+
+async def run_suite(args, fake: FakeLLM) -> List[dict]:
+    import httpx
+    import app
+
+    factory = EmailFactory()
+    results = []
+
+    def record(name, kind, batch_size, concurrency, calls, latencies, errors, elapsed, llm_calls_before, tiers_before):
+        tiers = _tier_delta(tiers_before)
+        not_llm = sum(count for counters in tiers.values() for tier, count in counters.items() if tier != "llm")
+        result = {
+            "target": name,
+            "kind": kind,
+            "batch_size": batch_size,
+            "concurrency": concurrency,
+            "calls": calls,
+            "errors": errors,
+            "emails_per_s": calls * batch_size / elapsed if elapsed else 0.0,
+            "llm_calls": fake.calls - llm_calls_before,
+            "tiers": tiers,
+            **_summarize(latencies, elapsed, calls),
+        }
+        results.append(result)
+        latency = result["latency_ms"]
+        print(f"{name:38} b={batch_size:<4} c={concurrency:<4} "
+              f"p50 {latency['p50']:8.1f}  p95 {latency['p95']:8.1f}  p99 {latency['p99']:8.1f} ms  "
+              f"{result['throughput_per_s']:8.1f} calls/s  {result['emails_per_s']:8.1f} emails/s"
+              + (f"  {errors} errors" if errors else "")
+              + (f"  {not_llm} answers not from the LLM" if not_llm else ""))
+
+    async with app.app.router.lifespan_context(app.app):
+        # The startup task classifies the sample threads; let it finish first
+        if app.classification_seed is not None:
+            await app.classification_seed
+
+        transport = httpx.ASGITransport(app=app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            for name, (path, body, batched) in _endpoint_targets(factory).items():
+                if not _selected(name, args.targets):
+                    continue
+                for batch_size in (args.batch_sizes if batched else [1]):
+                    for concurrency in args.concurrency:
+                        async def call():
+                            response = await client.post(path, json=body(batch_size, concurrency))
+                            return response.status_code == 200
+
+                        # A batch endpoint fans out itself; single endpoints get concurrent clients
+                        calls = args.repeats if batched else args.requests
+                        before, tiers_before = fake.calls, _tier_counts()
+                        latencies, errors, elapsed = await _drive(call, calls, 1 if batched else concurrency)
+                        record(name, "endpoint", batch_size, concurrency, calls, latencies, errors, elapsed,
+                               before, tiers_before)
+
+        for name, run in _batch_targets(factory).items():
+            if not _selected(name, args.targets):
+                continue
+            for batch_size in args.batch_sizes:
+                for concurrency in args.concurrency:
+                    async def call():
+                        try:
+                            await run(batch_size, concurrency)
+                            return True
+                        except Exception as e:
+                            print(f"Error in {name}: {str(e)}")
+                            return False
+
+                    before, tiers_before = fake.calls, _tier_counts()
+                    latencies, errors, elapsed = await _drive(call, args.repeats, 1)
+                    record(name, "batch", batch_size, concurrency, args.repeats, latencies, errors, elapsed,
+                           before, tiers_before)
+
+    return results
+
+def _git_commit() -> Optional[str]:
+    try:
+        proc = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True
+        )
+        return proc.stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(results: List[dict], baseline_path: str):
+    """Print p50/p99 and throughput changes against an earlier report."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {
+        (r["target"], r["batch_size"], r["concurrency"]): r for r in baseline.get("results", [])
+    }
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit') or 'unknown'}):")
+    for result in results:
+        old = previous.get((result["target"], result["batch_size"], result["concurrency"]))
+        if old is None:
+            continue
+
+        def change(new_value, old_value):
+            return f"{(new_value - old_value) / old_value * 100:+6.1f}%" if old_value else "   n/a"
+
+        print(f"{result['target']:38} b={result['batch_size']:<4} c={result['concurrency']:<4} "
+              f"p50 {change(result['latency_ms']['p50'], old['latency_ms']['p50'])}  "
+              f"p99 {change(result['latency_ms']['p99'], old['latency_ms']['p99'])}  "
+              f"throughput {change(result['throughput_per_s'], old['throughput_per_s'])}")
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark endpoints and batch functions against a fake LLM")
+    parser.add_argument("--latency", default="lognormal:300,0.5",
+                        help="fake provider latency: fixed:MS, uniform:LOW,HIGH or lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the latency samples")
+    parser.add_argument("--batch-sizes", type=_int_list, default=[1, 10, 50], help="emails per batch call")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8, 32],
+                        help="concurrent clients (single endpoints) or max_concurrency (batches)")
+    parser.add_argument("--requests", type=int, default=32, help="requests per single-email endpoint run")
+    parser.add_argument("--repeats", type=int, default=3, help="calls per batch run")
+    parser.add_argument("--targets", nargs="*", help="only run targets whose name contains one of these")
+    parser.add_argument("--near-duplicates", action="store_true",
+                        help="let near-duplicate emails reuse earlier results (most calls skip the model)")
+    parser.add_argument("--fast-tiers", action="store_true",
+                        help="let the rule-based fast tier and the local classifier answer obvious emails")
+    parser.add_argument("--json", help="write the full report to this file")
+    parser.add_argument("--baseline", help="earlier --json report to compare against")
+    args = parser.parse_args()
+
+    # Keep the run self-contained: no credentials, no network and no writes
+    # to the real stores or the on-disk response cache
+    state_dir = tempfile.mkdtemp(prefix="email-ai-bench-")
+    os.environ.setdefault("GROQ_API_KEY", "benchmark-placeholder")
+    os.environ["CLASSIFICATION_DB_PATH"] = os.path.join(state_dir, "classifications.sqlite3")
+    os.environ["ACTION_ITEM_DB_PATH"] = os.path.join(state_dir, "action_items.sqlite3")
+    os.environ["JOB_DB_PATH"] = os.path.join(state_dir, "jobs.sqlite3")
+    os.environ.pop("LLM_CACHE_DB_PATH", None)
+    os.environ["NEAR_DUPLICATE_ENABLED"] = "1" if args.near_duplicates else "0"
+    os.environ["FAST_TIER_ENABLED"] = "1" if args.fast_tiers else "0"
+    os.environ["LOCAL_CLASSIFIER_ENABLED"] = "1" if args.fast_tiers else "0"
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+    fake = FakeLLM(LatencyModel(args.latency, args.seed))
+    install(fake)
+
+    started = time.time()
+    results = asyncio.run(run_suite(args, fake))
+    report = {
+        "python": sys.version.split()[0],
+        "commit": _git_commit(),
+        "started_at": started,
+        "config": {
+            "latency": args.latency,
+            "seed": args.seed,
+            "batch_sizes": args.batch_sizes,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "repeats": args.repeats,
+            "near_duplicates": args.near_duplicates,
+            "fast_tiers": args.fast_tiers,
+        },
+        "results": results,
+    }
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# classification_store.py
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+from response_cache import hash_text, normalize_text
+
+CLASSIFICATION_DB_PATH = os.getenv("CLASSIFICATION_DB_PATH", "classifications.sqlite3")
+
+# Categories counted by the stats endpoints (lower-case, as returned there)
+STAT_CATEGORIES = ["support", "sales", "billing", "urgent", "fyi"]
+
+def content_hash(subject: str, sender: str, content: str) -> str:
+    return hash_text(json.dumps([normalize_text(subject), normalize_text(sender), normalize_text(content)]))
+
+class ClassificationStore:
+    """
+    Stored category of every classified email, with per-category counters
+    kept up to date on each write so statistics are an O(1) read.
+
+    Emails are keyed by (source, email_key), e.g. ("threads", "1"). A row
+    only counts while its prompt_version matches the current one: changing
+    the classification prompt or model invalidates every stored category
+    until the email is classified again. The email text is kept as well, so
+    the stored labels can be reused as training data.
+    """
+
+    def __init__(self, prompt_version: str, db_path: str = CLASSIFICATION_DB_PATH):
+        self.prompt_version = prompt_version
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS classifications (
+                source TEXT NOT NULL,
+                email_key TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                category TEXT NOT NULL,
+                confidence REAL NOT NULL,
+                tier TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                sender TEXT NOT NULL,
+                content TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (source, email_key)
+            );
+            CREATE INDEX IF NOT EXISTS idx_classifications_version
+                ON classifications (prompt_version, source);
+            """
+        )
+        self._db.commit()
+        self._counts = self._load_counts()
+
+    def _load_counts(self) -> Dict[str, Dict[str, int]]:
+        rows = self._db.execute(
+            "SELECT source, category, COUNT(*) FROM classifications "
+            "WHERE prompt_version = ? GROUP BY source, category",
+            (self.prompt_version,)
+        ).fetchall()
+        counts = {}
+        for source, category, count in rows:
+            counts.setdefault(source, {})[category] = count
+        return counts
+
+    def _adjust(self, source: str, category: str, delta: int):
+        source_counts = self._counts.setdefault(source, {})
+        source_counts[category] = source_counts.get(category, 0) + delta
+        if source_counts[category] <= 0:
+            del source_counts[category]
+
+    def lookup(self, source: str, email_key: str, subject: str, sender: str, content: str) -> Optional[dict]:
+        """Stored result for an email, or None if missing, edited or classified by an older prompt."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT category, confidence, tier FROM classifications "
+                "WHERE source = ? AND email_key = ? AND content_hash = ? AND prompt_version = ?",
+                (source, email_key, content_hash(subject, sender, content), self.prompt_version)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"category": row[0], "confidence": row[1], "tier": row[2]}
+
+    def record_many(self, source: str, entries: List[dict]):
+        """
+        Store classifications and update the counters in one transaction.
+
+        Each entry has email_key, subject, sender, content, category,
+        confidence and tier.
+        """
+        now = time.time()
+        with self._lock:
+            for entry in entries:
+                previous = self._db.execute(
+                    "SELECT category, prompt_version FROM classifications "
+                    "WHERE source = ? AND email_key = ?",
+                    (source, entry["email_key"])
+                ).fetchone()
+                if previous is not None and previous[1] == self.prompt_version:
+                    self._adjust(source, previous[0], -1)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO classifications (source, email_key, content_hash, "
+                    "prompt_version, category, confidence, tier, subject, sender, content, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        source,
+                        entry["email_key"],
+                        content_hash(entry["subject"], entry["sender"], entry["content"]),
+                        self.prompt_version,
+                        entry["category"],
+                        entry["confidence"],
+                        entry["tier"],
+                        entry["subject"],
+                        entry["sender"],
+                        entry["content"],
+                        now
+                    )
+                )
+                self._adjust(source, entry["category"], 1)
+            self._db.commit()
+
+    def prune(self, source: str, keep_keys: List[str]):
+        """Drop stored emails of a source that are no longer part of it."""
+        keep = set(keep_keys)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT email_key, category, prompt_version FROM classifications WHERE source = ?",
+                (source,)
+            ).fetchall()
+            for email_key, category, prompt_version in rows:
+                if email_key in keep:
+                    continue
+                if prompt_version == self.prompt_version:
+                    self._adjust(source, category, -1)
+                self._db.execute(
+                    "DELETE FROM classifications WHERE source = ? AND email_key = ?",
+                    (source, email_key)
+                )
+            self._db.commit()
+
+    def training_examples(self, tiers: tuple = ("llm", "cache"), min_confidence: float = 0.0) -> List[dict]:
+        """
+        Stored emails labelled under the current prompt version, for the
+        local classifier. Only LLM answers (fresh or cached) are returned by
+        default, so the local model never learns from its own or the rules'
+        guesses.
+        """
+        placeholders = ", ".join("?" for _ in tiers)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT subject, sender, content, category, confidence FROM classifications "
+                f"WHERE prompt_version = ? AND tier IN ({placeholders}) AND confidence >= ? "
+                "ORDER BY source, email_key",
+                (self.prompt_version, *tiers, min_confidence)
+            ).fetchall()
+        return [
+            {"subject": subject, "sender": sender, "content": content, "category": category, "confidence": confidence}
+            for subject, sender, content, category, confidence in rows
+        ]
+
+    def stats(self, source: str) -> dict:
+        """Category counts of a source, read from the in-memory counters."""
+        with self._lock:
+            counts = dict(self._counts.get(source, {}))
+        stats = {"total_emails": sum(counts.values())}
+        for category in STAT_CATEGORIES:
+            stats[category] = 0
+        for category, count in counts.items():
+            if category.lower() in stats:
+                stats[category.lower()] += count
+        return stats
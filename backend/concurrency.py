@@ -0,0 +1,82 @@
+# concurrency.py
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, List, Optional, Tuple
+
+# Maximum number of LLM calls a single batch may have in flight at once
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+def _limit(max_concurrency: Optional[int]) -> int:
+    return max(1, max_concurrency or MAX_CONCURRENCY)
+
+async def gather_bounded(
+    func: Callable[[Any], Awaitable[Any]],
+    items: Iterable[Any],
+    max_concurrency: Optional[int] = None
+) -> List[Any]:
+    """
+    Await func(item) for every item with at most max_concurrency calls in
+    flight. Results are returned in the same order as items.
+    """
+    semaphore = asyncio.Semaphore(_limit(max_concurrency))
+
+    async def run(item):
+        async with semaphore:
+            return await func(item)
+
+    return list(await asyncio.gather(*(run(item) for item in items)))
+
+async def iter_bounded(
+    func: Callable[[Any], Awaitable[Any]],
+    items: Iterable[Any],
+    max_concurrency: Optional[int] = None
+) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Yield (index, result) pairs in completion order with at most
+    max_concurrency calls in flight. Items are pulled from the iterable only
+    as slots free up, so memory stays flat regardless of batch size.
+    """
+    limit = _limit(max_concurrency)
+    iterator = enumerate(items)
+    pending = set()
+
+    async def run(idx, item):
+        return idx, await func(item)
+
+    def fill():
+        while len(pending) < limit:
+            try:
+                idx, item = next(iterator)
+            except StopIteration:
+                return
+            pending.add(asyncio.ensure_future(run(idx, item)))
+
+    fill()
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                pending.discard(task)
+                yield task.result()
+            fill()
+    finally:
+        # Client went away or a call failed: do not leave calls running
+        for task in pending:
+            task.cancel()
+
+def map_bounded(
+    func: Callable[[Any], Any],
+    items: Iterable[Any],
+    max_concurrency: Optional[int] = None
+) -> List[Any]:
+    """
+    Thread pool counterpart of gather_bounded for the synchronous batch
+    helpers. Results are returned in the same order as items.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(_limit(max_concurrency), len(items))) as pool:
+        return list(pool.map(func, items))
@@ -1,25 +1,27 @@
 # draft_reply_generator.py
 import os
 import json
-from dotenv import load_dotenv
-from langchain_groq import ChatGroq
-from langchain_core.messages import HumanMessage
+from llm_provider import get_llm
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
+from concurrency import gather_bounded, map_bounded
+from response_cache import ResponseCache, make_cache_key
+from fast_tier import record_tier
+from email_normalizer import normalize_content
+from metrics import record_parse_failure
 
-# Load .env
-load_dotenv()
+# Shared LLM view for draft reply generation
+llm = get_llm(temperature=0.7, module="draft")  # Creative but coherent drafts
 
-# Initialize LLM for draft reply generation
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
-    raise ValueError("GROQ_API_KEY environment variable not set")
-
-llm = ChatGroq(
-    model="openai/gpt-oss-120b",
-    temperature=0.7,  # Creative but coherent drafts
-    api_key=GROQ_API_KEY
+# Drafts are cached per (thread, tone) so switching tones in the UI does not
+# regenerate them. Sampling is not deterministic, so unlike the analyzer
+# cache this one is short-lived and lives in memory only.
+DRAFT_CACHE_TTL_SECONDS = float(os.getenv("DRAFT_CACHE_TTL_SECONDS", "3600"))
+draft_cache = ResponseCache(
+    max_entries=int(os.getenv("DRAFT_CACHE_MAX_ENTRIES", "2000")),
+    ttl_seconds=DRAFT_CACHE_TTL_SECONDS,
+    db_path=None
 )
 
 # Pydantic models
@@ -30,6 +32,7 @@ class DraftReply(BaseModel):
     body: str
     preview: str  # First 100 chars
     timestamp: str
+    tier: str = "llm"  # Which tier answered: cache or llm
 
 class DraftReplyRequest(BaseModel):
     """Request to generate a draft reply"""
@@ -39,51 +42,26 @@ class DraftReplyRequest(BaseModel):
     tone: str  # professional, friendly, short, apologetic
     context: Optional[str] = None  # Additional context about organization
 
-def generate_draft_reply(
-    original_subject: str,
-    original_sender: str,
-    thread_content: str,
-    tone: str = "professional",
-    context: Optional[str] = None
-) -> DraftReply:
-    """
-    Generate a draft reply email with specified tone.
+# Tone instructions
+TONE_INSTRUCTIONS = {
+    "professional": """Generate a professional, business-appropriate reply. 
+    Be formal, concise, and action-oriented. Use proper grammar and avoid slang. 
+    Include relevant context and clear next steps.""",
     
-    Args:
-        original_subject: Subject of the original email
-        original_sender: Who sent the original email
-        thread_content: Full email thread content
-        tone: One of: professional, friendly, short, apologetic
-        context: Optional context about the organization
+    "friendly": """Generate a warm, personable reply while maintaining professionalism. 
+    Be conversational, approachable, and encouraging. Use friendly language but stay professional. 
+    Acknowledge the sender's tone and build rapport.""",
     
-    Returns:
-        DraftReply with suggested subject and body
-    """
-    
-    # Tone instructions
-    tone_instructions = {
-        "professional": """Generate a professional, business-appropriate reply. 
-        Be formal, concise, and action-oriented. Use proper grammar and avoid slang. 
-        Include relevant context and clear next steps.""",
-        
-        "friendly": """Generate a warm, personable reply while maintaining professionalism. 
-        Be conversational, approachable, and encouraging. Use friendly language but stay professional. 
-        Acknowledge the sender's tone and build rapport.""",
-        
-        "short": """Generate a brief, concise reply. 
-        Keep it to 2-3 sentences maximum. Get straight to the point. 
-        No unnecessary pleasantries, just essential information.""",
-        
-        "apologetic": """Generate an apologetic, empathetic reply acknowledging the issue. 
-        Express genuine concern, take responsibility where appropriate, 
-        and provide clear resolution steps. Show customer care and commitment to resolution."""
-    }
+    "short": """Generate a brief, concise reply. 
+    Keep it to 2-3 sentences maximum. Get straight to the point. 
+    No unnecessary pleasantries, just essential information.""",
     
-    tone_instruction = tone_instructions.get(tone, tone_instructions["professional"])
-    
-    context_text = f"\nOrganization Context: {context}" if context else ""
-    
-    draft_prompt = f"""You are an email assistant. Generate a draft reply email based on the following thread.
+    "apologetic": """Generate an apologetic, empathetic reply acknowledging the issue. 
+    Express genuine concern, take responsibility where appropriate, 
+    and provide clear resolution steps. Show customer care and commitment to resolution."""
+}
+
+DRAFT_PROMPT = """You are an email assistant. Generate a draft reply email based on the following thread.
 
 Original Email Subject: {original_subject}
 From: {original_sender}
@@ -108,43 +86,108 @@ Return ONLY valid JSON (no other text):
 }}
 
 Generate the draft now:"""
+
+REFINE_PROMPT = """You are an email refinement assistant. 
     
-    try:
-        response = llm.invoke([HumanMessage(content=draft_prompt)])
-        response_text = response.content.strip()
-        
-        # Extract JSON from response
-        start_idx = response_text.find('{')
-        end_idx = response_text.rfind('}') + 1
-        
-        if start_idx == -1 or end_idx == 0:
-            # Fallback if no JSON found
-            return DraftReply(
-                tone=tone,
-                subject=f"Re: {original_subject}",
-                body="Unable to generate draft. Please compose manually.",
-                preview="Unable to generate draft.",
-                timestamp=datetime.now().isoformat()
-            )
-        
-        json_str = response_text[start_idx:end_idx]
-        draft_data = json.loads(json_str)
-        
-        # Create DraftReply object
-        body = draft_data.get('body', '')
-        subject = draft_data.get('subject', f"Re: {original_subject}")
-        preview = body[:100] + "..." if len(body) > 100 else body
-        
+Current draft:
+{current_draft}
+
+User feedback for refinement:
+{feedback}
+
+Tone to maintain: {tone}
+
+Please refine the draft based on the feedback while maintaining the {tone} tone.
+Return ONLY the refined email body (no JSON, just the plain text of the refined email):"""
+
+MULTI_TONE_PROMPT = """You are an email assistant. Generate draft reply emails to the following thread, one for EACH tone listed below.
+
+Original Email Subject: {original_subject}
+From: {original_sender}
+
+Email Thread:
+{thread_content}
+{context_text}
+
+Tones:
+{tone_instructions}
+
+Each draft needs:
+1. Subject line (starting with "Re: ")
+2. Appropriate greeting
+3. Well-structured body (2-4 paragraphs, or as the tone requires)
+4. Professional closing
+
+Return ONLY a valid JSON object (no other text) with one entry per tone, keyed by the tone name:
+{{
+  "{first_tone}": {{
+    "subject": "Re: Subject line",
+    "body": "Full email body with appropriate formatting and line breaks"
+  }}
+}}
+
+Generate the drafts now:"""
+
+FALLBACK_BODY = "Unable to generate draft. Please compose manually."
+
+def _build_draft_prompt(
+    original_subject: str,
+    original_sender: str,
+    thread_content: str,
+    tone: str,
+    context: Optional[str]
+) -> str:
+    tone_instruction = TONE_INSTRUCTIONS.get(tone, TONE_INSTRUCTIONS["professional"])
+    
+    context_text = f"\nOrganization Context: {context}" if context else ""
+    
+    return DRAFT_PROMPT.format(
+        original_subject=original_subject,
+        original_sender=original_sender,
+        thread_content=thread_content,
+        context_text=context_text,
+        tone_instruction=tone_instruction
+    )
+
+def _draft_from_data(draft_data: dict, tone: str, original_subject: str) -> DraftReply:
+    body = draft_data.get('body', '')
+    subject = draft_data.get('subject', f"Re: {original_subject}")
+    preview = body[:100] + "..." if len(body) > 100 else body
+    
+    return DraftReply(
+        tone=tone,
+        subject=subject,
+        body=body,
+        preview=preview,
+        timestamp=datetime.now().isoformat()
+    )
+
+def _parse_draft(response_text: str, tone: str, original_subject: str) -> DraftReply:
+    """Parse the model's JSON reply into a DraftReply."""
+    # Extract JSON from response
+    start_idx = response_text.find('{')
+    end_idx = response_text.rfind('}') + 1
+    
+    if start_idx == -1 or end_idx == 0:
+        # Fallback if no JSON found
+        record_parse_failure("draft")
         return DraftReply(
             tone=tone,
-            subject=subject,
-            body=body,
-            preview=preview,
+            subject=f"Re: {original_subject}",
+            body=FALLBACK_BODY,
+            preview="Unable to generate draft.",
             timestamp=datetime.now().isoformat()
         )
     
-    except json.JSONDecodeError as e:
+    json_str = response_text[start_idx:end_idx]
+    draft_data = json.loads(json_str)
+    
+    return _draft_from_data(draft_data, tone, original_subject)
+
+def _draft_failed(e: Exception, tone: str, original_subject: str) -> DraftReply:
+    if isinstance(e, json.JSONDecodeError):
         print(f"JSON parsing error in draft generation: {str(e)}")
+        record_parse_failure("draft")
         return DraftReply(
             tone=tone,
             subject=f"Re: {original_subject}",
@@ -152,25 +195,225 @@ Generate the draft now:"""
             preview="Error generating draft.",
             timestamp=datetime.now().isoformat()
         )
+    print(f"Error generating draft reply: {str(e)}")
+    return DraftReply(
+        tone=tone,
+        subject=f"Re: {original_subject}",
+        body=f"Error: {str(e)}",
+        preview=f"Error: {str(e)[:50]}",
+        timestamp=datetime.now().isoformat()
+    )
+
+def _draft_cache_key(
+    original_subject: str,
+    original_sender: str,
+    thread_content: str,
+    tone: str,
+    context: Optional[str]
+) -> str:
+    # Keyed on the thread and the tone only, so a draft produced by the
+    # multi-tone prompt is reused by a later single-tone request
+    return make_cache_key(
+        "draft",
+        [original_subject, original_sender, thread_content, context or "", tone],
+        llm.model_name,
+        llm.temperature,
+        DRAFT_PROMPT + MULTI_TONE_PROMPT + TONE_INSTRUCTIONS.get(tone, TONE_INSTRUCTIONS["professional"])
+    )
+
+def _cached_draft(cache_key: str) -> Optional[DraftReply]:
+    cached = draft_cache.get(cache_key)
+    if cached is None:
+        return None
+    record_tier("draft", "cache")
+    return DraftReply(**{**cached, "tier": "cache"})
+
+def _remember_draft(cache_key: str, draft: DraftReply):
+    # Fallback and error drafts are not worth keeping
+    if draft.body and draft.body != FALLBACK_BODY:
+        draft_cache.set(cache_key, draft.model_dump())
+
+def generate_draft_reply(
+    original_subject: str,
+    original_sender: str,
+    thread_content: str,
+    tone: str = "professional",
+    context: Optional[str] = None
+) -> DraftReply:
+    """
+    Generate a draft reply email with specified tone.
+    
+    Args:
+        original_subject: Subject of the original email
+        original_sender: Who sent the original email
+        thread_content: Full email thread content
+        tone: One of: professional, friendly, short, apologetic
+        context: Optional context about the organization
+    
+    Returns:
+        DraftReply with suggested subject and body
+    
+    Drafts are cached per (thread, tone) for DRAFT_CACHE_TTL_SECONDS.
+    """
+    thread_content = normalize_content(thread_content, "draft", thread=True)
+    return _generate_draft_reply(original_subject, original_sender, thread_content, tone, context)
+
+def _generate_draft_reply(
+    original_subject: str,
+    original_sender: str,
+    thread_content: str,
+    tone: str,
+    context: Optional[str]
+) -> DraftReply:
+    """generate_draft_reply for a thread that is already normalized."""
+    cache_key = _draft_cache_key(original_subject, original_sender, thread_content, tone, context)
+    cached = _cached_draft(cache_key)
+    if cached is not None:
+        return cached
+    
+    draft_prompt = _build_draft_prompt(
+        original_subject, original_sender, thread_content, tone, context
+    )
+    
+    record_tier("draft", "llm")
+    try:
+        response = llm.invoke(draft_prompt)
+        draft = _parse_draft(response.content.strip(), tone, original_subject)
+        _remember_draft(cache_key, draft)
+        return draft
     except Exception as e:
-        print(f"Error generating draft reply: {str(e)}")
-        return DraftReply(
-            tone=tone,
-            subject=f"Re: {original_subject}",
-            body=f"Error: {str(e)}",
-            preview=f"Error: {str(e)[:50]}",
-            timestamp=datetime.now().isoformat()
-        )
+        return _draft_failed(e, tone, original_subject)
 
-def generate_all_tone_variants(
+async def agenerate_draft_reply(
     original_subject: str,
     original_sender: str,
     thread_content: str,
+    tone: str = "professional",
     context: Optional[str] = None
+) -> DraftReply:
+    """
+    Async version of generate_draft_reply built on ainvoke.
+    """
+    thread_content = normalize_content(thread_content, "draft", thread=True)
+    return await _agenerate_draft_reply(original_subject, original_sender, thread_content, tone, context)
+
+async def _agenerate_draft_reply(
+    original_subject: str,
+    original_sender: str,
+    thread_content: str,
+    tone: str,
+    context: Optional[str]
+) -> DraftReply:
+    """agenerate_draft_reply for a thread that is already normalized."""
+    cache_key = _draft_cache_key(original_subject, original_sender, thread_content, tone, context)
+    cached = _cached_draft(cache_key)
+    if cached is not None:
+        return cached
+    
+    draft_prompt = _build_draft_prompt(
+        original_subject, original_sender, thread_content, tone, context
+    )
+    
+    record_tier("draft", "llm")
+    try:
+        response = await llm.ainvoke(draft_prompt)
+        draft = _parse_draft(response.content.strip(), tone, original_subject)
+        _remember_draft(cache_key, draft)
+        return draft
+    except Exception as e:
+        return _draft_failed(e, tone, original_subject)
+
+TONES = ["professional", "friendly", "short", "apologetic"]
+
+def _tone_variants_result(original_subject: str, original_sender: str, drafts: List[DraftReply]) -> dict:
+    return {
+        "original_subject": original_subject,
+        "original_sender": original_sender,
+        "drafts": drafts,
+        "timestamp": datetime.now().isoformat(),
+        "total_variants": len(drafts)
+    }
+
+def _build_multi_tone_prompt(
+    original_subject: str,
+    original_sender: str,
+    thread_content: str,
+    tones: List[str],
+    context: Optional[str]
+) -> str:
+    tone_instructions = "\n\n".join(
+        f"{tone}:\n{TONE_INSTRUCTIONS[tone]}" for tone in tones
+    )
+    
+    context_text = f"\nOrganization Context: {context}" if context else ""
+    
+    return MULTI_TONE_PROMPT.format(
+        original_subject=original_subject,
+        original_sender=original_sender,
+        thread_content=thread_content,
+        context_text=context_text,
+        tone_instructions=tone_instructions,
+        first_tone=tones[0]
+    )
+
+def _parse_tone_variants(response_text: str, tones: List[str], original_subject: str) -> dict:
+    """
+    Parse the multi-tone JSON reply into {tone: DraftReply}. Tones missing
+    from the reply (or without a body) are left out so the caller can
+    generate them one by one.
+    """
+    start_idx = response_text.find('{')
+    end_idx = response_text.rfind('}') + 1
+    if start_idx == -1 or end_idx == 0:
+        record_parse_failure("draft")
+        return {}
+    
+    try:
+        variants_data = json.loads(response_text[start_idx:end_idx])
+    except json.JSONDecodeError:
+        record_parse_failure("draft")
+        raise
+    drafts = {}
+    for tone in tones:
+        draft_data = variants_data.get(tone)
+        if isinstance(draft_data, dict) and draft_data.get('body'):
+            drafts[tone] = _draft_from_data(draft_data, tone, original_subject)
+    return drafts
+
+def _cached_tone_variants(
+    original_subject: str,
+    original_sender: str,
+    thread_content: str,
+    context: Optional[str]
+) -> tuple:
+    """Return ({tone: cached DraftReply}, {tone: cache key}) for every tone."""
+    cache_keys = {
+        tone: _draft_cache_key(original_subject, original_sender, thread_content, tone, context)
+        for tone in TONES
+    }
+    drafts = {}
+    for tone, cache_key in cache_keys.items():
+        cached = _cached_draft(cache_key)
+        if cached is not None:
+            drafts[tone] = cached
+    return drafts, cache_keys
+
+def generate_all_tone_variants(
+    original_subject: str,
+    original_sender: str,
+    thread_content: str,
+    context: Optional[str] = None,
+    single_call: bool = True
 ) -> dict:
     """
     Generate draft replies in all available tones for comparison.
     
+    Cached tones are reused. With single_call, the remaining tones are
+    requested together in one structured response, so the thread is sent
+    once; any tone that reply does not cover (or all of them, if it cannot
+    be parsed) is generated separately and concurrently. Drafts are
+    returned in TONES order.
+    
     Returns:
         {
             "original_subject": str,
@@ -179,26 +422,114 @@ def generate_all_tone_variants(
             "timestamp": str
         }
     """
-    tones = ["professional", "friendly", "short", "apologetic"]
-    drafts = []
+    thread_content = normalize_content(thread_content, "draft", thread=True)
+    drafts, cache_keys = _cached_tone_variants(
+        original_subject, original_sender, thread_content, context
+    )
+    missing = [tone for tone in TONES if tone not in drafts]
     
-    for tone in tones:
-        draft = generate_draft_reply(
+    if single_call and len(missing) > 1:
+        multi_tone_prompt = _build_multi_tone_prompt(
+            original_subject, original_sender, thread_content, missing, context
+        )
+        try:
+            response = llm.invoke(multi_tone_prompt)
+            generated = _parse_tone_variants(response.content.strip(), missing, original_subject)
+        except Exception as e:
+            print(f"Error generating tone variants in one call: {str(e)}")
+            generated = {}
+        record_tier("draft", "llm", len(generated))
+        for tone, draft in generated.items():
+            _remember_draft(cache_keys[tone], draft)
+        drafts.update(generated)
+        missing = [tone for tone in missing if tone not in drafts]
+    
+    # Per-tone fallback (also the path when single_call is off)
+    fallback_drafts = map_bounded(
+        lambda tone: _generate_draft_reply(
             original_subject,
             original_sender,
             thread_content,
             tone,
             context
+        ),
+        missing
+    )
+    drafts.update(zip(missing, fallback_drafts))
+    
+    return _tone_variants_result(
+        original_subject, original_sender, [drafts[tone] for tone in TONES]
+    )
+
+async def agenerate_all_tone_variants(
+    original_subject: str,
+    original_sender: str,
+    thread_content: str,
+    context: Optional[str] = None,
+    single_call: bool = True
+) -> dict:
+    """
+    Async version of generate_all_tone_variants.
+    """
+    thread_content = normalize_content(thread_content, "draft", thread=True)
+    drafts, cache_keys = _cached_tone_variants(
+        original_subject, original_sender, thread_content, context
+    )
+    missing = [tone for tone in TONES if tone not in drafts]
+    
+    if single_call and len(missing) > 1:
+        multi_tone_prompt = _build_multi_tone_prompt(
+            original_subject, original_sender, thread_content, missing, context
         )
-        drafts.append(draft)
+        try:
+            response = await llm.ainvoke(multi_tone_prompt)
+            generated = _parse_tone_variants(response.content.strip(), missing, original_subject)
+        except Exception as e:
+            print(f"Error generating tone variants in one call: {str(e)}")
+            generated = {}
+        record_tier("draft", "llm", len(generated))
+        for tone, draft in generated.items():
+            _remember_draft(cache_keys[tone], draft)
+        drafts.update(generated)
+        missing = [tone for tone in missing if tone not in drafts]
     
-    return {
-        "original_subject": original_subject,
-        "original_sender": original_sender,
-        "drafts": drafts,
-        "timestamp": datetime.now().isoformat(),
-        "total_variants": len(drafts)
-    }
+    # Per-tone fallback (also the path when single_call is off)
+    fallback_drafts = await gather_bounded(
+        lambda tone: _agenerate_draft_reply(
+            original_subject,
+            original_sender,
+            thread_content,
+            tone,
+            context
+        ),
+        missing
+    )
+    drafts.update(zip(missing, fallback_drafts))
+    
+    return _tone_variants_result(
+        original_subject, original_sender, [drafts[tone] for tone in TONES]
+    )
+
+def _refined_draft(refined_body: str, tone: str) -> DraftReply:
+    preview = refined_body[:100] + "..." if len(refined_body) > 100 else refined_body
+    
+    return DraftReply(
+        tone=tone,
+        subject="(Refined)",  # Subject doesn't change
+        body=refined_body,
+        preview=preview,
+        timestamp=datetime.now().isoformat()
+    )
+
+def _refine_failed(e: Exception, current_draft: str, tone: str) -> DraftReply:
+    print(f"Error refining draft: {str(e)}")
+    return DraftReply(
+        tone=tone,
+        subject="(Refined)",
+        body=current_draft,
+        preview=current_draft[:100],
+        timestamp=datetime.now().isoformat()
+    )
 
 def refine_draft(
     current_draft: str,
@@ -216,38 +547,30 @@ def refine_draft(
     Returns:
         Updated DraftReply
     """
+    refine_prompt = REFINE_PROMPT.format(
+        current_draft=current_draft, feedback=feedback, tone=tone
+    )
     
-    refine_prompt = f"""You are an email refinement assistant. 
-    
-Current draft:
-{current_draft}
-
-User feedback for refinement:
-{feedback}
-
-Tone to maintain: {tone}
+    try:
+        response = llm.invoke(refine_prompt)
+        return _refined_draft(response.content.strip(), tone)
+    except Exception as e:
+        return _refine_failed(e, current_draft, tone)
 
-Please refine the draft based on the feedback while maintaining the {tone} tone.
-Return ONLY the refined email body (no JSON, just the plain text of the refined email):"""
+async def arefine_draft(
+    current_draft: str,
+    feedback: str,
+    tone: str = "professional"
+) -> DraftReply:
+    """
+    Async version of refine_draft built on ainvoke.
+    """
+    refine_prompt = REFINE_PROMPT.format(
+        current_draft=current_draft, feedback=feedback, tone=tone
+    )
     
     try:
-        response = llm.invoke([HumanMessage(content=refine_prompt)])
-        refined_body = response.content.strip()
-        preview = refined_body[:100] + "..." if len(refined_body) > 100 else refined_body
-        
-        return DraftReply(
-            tone=tone,
-            subject="(Refined)",  # Subject doesn't change
-            body=refined_body,
-            preview=preview,
-            timestamp=datetime.now().isoformat()
-        )
+        response = await llm.ainvoke(refine_prompt)
+        return _refined_draft(response.content.strip(), tone)
     except Exception as e:
-        print(f"Error refining draft: {str(e)}")
-        return DraftReply(
-            tone=tone,
-            subject="(Refined)",
-            body=current_draft,
-            preview=current_draft[:100],
-            timestamp=datetime.now().isoformat()
-        )
+        return _refine_failed(e, current_draft, tone)
@@ -0,0 +1,269 @@
+# email_analyzer.py
+import json
+from llm_provider import get_llm
+from pydantic import BaseModel
+from typing import List, Optional
+from concurrency import gather_bounded, map_bounded
+from response_cache import make_cache_key, response_cache
+from fast_tier import record_tier
+from email_classifier import ClassificationResponse, CLASSIFICATION_CATEGORIES, _classification_failed
+from email_priority_detector import PriorityAnalysis, _priority_from_data, _priority_failed
+from action_item_extractor import ActionItem, _action_items_from_data
+from email_normalizer import normalize_content
+from metrics import record_parse_failure
+
+# Shared LLM view for combined analysis
+llm = get_llm(temperature=0, module="analysis")  # Deterministic, so combined results can be cached
+
+class EmailAnalysisRequest(BaseModel):
+    """Request to analyze one email in a single pass"""
+    email_id: int = 0
+    subject: str
+    sender: str
+    content: str
+    sender_history: Optional[str] = None  # e.g., "VIP customer", "Internal team lead"
+
+class EmailAnalysis(BaseModel):
+    """Category, priority and action items of one email"""
+    email_id: int
+    classification: ClassificationResponse
+    priority: PriorityAnalysis
+    action_items: List[ActionItem]
+    tier: str = "llm"  # Which tier answered: cache or llm
+
+ANALYSIS_PROMPT = """You are an email analysis AI for a company inbox. Analyze the following email ONCE and return its category, its priority and its action items.
+
+Email Subject: {subject}
+From: {sender}{sender_context}
+Content:
+{content}
+
+1. CATEGORY - exactly ONE of: Support, Sales, Billing, Urgent, FYI
+- Support: support requests, technical issues, troubleshooting, help requests
+- Sales: sales inquiries, opportunities, proposals, pricing, contracts
+- Billing: invoices, payments, subscription changes, billing disputes
+- Urgent: time-sensitive, requires immediate action, emergencies
+- FYI: informational, announcements, updates, no action needed
+If it fits multiple, choose the PRIMARY category.
+
+2. PRIORITY
+- high (1-2 hours): URGENT, ASAP, CRITICAL, OUTAGE, DOWN; affects business continuity; escalations
+- medium (same day): should, need to, please review, feedback, follow up; standard business tasks
+- low (this week): FYI, optional, whenever, no rush; informational, can be deferred
+
+3. ACTION ITEMS - every explicit request ("Can you...", "Please..."), question requiring action
+and implicit task ("We should...", "Need to..."), with deadline clues (use YYYY-MM-DD or null)
+and ownership clues (names, departments, pronouns). Use an empty array if there are none.
+
+Return ONLY valid JSON (no other text):
+{{
+  "classification": {{
+    "category": "Category name",
+    "confidence": 0.95,
+    "reasoning": "Brief explanation of the category"
+  }},
+  "priority": {{
+    "priority_level": "high|medium|low",
+    "urgency_score": 1-10,
+    "confidence": 0.0-1.0,
+    "reasoning": "Brief explanation of priority assignment",
+    "detected_signals": ["signal1", "signal2"],
+    "suggested_action": "Recommended immediate action or 'Schedule for later' or 'Archive after review'"
+  }},
+  "action_items": [
+    {{
+      "title": "Send Q1 report",
+      "description": "Prepare and send the Q1 financial report",
+      "due_date": "2026-01-17",
+      "priority": "high|medium|low",
+      "suggested_assignee": "Mike",
+      "confidence": 0.95,
+      "reasoning": "Why this is an action item"
+    }}
+  ]
+}}"""
+
+def _build_analysis_prompt(
+    subject: str,
+    sender: str,
+    content: str,
+    sender_history: Optional[str] = None
+) -> str:
+    sender_context = f"\nSender Context: {sender_history}" if sender_history else ""
+    return ANALYSIS_PROMPT.format(
+        subject=subject, sender=sender, sender_context=sender_context, content=content
+    )
+
+def _parse_analysis(response_text: str, email_id: int) -> EmailAnalysis:
+    """Parse the model's JSON reply into an EmailAnalysis."""
+    # Extract JSON from response
+    start_idx = response_text.find('{')
+    end_idx = response_text.rfind('}') + 1
+    json_str = response_text[start_idx:end_idx]
+
+    result = json.loads(json_str)
+    classification_data = result.get("classification") or {}
+
+    category = classification_data.get("category", "FYI")
+    if category not in CLASSIFICATION_CATEGORIES:
+        category = "FYI"
+
+    return EmailAnalysis(
+        email_id=email_id,
+        classification=ClassificationResponse(
+            email_id=email_id,
+            category=category,
+            confidence=classification_data.get("confidence", 0.5),
+            reasoning=classification_data.get("reasoning", "")
+        ),
+        priority=_priority_from_data(result.get("priority") or {}),
+        action_items=_action_items_from_data(result.get("action_items") or [])
+    )
+
+def _analysis_failed(e: Exception, email_id: int) -> EmailAnalysis:
+    print(f"Error analyzing email: {str(e)}")
+    if isinstance(e, json.JSONDecodeError):
+        record_parse_failure("analysis")
+    classification = _classification_failed(e, module=None)
+    classification.email_id = email_id
+    return EmailAnalysis(
+        email_id=email_id,
+        classification=classification,
+        priority=_priority_failed(e, module=None),
+        action_items=[]
+    )
+
+def _cache_key(
+    subject: str,
+    sender: str,
+    content: str,
+    sender_history: Optional[str] = None
+) -> str:
+    return make_cache_key(
+        "analysis",
+        [subject, sender, content, sender_history or ""],
+        llm.model_name,
+        llm.temperature,
+        ANALYSIS_PROMPT
+    )
+
+def _cached_analysis(cache_key: str, email_id: int) -> Optional[EmailAnalysis]:
+    cached = response_cache.get(cache_key)
+    if cached is None:
+        return None
+    record_tier("analysis", "cache")
+    return EmailAnalysis(
+        email_id=email_id,
+        classification=ClassificationResponse(**{**cached["classification"], "email_id": email_id}),
+        priority=PriorityAnalysis(**cached["priority"]),
+        action_items=[ActionItem(**item) for item in cached["action_items"]],
+        tier="cache"
+    )
+
+def analyze_email(
+    subject: str,
+    sender: str,
+    content: str,
+    sender_history: Optional[str] = None,
+    email_id: int = 0
+) -> EmailAnalysis:
+    """
+    Classify an email, detect its priority and extract its action items
+    with a single LLM call.
+
+    Equivalent to calling classify_email, detect_email_priority and
+    extract_action_items, but the email is sent to the model once instead
+    of three times. Successful results are cached by content.
+
+    Args:
+        subject: Email subject line
+        sender: Sender email/name
+        content: Email body content
+        sender_history: Context about sender (e.g., "VIP customer", "CEO")
+        email_id: Id copied onto the result
+
+    Returns:
+        EmailAnalysis with classification, priority and action_items
+    """
+    content = normalize_content(content, "analysis")
+    cache_key = _cache_key(subject, sender, content, sender_history)
+    cached = _cached_analysis(cache_key, email_id)
+    if cached is not None:
+        return cached
+
+    analysis_prompt = _build_analysis_prompt(subject, sender, content, sender_history)
+
+    record_tier("analysis", "llm")
+    try:
+        response = llm.invoke(analysis_prompt)
+        result = _parse_analysis(response.content.strip(), email_id)
+        response_cache.set(cache_key, result.model_dump())
+        return result
+    except Exception as e:
+        return _analysis_failed(e, email_id)
+
+async def aanalyze_email(
+    subject: str,
+    sender: str,
+    content: str,
+    sender_history: Optional[str] = None,
+    email_id: int = 0
+) -> EmailAnalysis:
+    """
+    Async version of analyze_email built on ainvoke.
+    """
+    content = normalize_content(content, "analysis")
+    cache_key = _cache_key(subject, sender, content, sender_history)
+    cached = _cached_analysis(cache_key, email_id)
+    if cached is not None:
+        return cached
+
+    analysis_prompt = _build_analysis_prompt(subject, sender, content, sender_history)
+
+    record_tier("analysis", "llm")
+    try:
+        response = await llm.ainvoke(analysis_prompt)
+        result = _parse_analysis(response.content.strip(), email_id)
+        response_cache.set(cache_key, result.model_dump())
+        return result
+    except Exception as e:
+        return _analysis_failed(e, email_id)
+
+def _analyze_single(email: dict) -> EmailAnalysis:
+    return analyze_email(
+        email.get('subject', ''),
+        email.get('sender', ''),
+        email.get('content', ''),
+        email.get('sender_history'),
+        email.get('id', email.get('email_id', 0))
+    )
+
+async def _aanalyze_single(email: dict) -> EmailAnalysis:
+    return await aanalyze_email(
+        email.get('subject', ''),
+        email.get('sender', ''),
+        email.get('content', ''),
+        email.get('sender_history'),
+        email.get('id', email.get('email_id', 0))
+    )
+
+def batch_analyze_emails(
+    emails: List[dict],
+    max_concurrency: Optional[int] = None
+) -> List[EmailAnalysis]:
+    """
+    Analyze multiple emails, one LLM call per email.
+
+    Up to max_concurrency analyses run at once (LLM_MAX_CONCURRENCY by
+    default); results keep the order of the input emails.
+    """
+    return map_bounded(_analyze_single, emails, max_concurrency)
+
+async def abatch_analyze_emails(
+    emails: List[dict],
+    max_concurrency: Optional[int] = None
+) -> List[EmailAnalysis]:
+    """
+    Async version of batch_analyze_emails.
+    """
+    return await gather_bounded(_aanalyze_single, emails, max_concurrency)
@@ -1,28 +1,27 @@
 # email_classifier.py
 import os
-from dotenv import load_dotenv
-from langchain_groq import ChatGroq
-from langchain_core.messages import HumanMessage
+import json
+from llm_provider import get_llm
 from pydantic import BaseModel
 from typing import List, Optional
+from concurrency import gather_bounded, map_bounded
+from tokens import estimate_tokens, pack_by_token_budget
+from response_cache import hash_text, make_cache_key, response_cache
+from fast_tier import classify_by_rules, record_tier
+from email_normalizer import normalize_content, normalize_emails
+from local_classifier import classify_locally
+from near_duplicate import NearDuplicateIndex, group_near_duplicates, partition_key
+from metrics import record_parse_failure
 
-# Load .env
-load_dotenv()
-
-# Initialize LLM for classification
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
-    raise ValueError("GROQ_API_KEY environment variable not set")
-
-llm = ChatGroq(
-    model="openai/gpt-oss-120b",
-    temperature=0,  # Lower temperature for consistent classification
-    api_key=GROQ_API_KEY
-)
+# Shared LLM view for classification
+llm = get_llm(temperature=0, module="classification")  # Lower temperature for consistent classification
 
 # Classification categories
 CLASSIFICATION_CATEGORIES = ["Support", "Sales", "Billing", "Urgent", "FYI"]
 
+# LLM answers by email fingerprint, reused for near-duplicate emails
+classification_index = NearDuplicateIndex()
+
 class Email(BaseModel):
     id: int
     subject: str
@@ -42,6 +41,8 @@ class ClassificationResponse(BaseModel):
     category: str
     confidence: float
     reasoning: str
+    tier: str = "llm"  # Which tier answered: rules, cache, near_duplicate, local or llm
+    reused_from: Optional[int] = None  # Email whose answer was reused (near_duplicate tier)
 
 class InboxStats(BaseModel):
     total_emails: int
@@ -51,19 +52,7 @@ class InboxStats(BaseModel):
     urgent: int
     fyi: int
 
-def classify_email(subject: str, sender: str, content: str) -> ClassificationResponse:
-    """
-    Classify an email into one of the predefined categories using AI.
-    
-    Categories:
-    - Support: Customer support, technical issues, troubleshooting
-    - Sales: Sales inquiries, proposals, opportunities, pricing
-    - Billing: Invoices, payments, subscriptions, billing issues
-    - Urgent: Time-sensitive, requires immediate action
-    - FYI: Informational, announcements, updates, no action needed
-    """
-    
-    classification_prompt = f"""You are an email classification AI for a company inbox. Classify the following email into ONE category: Support, Sales, Billing, Urgent, or FYI.
+CLASSIFICATION_PROMPT = """You are an email classification AI for a company inbox. Classify the following email into ONE category: Support, Sales, Billing, Urgent, or FYI.
 
 Email Subject: {subject}
 From: {sender}
@@ -84,49 +73,515 @@ Respond in this exact JSON format:
     "confidence": 0.95,
     "reasoning": "Brief explanation of why this email was classified this way"
 }}"""
+
+def _parse_classification(response_text: str) -> ClassificationResponse:
+    """Parse the model's JSON reply into a ClassificationResponse."""
+    # Extract JSON from response
+    start_idx = response_text.find('{')
+    end_idx = response_text.rfind('}') + 1
+    json_str = response_text[start_idx:end_idx]
+    
+    result = json.loads(json_str)
+    
+    return ClassificationResponse(
+        email_id=0,  # Will be set by caller
+        category=result.get("category", "FYI"),
+        confidence=result.get("confidence", 0.5),
+        reasoning=result.get("reasoning", "")
+    )
+
+def _classification_failed(e: Exception, module: Optional[str] = "classification") -> ClassificationResponse:
+    print(f"Error classifying email: {str(e)}")
+    if module and isinstance(e, json.JSONDecodeError):
+        record_parse_failure(module)
+    # Default to FYI if classification fails
+    return ClassificationResponse(
+        email_id=0,
+        category="FYI",
+        confidence=0.0,
+        reasoning=f"Classification failed, defaulted to FYI. Error: {str(e)}"
+    )
+
+def _cache_key(subject: str, sender: str, content: str) -> str:
+    return make_cache_key(
+        "classification",
+        [subject, sender, content],
+        llm.model_name,
+        llm.temperature,
+        CLASSIFICATION_PROMPT
+    )
+
+def _near_duplicate_key(subject: str, sender: str, content: str) -> tuple:
+    return partition_key(sender), f"{subject}\n{content}"
+
+def _remember_classification(
+    subject: str,
+    sender: str,
+    content: str,
+    result: ClassificationResponse,
+    email_id: Optional[int]
+):
+    response_cache.set(_cache_key(subject, sender, content), {**result.model_dump(), "email_id": 0})
+    classification_index.add(
+        *_near_duplicate_key(subject, sender, content),
+        {**result.model_dump(), "reused_from": email_id}
+    )
+
+def _local_classification(subject: str, sender: str, content: str) -> Optional[ClassificationResponse]:
+    """
+    Answer from the rule-based fast tier, the response cache, a
+    near-duplicate of an email the LLM already classified (near_duplicate.py)
+    or the local model (local_classifier.py) when possible; None means the
+    email has to go to the LLM.
+    """
+    rule_result = classify_by_rules(subject, sender, content)
+    if rule_result is not None:
+        record_tier("classification", "rules")
+        return ClassificationResponse(email_id=0, tier="rules", **rule_result)
+    
+    cached = response_cache.get(_cache_key(subject, sender, content))
+    if cached is not None:
+        record_tier("classification", "cache")
+        return ClassificationResponse(**{**cached, "tier": "cache"})
+    
+    reused = classification_index.lookup(*_near_duplicate_key(subject, sender, content))
+    if reused is not None:
+        record_tier("classification", "near_duplicate")
+        return ClassificationResponse(**{**reused, "email_id": 0, "tier": "near_duplicate"})
+    
+    local_result = classify_locally(subject, sender, content, CLASSIFICATION_PROMPT_VERSION)
+    if local_result is not None:
+        record_tier("classification", "local")
+        return ClassificationResponse(email_id=0, tier="local", **local_result)
+    
+    return None
+
+def classify_email(
+    subject: str,
+    sender: str,
+    content: str,
+    email_id: Optional[int] = None
+) -> ClassificationResponse:
+    """
+    Classify an email into one of the predefined categories using AI.
     
+    Categories:
+    - Support: Customer support, technical issues, troubleshooting
+    - Sales: Sales inquiries, proposals, opportunities, pricing
+    - Billing: Invoices, payments, subscriptions, billing issues
+    - Urgent: Time-sensitive, requires immediate action
+    - FYI: Informational, announcements, updates, no action needed
+    
+    Obvious emails are decided by the rule-based fast tier (fast_tier.py),
+    successful LLM results are cached by content (response_cache.py) and
+    a local model trained on past LLM labels answers when it is confident
+    (local_classifier.py), so only ambiguous, unseen emails call the model.
+    Near-duplicates of an email the LLM already classified reuse its answer
+    (tier near_duplicate, reused_from set to email_id of that email).
+    """
+    content = normalize_content(content, "classification")
+    return _classify_email(subject, sender, content, email_id)
+
+def _classify_email(
+    subject: str,
+    sender: str,
+    content: str,
+    email_id: Optional[int]
+) -> ClassificationResponse:
+    """classify_email for content that is already normalized."""
+    local_result = _local_classification(subject, sender, content)
+    if local_result is not None:
+        return local_result
+    
+    classification_prompt = CLASSIFICATION_PROMPT.format(
+        subject=subject, sender=sender, content=content
+    )
+    
+    record_tier("classification", "llm")
     try:
-        response = llm.invoke([HumanMessage(content=classification_prompt)])
-        
-        # Parse the response
-        import json
-        response_text = response.content
-        
-        # Extract JSON from response
-        start_idx = response_text.find('{')
-        end_idx = response_text.rfind('}') + 1
-        json_str = response_text[start_idx:end_idx]
-        
-        result = json.loads(json_str)
-        
-        return ClassificationResponse(
-            email_id=0,  # Will be set by caller
-            category=result.get("category", "FYI"),
-            confidence=result.get("confidence", 0.5),
-            reasoning=result.get("reasoning", "")
-        )
+        response = llm.invoke(classification_prompt)
+        result = _parse_classification(response.content)
+        _remember_classification(subject, sender, content, result, email_id)
+        return result
+    except Exception as e:
+        return _classification_failed(e)
+
+async def aclassify_email(
+    subject: str,
+    sender: str,
+    content: str,
+    email_id: Optional[int] = None
+) -> ClassificationResponse:
+    """
+    Async version of classify_email. Awaits the LLM call so the event loop
+    keeps serving other requests while Groq responds.
+    """
+    content = normalize_content(content, "classification")
+    return await _aclassify_email(subject, sender, content, email_id)
+
+async def _aclassify_email(
+    subject: str,
+    sender: str,
+    content: str,
+    email_id: Optional[int]
+) -> ClassificationResponse:
+    """aclassify_email for content that is already normalized."""
+    local_result = _local_classification(subject, sender, content)
+    if local_result is not None:
+        return local_result
+    
+    classification_prompt = CLASSIFICATION_PROMPT.format(
+        subject=subject, sender=sender, content=content
+    )
+    
+    record_tier("classification", "llm")
+    try:
+        response = await llm.ainvoke(classification_prompt)
+        result = _parse_classification(response.content)
+        _remember_classification(subject, sender, content, result, email_id)
+        return result
     except Exception as e:
-        print(f"Error classifying email: {str(e)}")
-        # Default to FYI if classification fails
-        return ClassificationResponse(
-            email_id=0,
-            category="FYI",
-            confidence=0.0,
-            reasoning=f"Classification failed, defaulted to FYI. Error: {str(e)}"
+        return _classification_failed(e)
+
+PACKED_CLASSIFICATION_PROMPT = """You are an email classification AI for a company inbox. Classify EACH of the following emails into ONE category: Support, Sales, Billing, Urgent, or FYI.
+
+Rules for classification:
+1. Support - Customer support requests, technical issues, troubleshooting, help requests
+2. Sales - Sales inquiries, new business opportunities, proposals, pricing discussions, contracts
+3. Billing - Invoices, payment confirmations, subscription changes, billing disputes, payment requests
+4. Urgent - Time-sensitive content, requires immediate action, deadlines mentioned, emergency situations
+5. FYI - Informational emails, announcements, updates, meeting summaries, no action needed
+
+Important: Each email can only be ONE category. If it fits multiple, choose the PRIMARY category.
+
+{emails}
+
+Respond with ONLY a JSON array containing one object per email, using the email id shown above:
+[
+    {{
+        "id": "1",
+        "category": "Category name",
+        "confidence": 0.95,
+        "reasoning": "Brief explanation of why this email was classified this way"
+    }}
+]"""
+
+PACKED_EMAIL_BLOCK = """=== Email id: {key} ===
+Email Subject: {subject}
+From: {sender}
+Content: {content}
+"""
+
+# Input token budget for one packed prompt and a hard cap on emails per
+# prompt (the reply grows with every email, too)
+PACKED_TOKEN_BUDGET = int(os.getenv("PACKED_PROMPT_TOKEN_BUDGET", "6000"))
+PACKED_MAX_EMAILS = int(os.getenv("PACKED_PROMPT_MAX_EMAILS", "20"))
+
+# Identifies the prompts and model behind a stored classification; stored
+# categories from another version are stale (see classification_store.py)
+CLASSIFICATION_PROMPT_VERSION = hash_text(
+    llm.model_name + CLASSIFICATION_PROMPT + PACKED_CLASSIFICATION_PROMPT
+)[:16]
+
+def _packed_email_block(key: str, email: dict) -> str:
+    return PACKED_EMAIL_BLOCK.format(
+        key=key,
+        subject=email.get('subject', ''),
+        sender=email.get('sender', ''),
+        content=email.get('content', '')
+    )
+
+def _pack_emails(emails: List[dict], token_budget: Optional[int], skip: dict) -> List[List[int]]:
+    """Group the indexes of emails not in skip into packs that fit the token budget."""
+    budget = (token_budget or PACKED_TOKEN_BUDGET) - estimate_tokens(PACKED_CLASSIFICATION_PROMPT)
+    return pack_by_token_budget(
+        [idx for idx in range(len(emails)) if idx not in skip],
+        lambda idx: estimate_tokens(_packed_email_block(str(idx), emails[idx])),
+        budget,
+        PACKED_MAX_EMAILS
+    )
+
+def _build_packed_prompt(emails: List[dict], pack: List[int]) -> str:
+    # Keys are positions within the pack so duplicate or missing email ids
+    # in the input cannot collide in the reply
+    blocks = [_packed_email_block(str(pos + 1), emails[idx]) for pos, idx in enumerate(pack)]
+    return PACKED_CLASSIFICATION_PROMPT.format(emails="\n".join(blocks))
+
+def _local_classifications(emails: List[dict], skip: dict) -> dict:
+    """Return {email index: ClassificationResponse} for emails not in skip decided without the LLM."""
+    local = {}
+    for idx, email in enumerate(emails):
+        if idx in skip:
+            continue
+        result = _local_classification(email.get('subject', ''), email.get('sender', ''), email.get('content', ''))
+        if result is not None:
+            result.email_id = email.get('id', 0)
+            local[idx] = result
+    return local
+
+def _near_duplicate_followers(emails: List[dict]) -> dict:
+    """{email index: index of an earlier near-duplicate in the batch}; followers reuse its result."""
+    if not classification_index.enabled:
+        return {}
+    return group_near_duplicates([
+        _near_duplicate_key(email.get('subject', ''), email.get('sender', ''), email.get('content', ''))
+        for email in emails
+    ])
+
+def _reuse_for_followers(emails: List[dict], followers: dict, results: dict) -> List[int]:
+    """
+    Copy each leader's result to its followers. Followers of a leader whose
+    classification failed are returned instead, to be classified themselves.
+    """
+    unresolved = []
+    for idx, leader in followers.items():
+        # Failed classifications report zero confidence (_classification_failed)
+        if results[leader].confidence <= 0:
+            unresolved.append(idx)
+            continue
+        record_tier("classification", "near_duplicate")
+        results[idx] = ClassificationResponse(**{
+            **results[leader].model_dump(),
+            "email_id": emails[idx].get('id', 0),
+            "tier": "near_duplicate",
+            "reused_from": emails[leader].get('id')
+        })
+    return unresolved
+
+def _parse_packed_classifications(response_text: str, emails: List[dict], pack: List[int]) -> dict:
+    """
+    Parse a packed reply into {email index: ClassificationResponse}.
+    Entries that are missing or malformed are left out so the caller can
+    retry them one by one.
+    """
+    parsed = {}
+    try:
+        start_idx = response_text.find('[')
+        end_idx = response_text.rfind(']') + 1
+        items = json.loads(response_text[start_idx:end_idx])
+    except Exception as e:
+        print(f"Error parsing packed classification: {str(e)}")
+        record_parse_failure("classification")
+        return parsed
+    
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            pos = int(str(item.get("id", "")).strip()) - 1
+        except ValueError:
+            continue
+        if 0 <= pos < len(pack) and item.get("category") in CLASSIFICATION_CATEGORIES:
+            idx = pack[pos]
+            parsed[idx] = ClassificationResponse(
+                email_id=emails[idx].get('id', 0),
+                category=item["category"],
+                confidence=item.get("confidence", 0.5),
+                reasoning=item.get("reasoning", "")
+            )
+            _remember_classification(
+                emails[idx].get('subject', ''),
+                emails[idx].get('sender', ''),
+                emails[idx].get('content', ''),
+                parsed[idx],
+                emails[idx].get('id')
+            )
+            record_tier("classification", "llm")
+    
+    return parsed
+
+def classify_emails_packed(
+    emails: List[dict],
+    token_budget: Optional[int] = None,
+    max_concurrency: Optional[int] = None
+) -> List[ClassificationResponse]:
+    """
+    Classify many emails with one prompt per pack instead of one per email.
+    
+    Emails are grouped so each prompt stays within token_budget
+    (PACKED_PROMPT_TOKEN_BUDGET by default), so the rules block is sent once
+    per pack. Emails decided by the fast tier or the response cache are not
+    sent, near-duplicates within the batch are sent once, and emails missing
+    from a reply fall back to classify_email. Results are returned
+    in input order.
+    """
+    emails = normalize_emails(emails, "classification")
+    followers = _near_duplicate_followers(emails)
+    results = _local_classifications(emails, skip=followers)
+    packs = _pack_emails(emails, token_budget, skip={**results, **followers})
+    
+    def classify_pack(pack: List[int]) -> dict:
+        prompt = _build_packed_prompt(emails, pack)
+        try:
+            response = llm.invoke(prompt)
+            return _parse_packed_classifications(response.content, emails, pack)
+        except Exception as e:
+            print(f"Error classifying packed emails: {str(e)}")
+            return {}
+    
+    for parsed in map_bounded(classify_pack, packs, max_concurrency):
+        results.update(parsed)
+    
+    def classify_single(idx: int) -> ClassificationResponse:
+        email = emails[idx]
+        result = _classify_email(
+            email.get('subject', ''), email.get('sender', ''), email.get('content', ''), email.get('id')
         )
+        result.email_id = email.get('id', 0)
+        return result
+    
+    missing = [idx for idx in range(len(emails)) if idx not in results and idx not in followers]
+    results.update(zip(missing, map_bounded(classify_single, missing, max_concurrency)))
+    unresolved = _reuse_for_followers(emails, followers, results)
+    results.update(zip(unresolved, map_bounded(classify_single, unresolved, max_concurrency)))
+    
+    return [results[idx] for idx in range(len(emails))]
 
-def batch_classify_emails(emails: List[Email]) -> List[Email]:
+async def aclassify_emails_packed(
+    emails: List[dict],
+    token_budget: Optional[int] = None,
+    max_concurrency: Optional[int] = None
+) -> List[ClassificationResponse]:
+    """
+    Async version of classify_emails_packed.
+    """
+    emails = normalize_emails(emails, "classification")
+    followers = _near_duplicate_followers(emails)
+    results = _local_classifications(emails, skip=followers)
+    packs = _pack_emails(emails, token_budget, skip={**results, **followers})
+    
+    async def classify_pack(pack: List[int]) -> dict:
+        prompt = _build_packed_prompt(emails, pack)
+        try:
+            response = await llm.ainvoke(prompt)
+            return _parse_packed_classifications(response.content, emails, pack)
+        except Exception as e:
+            print(f"Error classifying packed emails: {str(e)}")
+            return {}
+    
+    for parsed in await gather_bounded(classify_pack, packs, max_concurrency):
+        results.update(parsed)
+    
+    async def classify_single(idx: int) -> ClassificationResponse:
+        email = emails[idx]
+        result = await _aclassify_email(
+            email.get('subject', ''), email.get('sender', ''), email.get('content', ''), email.get('id')
+        )
+        result.email_id = email.get('id', 0)
+        return result
+    
+    missing = [idx for idx in range(len(emails)) if idx not in results and idx not in followers]
+    results.update(zip(missing, await gather_bounded(classify_single, missing, max_concurrency)))
+    unresolved = _reuse_for_followers(emails, followers, results)
+    results.update(zip(unresolved, await gather_bounded(classify_single, unresolved, max_concurrency)))
+    
+    return [results[idx] for idx in range(len(emails))]
+
+def classify_emails(
+    emails: List[dict],
+    max_concurrency: Optional[int] = None
+) -> List[ClassificationResponse]:
+    """
+    Classify many emails with one classify_email call each, except that
+    near-duplicates within the batch (see near_duplicate.py) are classified
+    once and the others reuse that result (or are classified themselves if
+    it failed). Results are returned in input order and carry the email's id.
+    """
+    emails = normalize_emails(emails, "classification")
+    followers = _near_duplicate_followers(emails)
+    
+    def classify_single(idx: int) -> ClassificationResponse:
+        email = emails[idx]
+        result = _classify_email(
+            email.get('subject', ''), email.get('sender', ''), email.get('content', ''), email.get('id')
+        )
+        result.email_id = email.get('id', 0)
+        return result
+    
+    leaders = [idx for idx in range(len(emails)) if idx not in followers]
+    results = dict(zip(leaders, map_bounded(classify_single, leaders, max_concurrency)))
+    unresolved = _reuse_for_followers(emails, followers, results)
+    results.update(zip(unresolved, map_bounded(classify_single, unresolved, max_concurrency)))
+    
+    return [results[idx] for idx in range(len(emails))]
+
+async def aclassify_emails(
+    emails: List[dict],
+    max_concurrency: Optional[int] = None
+) -> List[ClassificationResponse]:
+    """
+    Async version of classify_emails.
+    """
+    emails = normalize_emails(emails, "classification")
+    followers = _near_duplicate_followers(emails)
+    
+    async def classify_single(idx: int) -> ClassificationResponse:
+        email = emails[idx]
+        result = await _aclassify_email(
+            email.get('subject', ''), email.get('sender', ''), email.get('content', ''), email.get('id')
+        )
+        result.email_id = email.get('id', 0)
+        return result
+    
+    leaders = [idx for idx in range(len(emails)) if idx not in followers]
+    results = dict(zip(leaders, await gather_bounded(classify_single, leaders, max_concurrency)))
+    unresolved = _reuse_for_followers(emails, followers, results)
+    results.update(zip(unresolved, await gather_bounded(classify_single, unresolved, max_concurrency)))
+    
+    return [results[idx] for idx in range(len(emails))]
+
+def batch_classify_emails(
+    emails: List[Email],
+    max_concurrency: Optional[int] = None,
+    packed: bool = False
+) -> List[Email]:
     """
     Classify multiple emails and return them with categories assigned.
+    
+    Up to max_concurrency classifications run at once (LLM_MAX_CONCURRENCY
+    by default); emails are returned in their original order and
+    near-duplicates are classified once (see classify_emails). With packed,
+    several emails share each prompt (see classify_emails_packed).
     """
-    classified_emails = []
+    if packed:
+        classifications = classify_emails_packed(
+            [email.model_dump() for email in emails],
+            max_concurrency=max_concurrency
+        )
+    else:
+        classifications = classify_emails(
+            [email.model_dump() for email in emails],
+            max_concurrency
+        )
     
-    for email in emails:
-        classification = classify_email(email.subject, email.sender, email.content)
+    for email, classification in zip(emails, classifications):
+        email.category = classification.category
+    
+    return list(emails)
+
+async def abatch_classify_emails(
+    emails: List[Email],
+    max_concurrency: Optional[int] = None,
+    packed: bool = False
+) -> List[Email]:
+    """
+    Async version of batch_classify_emails.
+    """
+    if packed:
+        classifications = await aclassify_emails_packed(
+            [email.model_dump() for email in emails],
+            max_concurrency=max_concurrency
+        )
+    else:
+        classifications = await aclassify_emails(
+            [email.model_dump() for email in emails],
+            max_concurrency
+        )
+    
+    for email, classification in zip(emails, classifications):
         email.category = classification.category
-        classified_emails.append(email)
     
-    return classified_emails
+    return list(emails)
 
 def get_inbox_statistics(emails: List[Email]) -> InboxStats:
     """
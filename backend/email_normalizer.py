@@ -0,0 +1,168 @@
+# email_normalizer.py
+import os
+import re
+import threading
+from typing import List
+from tokens import estimate_tokens
+
+# Strip quoted history, signatures and boilerplate before prompting
+NORMALIZATION_ENABLED = os.getenv("EMAIL_NORMALIZATION_ENABLED", "1") != "0"
+
+# Everything after one of these lines is an earlier message being quoted
+_QUOTE_HEADERS = [
+    re.compile(r"^\s*On\b.{0,200}\bwrote:\s*$", re.IGNORECASE),
+    re.compile(r"^\s*-{2,}\s*(Original|Forwarded) Message\s*-{2,}\s*$", re.IGNORECASE),
+    re.compile(r"^\s*Begin forwarded message:\s*$", re.IGNORECASE),
+    re.compile(r"^_{10,}\s*$"),  # Outlook's rule above the quoted headers
+]
+# Outlook-style quoted header block: "From: ..." followed closely by "Sent: ..."
+_OUTLOOK_FROM = re.compile(r"^\s*From:\s", re.IGNORECASE)
+_OUTLOOK_SENT = re.compile(r"^\s*(Sent|Date):\s", re.IGNORECASE)
+# A header block right after a line of dashes starts the next message of a
+# '---'-separated thread, not quoted history
+_SEPARATOR_LINE = re.compile(r"^\s*-{3,}\s*$")
+
+_QUOTED_LINE = re.compile(r"^\s*>")
+_SIGNATURE_DELIMITER = re.compile(r"^--\s*$")
+_MOBILE_FOOTER = re.compile(r"^\s*(Sent from my \w+|Get Outlook for \w+).*$", re.IGNORECASE)
+# Sign-offs are only treated as the start of a signature near the end
+_SIGN_OFF = re.compile(
+    r"^\s*((best|kind|warm|many)\s+)?(regards|thanks|thank you|cheers|sincerely|best)[\s,.!]*$",
+    re.IGNORECASE
+)
+_SIGN_OFF_WINDOW = 6  # Non-empty lines from the end
+
+_DISCLAIMER = re.compile(
+    r"(this (e-?mail|message)[^.]{0,80}(confidential|privileged|intended (solely )?for)"
+    r"|intended recipient"
+    r"|to unsubscribe|unsubscribe from"
+    r"|please consider the environment before printing)",
+    re.IGNORECASE
+)
+
+# Thread messages (draft replies) are separated by a line of dashes, as in
+# thread_summarizer.py; of their header lines only From: is worth keeping
+_MESSAGE_SEPARATOR = re.compile(r"\n\s*-{3,}\s*\n")
+_DROPPED_HEADER = re.compile(r"^\s*(To|Cc|Bcc|Date|Sent|Subject|Reply-To):\s", re.IGNORECASE)
+
+# Per-analyzer token savings
+_lock = threading.Lock()
+normalization_counters = {}
+
+def _follows_separator(lines: list, idx: int) -> bool:
+    previous = [line for line in lines[:idx] if line.strip()]
+    return bool(previous) and bool(_SEPARATOR_LINE.match(previous[-1]))
+
+def _cut_quoted_history(lines: list) -> list:
+    for idx, line in enumerate(lines):
+        if any(pattern.match(line) for pattern in _QUOTE_HEADERS):
+            return lines[:idx]
+        if idx > 0 and _OUTLOOK_FROM.match(line) and any(
+            _OUTLOOK_SENT.match(following) for following in lines[idx + 1:idx + 4]
+        ) and not _follows_separator(lines, idx):
+            return lines[:idx]
+    return [line for line in lines if not _QUOTED_LINE.match(line)]
+
+def _cut_signature(lines: list) -> list:
+    for idx, line in enumerate(lines):
+        if _SIGNATURE_DELIMITER.match(line):
+            lines = lines[:idx]
+            break
+    lines = [line for line in lines if not _MOBILE_FOOTER.match(line)]
+
+    non_empty = [idx for idx, line in enumerate(lines) if line.strip()]
+    for idx in non_empty[-_SIGN_OFF_WINDOW:]:
+        if _SIGN_OFF.match(lines[idx]):
+            return lines[:idx]
+    return lines
+
+def _drop_disclaimers(text: str) -> str:
+    paragraphs = re.split(r"\n\s*\n", text)
+    return "\n\n".join(p for p in paragraphs if not _DISCLAIMER.search(p))
+
+def _collapse_whitespace(text: str) -> str:
+    lines = [re.sub(r"[ \t]+", " ", line).strip() for line in text.split("\n")]
+    text = "\n".join(lines)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+def _normalize_body(text: str) -> str:
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    lines = _cut_quoted_history(lines)
+    lines = _cut_signature(lines)
+    return _collapse_whitespace(_drop_disclaimers("\n".join(lines)))
+
+def _normalize_message(message: str) -> str:
+    lines = message.strip("\n").split("\n")
+    header = []
+    while lines and re.match(r"^\s*[A-Za-z-]+:\s", lines[0]) and (
+        _OUTLOOK_FROM.match(lines[0]) or _DROPPED_HEADER.match(lines[0])
+    ):
+        line = lines.pop(0)
+        if not _DROPPED_HEADER.match(line):
+            header.append(line.strip())
+    body = _normalize_body("\n".join(lines))
+    return "\n".join(header + ([body] if body else []))
+
+def _record(analyzer: str, before: int, after: int):
+    with _lock:
+        counters = normalization_counters.setdefault(
+            analyzer, {"emails": 0, "tokens_before": 0, "tokens_after": 0}
+        )
+        counters["emails"] += 1
+        counters["tokens_before"] += before
+        counters["tokens_after"] += after
+
+def normalize_with_report(text: str, thread: bool = False) -> tuple:
+    """
+    Normalize an email body (or, with thread, a '---'-separated thread)
+    and report the estimated tokens saved. Never returns an empty body for
+    non-empty input: if everything would be stripped, the input is kept.
+
+    Returns (normalized_text, {"original_tokens", "normalized_tokens", "saved_tokens"}).
+    """
+    if thread:
+        messages = [_normalize_message(message) for message in _MESSAGE_SEPARATOR.split(text or "")]
+        normalized = "\n\n---\n".join(message for message in messages if message)
+    else:
+        normalized = _normalize_body(text or "")
+    if not normalized.strip():
+        normalized = (text or "").strip()
+
+    before = estimate_tokens(text or "")
+    after = estimate_tokens(normalized)
+    return normalized, {
+        "original_tokens": before,
+        "normalized_tokens": after,
+        "saved_tokens": before - after
+    }
+
+def normalize_content(text: str, analyzer: str, thread: bool = False) -> str:
+    """
+    Text to embed in an analyzer's prompt: the normalized body when
+    EMAIL_NORMALIZATION_ENABLED, else the input unchanged. Savings are
+    counted per analyzer (see normalization_stats), so each analyzer calls
+    this once per email at its entry point and passes the result down.
+    """
+    if not NORMALIZATION_ENABLED or not text:
+        return text
+    normalized, report = normalize_with_report(text, thread)
+    _record(analyzer, report["original_tokens"], report["normalized_tokens"])
+    return normalized
+
+def normalize_emails(emails: List[dict], analyzer: str) -> List[dict]:
+    """Copies of the email dicts with their content run through normalize_content."""
+    return [{**email, "content": normalize_content(email.get('content', ''), analyzer)} for email in emails]
+
+def normalization_stats() -> dict:
+    with _lock:
+        stats = {"enabled": NORMALIZATION_ENABLED}
+        for analyzer, counters in normalization_counters.items():
+            before = counters["tokens_before"]
+            saved = before - counters["tokens_after"]
+            stats[analyzer] = {
+                **counters,
+                "tokens_saved": saved,
+                "avg_tokens_saved_per_email": saved / counters["emails"] if counters["emails"] else 0.0,
+                "saved_fraction": saved / before if before else 0.0
+            }
+        return stats
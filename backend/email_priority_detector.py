@@ -1,26 +1,34 @@
 # email_priority_detector.py
 import os
 import json
-from dotenv import load_dotenv
-from langchain_groq import ChatGroq
-from langchain_core.messages import HumanMessage
+from llm_provider import get_llm
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
+from concurrency import gather_bounded, map_bounded
+from tokens import estimate_tokens, pack_by_token_budget
+from response_cache import ResponseCache, make_cache_key, response_cache
+from fast_tier import detect_priority_by_rules, record_tier
+from keywords import URGENT_KEYWORDS, DELAY_KEYWORDS, MEDIUM_KEYWORDS, LOW_KEYWORDS
+from email_normalizer import normalize_content, normalize_emails
+from near_duplicate import NearDuplicateIndex, group_near_duplicates, partition_key
+from metrics import record_parse_failure
 
-# Load .env
-load_dotenv()
+# Shared LLM view for priority detection
+llm = get_llm(temperature=0, module="priority")  # Consistency critical for priority classification
 
-# Initialize LLM for priority detection
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
-    raise ValueError("GROQ_API_KEY environment variable not set")
+# Priority levels
+PRIORITY_LEVELS = ["high", "medium", "low"]
 
-llm = ChatGroq(
-    model="openai/gpt-oss-120b",
-    temperature=0,  # Consistency critical for priority classification
-    api_key=GROQ_API_KEY
-)
+# Per-email memo for batch detection, keyed by email content. Unlike the
+# shared response cache it cannot be switched off and also keeps rule-tier
+# results, so filtering or ranking the same inbox again (or an inbox with
+# repeated emails) sends each email to the model at most once.
+PRIORITY_MEMO_MAX_ENTRIES = int(os.getenv("PRIORITY_MEMO_MAX_ENTRIES", "10000"))
+priority_memo = ResponseCache(max_entries=PRIORITY_MEMO_MAX_ENTRIES, db_path=None, enabled=True)
+
+# LLM answers by email fingerprint, reused for near-duplicate emails
+priority_index = NearDuplicateIndex()
 
 # Pydantic models
 class PriorityAnalysis(BaseModel):
@@ -31,6 +39,9 @@ class PriorityAnalysis(BaseModel):
     reasoning: str
     detected_signals: List[str]
     suggested_action: str
+    tier: str = "llm"  # Which tier answered: rules, cache, near_duplicate or llm
+    email_id: Optional[int] = None  # Set by the batch helpers
+    reused_from: Optional[int] = None  # Email whose answer was reused (near_duplicate tier)
 
 class PriorityDetectionRequest(BaseModel):
     """Request to detect email priority"""
@@ -48,54 +59,7 @@ class PriorityStats(BaseModel):
     high_percentage: float
     avg_urgency_score: float
 
-# Key phrases for priority detection
-URGENT_KEYWORDS = [
-    "urgent", "asap", "immediately", "critical", "emergency", "alert",
-    "severe", "crisis", "down", "outage", "failure", "broken", "issue",
-    "must", "cannot wait", "right now", "today", "this hour", "deadline",
-    "overdue", "late", "delayed", "stuck", "blocked", "unblocked needed"
-]
-
-DELAY_KEYWORDS = [
-    "delay", "postpone", "push back", "reschedule", "extend", "defer",
-    "later", "next week", "soon", "eventually", "when possible"
-]
-
-MEDIUM_KEYWORDS = [
-    "should", "need to", "would like", "please review", "feedback",
-    "progress", "update", "check", "follow up", "reminder", "fyi"
-]
-
-LOW_KEYWORDS = [
-    "fyi", "for your information", "heads up", "note", "just so you know",
-    "btw", "by the way", "optional", "whenever", "no rush", "low priority"
-]
-
-def detect_email_priority(
-    subject: str,
-    sender: str,
-    content: str,
-    sender_history: Optional[str] = None
-) -> PriorityAnalysis:
-    """
-    Detect email priority level using AI analysis.
-    
-    Args:
-        subject: Email subject line
-        sender: Sender email/name
-        content: Email body content
-        sender_history: Context about sender (e.g., "VIP customer", "CEO")
-    
-    Returns:
-        PriorityAnalysis with priority level and reasoning
-    """
-    
-    # Combine email content for analysis
-    full_content = f"Subject: {subject}\nFrom: {sender}\n\nContent:\n{content}"
-    
-    sender_context = f"\nSender Context: {sender_history}" if sender_history else ""
-    
-    priority_prompt = f"""You are an email priority detection AI. Analyze the following email and determine its priority level.
+PRIORITY_PROMPT = """You are an email priority detection AI. Analyze the following email and determine its priority level.
 
 Email:
 {full_content}
@@ -132,87 +96,468 @@ Analyze the email and return ONLY valid JSON (no other text):
 }}
 
 Detect priority now:"""
+
+def _build_priority_prompt(
+    subject: str,
+    sender: str,
+    content: str,
+    sender_history: Optional[str] = None
+) -> str:
+    # Combine email content for analysis
+    full_content = f"Subject: {subject}\nFrom: {sender}\n\nContent:\n{content}"
     
-    try:
-        response = llm.invoke([HumanMessage(content=priority_prompt)])
-        response_text = response.content.strip()
-        
-        # Extract JSON from response
-        start_idx = response_text.find('{')
-        end_idx = response_text.rfind('}') + 1
-        
-        if start_idx == -1 or end_idx == 0:
-            return PriorityAnalysis(
-                priority_level="medium",
-                confidence=0.5,
-                urgency_score=5,
-                reasoning="Default priority - could not parse AI response",
-                detected_signals=["parsing_error"],
-                suggested_action="Review manually"
-            )
-        
-        json_str = response_text[start_idx:end_idx]
-        priority_data = json.loads(json_str)
-        
-        return PriorityAnalysis(
-            priority_level=priority_data.get('priority_level', 'medium').lower(),
-            urgency_score=int(priority_data.get('urgency_score', 5)),
-            confidence=float(priority_data.get('confidence', 0.5)),
-            reasoning=priority_data.get('reasoning', ''),
-            detected_signals=priority_data.get('detected_signals', []),
-            suggested_action=priority_data.get('suggested_action', 'Review')
-        )
+    sender_context = f"\nSender Context: {sender_history}" if sender_history else ""
     
-    except json.JSONDecodeError as e:
-        print(f"JSON parsing error in priority detection: {str(e)}")
+    return PRIORITY_PROMPT.format(full_content=full_content, sender_context=sender_context)
+
+def _parse_priority(response_text: str) -> PriorityAnalysis:
+    """Parse the model's JSON reply into a PriorityAnalysis."""
+    # Extract JSON from response
+    start_idx = response_text.find('{')
+    end_idx = response_text.rfind('}') + 1
+    
+    if start_idx == -1 or end_idx == 0:
+        record_parse_failure("priority")
         return PriorityAnalysis(
             priority_level="medium",
-            confidence=0.3,
+            confidence=0.5,
             urgency_score=5,
-            reasoning=f"JSON parsing error: {str(e)}",
+            reasoning="Default priority - could not parse AI response",
             detected_signals=["parsing_error"],
             suggested_action="Review manually"
         )
-    except Exception as e:
-        print(f"Error detecting priority: {str(e)}")
+    
+    json_str = response_text[start_idx:end_idx]
+    priority_data = json.loads(json_str)
+    
+    return _priority_from_data(priority_data)
+
+def _priority_from_data(priority_data: dict) -> PriorityAnalysis:
+    return PriorityAnalysis(
+        priority_level=priority_data.get('priority_level', 'medium').lower(),
+        urgency_score=int(priority_data.get('urgency_score', 5)),
+        confidence=float(priority_data.get('confidence', 0.5)),
+        reasoning=priority_data.get('reasoning', ''),
+        detected_signals=priority_data.get('detected_signals', []),
+        suggested_action=priority_data.get('suggested_action', 'Review')
+    )
+
+def _priority_failed(e: Exception, module: Optional[str] = "priority") -> PriorityAnalysis:
+    if isinstance(e, json.JSONDecodeError):
+        print(f"JSON parsing error in priority detection: {str(e)}")
+        if module:
+            record_parse_failure(module)
         return PriorityAnalysis(
             priority_level="medium",
-            confidence=0.2,
+            confidence=0.3,
             urgency_score=5,
-            reasoning=f"Error: {str(e)}",
-            detected_signals=["error"],
+            reasoning=f"JSON parsing error: {str(e)}",
+            detected_signals=["parsing_error"],
             suggested_action="Review manually"
         )
+    print(f"Error detecting priority: {str(e)}")
+    return PriorityAnalysis(
+        priority_level="medium",
+        confidence=0.2,
+        urgency_score=5,
+        reasoning=f"Error: {str(e)}",
+        detected_signals=["error"],
+        suggested_action="Review manually"
+    )
 
-def batch_detect_priorities(emails: List[dict]) -> dict:
+def _cache_key(
+    subject: str,
+    sender: str,
+    content: str,
+    sender_history: Optional[str] = None
+) -> str:
+    return make_cache_key(
+        "priority",
+        [subject, sender, content, sender_history or ""],
+        llm.model_name,
+        llm.temperature,
+        PRIORITY_PROMPT
+    )
+
+def _near_duplicate_key(subject: str, sender: str, content: str, sender_history: Optional[str]) -> tuple:
+    # Sender context changes the answer, so it is part of the partition
+    return partition_key(sender, sender_history), f"{subject}\n{content}"
+
+def _remember_priority(
+    subject: str,
+    sender: str,
+    content: str,
+    sender_history: Optional[str],
+    result: PriorityAnalysis,
+    email_id: Optional[int]
+):
+    response_cache.set(_cache_key(subject, sender, content, sender_history), result.model_dump())
+    priority_index.add(
+        *_near_duplicate_key(subject, sender, content, sender_history),
+        {**result.model_dump(), "email_id": None, "reused_from": email_id}
+    )
+
+def _local_priority(
+    subject: str,
+    sender: str,
+    content: str,
+    sender_history: Optional[str] = None
+) -> Optional[PriorityAnalysis]:
     """
-    Detect priorities for multiple emails.
+    Answer from the rule-based fast tier, the response cache or a
+    near-duplicate of an email the LLM already analyzed (near_duplicate.py)
+    when possible; None means the email has to go to the LLM.
+    """
+    # Sender context (VIP, CEO, ...) can outweigh keywords, so leave those to the model
+    rule_result = None if sender_history else detect_priority_by_rules(subject, sender, content)
+    if rule_result is not None:
+        record_tier("priority", "rules")
+        return PriorityAnalysis(tier="rules", **rule_result)
+    
+    cached = response_cache.get(_cache_key(subject, sender, content, sender_history))
+    if cached is not None:
+        record_tier("priority", "cache")
+        return PriorityAnalysis(**{**cached, "tier": "cache"})
+    
+    reused = priority_index.lookup(*_near_duplicate_key(subject, sender, content, sender_history))
+    if reused is not None:
+        record_tier("priority", "near_duplicate")
+        return PriorityAnalysis(**{**reused, "tier": "near_duplicate"})
+    
+    return None
+
+def detect_email_priority(
+    subject: str,
+    sender: str,
+    content: str,
+    sender_history: Optional[str] = None,
+    email_id: Optional[int] = None
+) -> PriorityAnalysis:
+    """
+    Detect email priority level using AI analysis.
+    
+    Args:
+        subject: Email subject line
+        sender: Sender email/name
+        content: Email body content
+        sender_history: Context about sender (e.g., "VIP customer", "CEO")
+        email_id: Recorded as reused_from when a near-duplicate reuses this result
     
     Returns:
-        {
-            "results": [PriorityAnalysis],
-            "total_emails": int,
-            "high_count": int,
-            "medium_count": int,
-            "low_count": int,
-            "stats": PriorityStats
-        }
+        PriorityAnalysis with priority level and reasoning
+    
+    Clear-cut emails are decided by the rule-based fast tier
+    (fast_tier.py), successful LLM results are cached by content
+    (response_cache.py) and near-duplicates of an analyzed email reuse its
+    result (near_duplicate.py).
     """
-    results = []
-    high_count = 0
-    medium_count = 0
-    low_count = 0
-    total_urgency = 0
+    content = normalize_content(content, "priority")
+    return _detect_email_priority(subject, sender, content, sender_history, email_id)
+
+def _detect_email_priority(
+    subject: str,
+    sender: str,
+    content: str,
+    sender_history: Optional[str],
+    email_id: Optional[int]
+) -> PriorityAnalysis:
+    """detect_email_priority for content that is already normalized."""
+    local_result = _local_priority(subject, sender, content, sender_history)
+    if local_result is not None:
+        return local_result
+    
+    priority_prompt = _build_priority_prompt(subject, sender, content, sender_history)
+    
+    record_tier("priority", "llm")
+    try:
+        response = llm.invoke(priority_prompt)
+        result = _parse_priority(response.content.strip())
+        if "parsing_error" not in result.detected_signals:
+            _remember_priority(subject, sender, content, sender_history, result, email_id)
+        return result
+    except Exception as e:
+        return _priority_failed(e)
+
+async def adetect_email_priority(
+    subject: str,
+    sender: str,
+    content: str,
+    sender_history: Optional[str] = None,
+    email_id: Optional[int] = None
+) -> PriorityAnalysis:
+    """
+    Async version of detect_email_priority built on ainvoke.
+    """
+    content = normalize_content(content, "priority")
+    return await _adetect_email_priority(subject, sender, content, sender_history, email_id)
+
+async def _adetect_email_priority(
+    subject: str,
+    sender: str,
+    content: str,
+    sender_history: Optional[str],
+    email_id: Optional[int]
+) -> PriorityAnalysis:
+    """adetect_email_priority for content that is already normalized."""
+    local_result = _local_priority(subject, sender, content, sender_history)
+    if local_result is not None:
+        return local_result
     
-    for email in emails:
-        analysis = detect_email_priority(
+    priority_prompt = _build_priority_prompt(subject, sender, content, sender_history)
+    
+    record_tier("priority", "llm")
+    try:
+        response = await llm.ainvoke(priority_prompt)
+        result = _parse_priority(response.content.strip())
+        if "parsing_error" not in result.detected_signals:
+            _remember_priority(subject, sender, content, sender_history, result, email_id)
+        return result
+    except Exception as e:
+        return _priority_failed(e)
+
+PACKED_PRIORITY_PROMPT = """You are an email priority detection AI. Analyze EACH of the following emails and determine its priority level.
+
+Priority Detection Criteria:
+HIGH URGENCY (1-2 hours): 
+- Keywords: URGENT, ASAP, IMMEDIATELY, CRITICAL, EMERGENCY, OUTAGE, DOWN, ALERT
+- Multiple urgent signals
+- Directly affects business continuity
+- Time-sensitive decisions needed
+- Escalated from important stakeholders
+
+MEDIUM PRIORITY (Same day - 24 hours):
+- Keywords: Should, Need to, Please review, Feedback, Update, Follow up
+- Moderate impact on operations
+- Standard business tasks
+- Can wait a few hours
+
+LOW PRIORITY (This week):
+- Keywords: FYI, Optional, Whenever, No rush, Heads up
+- Informational content
+- Can be deferred
+- No immediate action needed
+
+{emails}
+
+Return ONLY a valid JSON array (no other text) with one object per email, using the email id shown above:
+[
+  {{
+    "id": "1",
+    "priority_level": "high|medium|low",
+    "urgency_score": 1-10,
+    "confidence": 0.0-1.0,
+    "reasoning": "Brief explanation of priority assignment",
+    "detected_signals": ["signal1", "signal2", "signal3"],
+    "suggested_action": "Recommended immediate action or 'Schedule for later' or 'Archive after review'"
+  }}
+]"""
+
+PACKED_EMAIL_BLOCK = """=== Email id: {key} ===
+Subject: {subject}
+From: {sender}{sender_context}
+
+Content:
+{content}
+"""
+
+# Input token budget for one packed prompt and a hard cap on emails per
+# prompt (the reply grows with every email, too)
+PACKED_TOKEN_BUDGET = int(os.getenv("PACKED_PROMPT_TOKEN_BUDGET", "6000"))
+PACKED_MAX_EMAILS = int(os.getenv("PACKED_PROMPT_MAX_EMAILS", "20"))
+
+def _packed_email_block(key: str, email: dict) -> str:
+    sender_history = email.get('sender_history')
+    return PACKED_EMAIL_BLOCK.format(
+        key=key,
+        subject=email.get('subject', ''),
+        sender=email.get('sender', ''),
+        sender_context=f"\nSender Context: {sender_history}" if sender_history else "",
+        content=email.get('content', '')
+    )
+
+def _pack_emails(emails: List[dict], token_budget: Optional[int], skip: dict) -> List[List[int]]:
+    """Group the indexes of emails not in skip into packs that fit the token budget."""
+    budget = (token_budget or PACKED_TOKEN_BUDGET) - estimate_tokens(PACKED_PRIORITY_PROMPT)
+    return pack_by_token_budget(
+        [idx for idx in range(len(emails)) if idx not in skip],
+        lambda idx: estimate_tokens(_packed_email_block(str(idx), emails[idx])),
+        budget,
+        PACKED_MAX_EMAILS
+    )
+
+def _build_packed_prompt(emails: List[dict], pack: List[int]) -> str:
+    # Keys are positions within the pack so duplicate or missing email ids
+    # in the input cannot collide in the reply
+    blocks = [_packed_email_block(str(pos + 1), emails[idx]) for pos, idx in enumerate(pack)]
+    return PACKED_PRIORITY_PROMPT.format(emails="\n".join(blocks))
+
+def _email_cache_key(email: dict) -> str:
+    return _cache_key(
+        email.get('subject', ''),
+        email.get('sender', ''),
+        email.get('content', ''),
+        email.get('sender_history')
+    )
+
+def _local_priorities(emails: List[dict]) -> dict:
+    """Return {email index: PriorityAnalysis} for emails decided without the LLM."""
+    local = {}
+    for idx, email in enumerate(emails):
+        result = _local_priority(
             email.get('subject', ''),
             email.get('sender', ''),
             email.get('content', ''),
             email.get('sender_history')
         )
-        
-        results.append(analysis)
+        if result is not None:
+            local[idx] = result
+    return local
+
+def _parse_packed_priorities(response_text: str, emails: List[dict], pack: List[int]) -> dict:
+    """
+    Parse a packed reply into {email index: PriorityAnalysis}.
+    Entries that are missing or malformed are left out so the caller can
+    retry them one by one.
+    """
+    parsed = {}
+    try:
+        start_idx = response_text.find('[')
+        end_idx = response_text.rfind(']') + 1
+        items = json.loads(response_text[start_idx:end_idx])
+    except Exception as e:
+        print(f"JSON parsing error in packed priority detection: {str(e)}")
+        record_parse_failure("priority")
+        return parsed
+    
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            pos = int(str(item.get("id", "")).strip()) - 1
+            if 0 <= pos < len(pack) and str(item.get("priority_level", "")).lower() in PRIORITY_LEVELS:
+                idx = pack[pos]
+                parsed[idx] = _priority_from_data(item)
+                _remember_priority(
+                    emails[idx].get('subject', ''),
+                    emails[idx].get('sender', ''),
+                    emails[idx].get('content', ''),
+                    emails[idx].get('sender_history'),
+                    parsed[idx],
+                    emails[idx].get('id', emails[idx].get('email_id'))
+                )
+                record_tier("priority", "llm")
+        except (TypeError, ValueError):
+            continue
+    
+    return parsed
+
+def _detect_single(email: dict) -> PriorityAnalysis:
+    # Batch helpers normalize the emails before they get here
+    return _detect_email_priority(
+        email.get('subject', ''),
+        email.get('sender', ''),
+        email.get('content', ''),
+        email.get('sender_history'),
+        email.get('id', email.get('email_id'))
+    )
+
+async def _adetect_single(email: dict) -> PriorityAnalysis:
+    return await _adetect_email_priority(
+        email.get('subject', ''),
+        email.get('sender', ''),
+        email.get('content', ''),
+        email.get('sender_history'),
+        email.get('id', email.get('email_id'))
+    )
+
+def detect_priorities_packed(
+    emails: List[dict],
+    token_budget: Optional[int] = None,
+    max_concurrency: Optional[int] = None
+) -> List[PriorityAnalysis]:
+    """
+    Detect priorities for many emails with one prompt per pack.
+    
+    Emails are grouped so each prompt stays within token_budget
+    (PACKED_PROMPT_TOKEN_BUDGET by default), so the criteria block is sent
+    once per pack. Emails decided by the fast tier or the response cache
+    are not sent, and emails missing from a reply fall back to
+    detect_email_priority. Results
+    are returned in input order.
+    """
+    return _detect_priorities_packed(normalize_emails(emails, "priority"), token_budget, max_concurrency)
+
+def _detect_priorities_packed(
+    emails: List[dict],
+    token_budget: Optional[int],
+    max_concurrency: Optional[int]
+) -> List[PriorityAnalysis]:
+    """detect_priorities_packed for emails that are already normalized."""
+    results = _local_priorities(emails)
+    packs = _pack_emails(emails, token_budget, skip=results)
+    
+    def detect_pack(pack: List[int]) -> dict:
+        prompt = _build_packed_prompt(emails, pack)
+        try:
+            response = llm.invoke(prompt)
+            return _parse_packed_priorities(response.content, emails, pack)
+        except Exception as e:
+            print(f"Error detecting packed priorities: {str(e)}")
+            return {}
+    
+    for parsed in map_bounded(detect_pack, packs, max_concurrency):
+        results.update(parsed)
+    
+    missing = [idx for idx in range(len(emails)) if idx not in results]
+    fallbacks = map_bounded(lambda idx: _detect_single(emails[idx]), missing, max_concurrency)
+    results.update(zip(missing, fallbacks))
+    
+    return [results[idx] for idx in range(len(emails))]
+
+async def adetect_priorities_packed(
+    emails: List[dict],
+    token_budget: Optional[int] = None,
+    max_concurrency: Optional[int] = None
+) -> List[PriorityAnalysis]:
+    """
+    Async version of detect_priorities_packed.
+    """
+    return await _adetect_priorities_packed(normalize_emails(emails, "priority"), token_budget, max_concurrency)
+
+async def _adetect_priorities_packed(
+    emails: List[dict],
+    token_budget: Optional[int],
+    max_concurrency: Optional[int]
+) -> List[PriorityAnalysis]:
+    """adetect_priorities_packed for emails that are already normalized."""
+    results = _local_priorities(emails)
+    packs = _pack_emails(emails, token_budget, skip=results)
+    
+    async def detect_pack(pack: List[int]) -> dict:
+        prompt = _build_packed_prompt(emails, pack)
+        try:
+            response = await llm.ainvoke(prompt)
+            return _parse_packed_priorities(response.content, emails, pack)
+        except Exception as e:
+            print(f"Error detecting packed priorities: {str(e)}")
+            return {}
+    
+    for parsed in await gather_bounded(detect_pack, packs, max_concurrency):
+        results.update(parsed)
+    
+    missing = [idx for idx in range(len(emails)) if idx not in results]
+    fallbacks = await gather_bounded(lambda idx: _adetect_single(emails[idx]), missing, max_concurrency)
+    results.update(zip(missing, fallbacks))
+    
+    return [results[idx] for idx in range(len(emails))]
+
+def _summarize_priorities(results: List[PriorityAnalysis]) -> dict:
+    high_count = 0
+    medium_count = 0
+    low_count = 0
+    total_urgency = 0
+    
+    for analysis in results:
         total_urgency += analysis.urgency_score
         
         if analysis.priority_level == 'high':
@@ -222,7 +567,7 @@ def batch_detect_priorities(emails: List[dict]) -> dict:
         else:
             low_count += 1
     
-    total_emails = len(emails)
+    total_emails = len(results)
     avg_urgency = total_urgency / total_emails if total_emails > 0 else 0
     
     return {
@@ -243,22 +588,183 @@ def batch_detect_priorities(emails: List[dict]) -> dict:
         }
     }
 
-def filter_by_priority(emails: List[dict], priority_level: str) -> List[PriorityAnalysis]:
-    """Get all emails of a specific priority level."""
-    results = batch_detect_priorities(emails)
+def _memo_lookup(emails: List[dict]) -> tuple:
+    """
+    Split a batch into memoized results and the emails still to detect.
+    
+    Returns ({email index: PriorityAnalysis}, {memo key: [email indexes]});
+    identical emails share one memo key, so they are detected once.
+    """
+    results = {}
+    pending = {}
+    for idx, email in enumerate(emails):
+        memo_key = _email_cache_key(email)
+        if memo_key in pending:
+            pending[memo_key].append(idx)
+            continue
+        memoized = priority_memo.get(memo_key)
+        if memoized is not None:
+            record_tier("priority", "cache")
+            # Served by the memo now, whichever tier first produced it
+            results[idx] = PriorityAnalysis(**{**memoized, "tier": "cache", "reused_from": None})
+        else:
+            pending[memo_key] = [idx]
+    return results, pending
+
+def _detection_failed(analysis: PriorityAnalysis) -> bool:
+    return bool({"parsing_error", "error"} & set(analysis.detected_signals))
+
+def _memo_store(pending: dict, detected: List[PriorityAnalysis], results: dict):
+    for (memo_key, indexes), analysis in zip(pending.items(), detected):
+        # Failed detections are retried next time rather than memoized
+        if not _detection_failed(analysis):
+            priority_memo.set(memo_key, analysis.model_dump())
+        for idx in indexes:
+            results[idx] = analysis
+
+def _near_duplicate_followers(emails: List[dict], pending: dict) -> dict:
+    """
+    Take emails that are near-duplicates of another pending email out of
+    pending; returns {email index: index of the email whose result it reuses}.
+    """
+    if not priority_index.enabled:
+        return {}
+    memo_keys = list(pending)
+    grouped = group_near_duplicates([
+        _near_duplicate_key(
+            emails[pending[memo_key][0]].get('subject', ''),
+            emails[pending[memo_key][0]].get('sender', ''),
+            emails[pending[memo_key][0]].get('content', ''),
+            emails[pending[memo_key][0]].get('sender_history')
+        )
+        for memo_key in memo_keys
+    ])
+    followers = {}
+    for pos, leader_pos in grouped.items():
+        leader = pending[memo_keys[leader_pos]][0]
+        for idx in pending.pop(memo_keys[pos]):
+            followers[idx] = leader
+    return followers
+
+def _reuse_for_followers(emails: List[dict], followers: dict, results: dict) -> dict:
+    """
+    Copy each leader's result to its followers. Followers of a leader whose
+    detection failed are returned instead, grouped like pending
+    ({memo key: [email indexes]}), to be detected themselves.
+    """
+    unresolved = {}
+    for idx, leader in followers.items():
+        if _detection_failed(results[leader]):
+            unresolved.setdefault(_email_cache_key(emails[idx]), []).append(idx)
+            continue
+        record_tier("priority", "near_duplicate")
+        results[idx] = PriorityAnalysis(**{
+            **results[leader].model_dump(),
+            "tier": "near_duplicate",
+            "reused_from": emails[leader].get('id', emails[leader].get('email_id'))
+        })
+    return unresolved
+
+def _with_email_ids(emails: List[dict], results: dict) -> List[PriorityAnalysis]:
     return [
-        result for result in results['results']
-        if result.priority_level == priority_level.lower()
+        PriorityAnalysis(**{**results[idx].model_dump(), "email_id": email.get('id', email.get('email_id'))})
+        for idx, email in enumerate(emails)
     ]
 
-def get_priority_recommendations(emails: List[dict]) -> dict:
+def batch_detect_priorities(
+    emails: List[dict],
+    max_concurrency: Optional[int] = None,
+    packed: bool = False
+) -> dict:
     """
-    Get recommendations on which emails need immediate attention.
+    Detect priorities for multiple emails.
     
-    Returns high-priority emails sorted by urgency score.
+    Up to max_concurrency detections run at once (LLM_MAX_CONCURRENCY by
+    default); results keep the order of the input emails and carry the
+    email's id. With packed, several emails share each prompt (see
+    detect_priorities_packed). Results are memoized per email content
+    (priority_memo), so repeated batches over the same inbox and duplicate
+    emails within a batch are only detected once; near-duplicates within
+    the batch (near_duplicate.py) reuse one detection as well.
+    
+    Returns:
+        {
+            "results": [PriorityAnalysis],
+            "total_emails": int,
+            "high_count": int,
+            "medium_count": int,
+            "low_count": int,
+            "stats": PriorityStats
+        }
     """
-    results = batch_detect_priorities(emails)
+    results, pending = _memo_lookup(emails)
+    followers = _near_duplicate_followers(emails, pending)
+    # Only the emails that still need the model are normalized (and counted)
+    unique_emails = normalize_emails([emails[indexes[0]] for indexes in pending.values()], "priority")
     
+    if packed:
+        detected = _detect_priorities_packed(unique_emails, None, max_concurrency)
+    else:
+        detected = map_bounded(_detect_single, unique_emails, max_concurrency)
+    
+    _memo_store(pending, detected, results)
+    unresolved = _reuse_for_followers(emails, followers, results)
+    if unresolved:
+        retry_emails = normalize_emails([emails[indexes[0]] for indexes in unresolved.values()], "priority")
+        _memo_store(unresolved, map_bounded(_detect_single, retry_emails, max_concurrency), results)
+    return _summarize_priorities(_with_email_ids(emails, results))
+
+async def abatch_detect_priorities(
+    emails: List[dict],
+    max_concurrency: Optional[int] = None,
+    packed: bool = False
+) -> dict:
+    """
+    Async version of batch_detect_priorities.
+    """
+    results, pending = _memo_lookup(emails)
+    followers = _near_duplicate_followers(emails, pending)
+    unique_emails = normalize_emails([emails[indexes[0]] for indexes in pending.values()], "priority")
+    
+    if packed:
+        detected = await _adetect_priorities_packed(unique_emails, None, max_concurrency)
+    else:
+        detected = await gather_bounded(_adetect_single, unique_emails, max_concurrency)
+    
+    _memo_store(pending, detected, results)
+    unresolved = _reuse_for_followers(emails, followers, results)
+    if unresolved:
+        retry_emails = normalize_emails([emails[indexes[0]] for indexes in unresolved.values()], "priority")
+        _memo_store(unresolved, await gather_bounded(_adetect_single, retry_emails, max_concurrency), results)
+    return _summarize_priorities(_with_email_ids(emails, results))
+
+def _filter_results(results: dict, priority_level: str) -> List[PriorityAnalysis]:
+    return [
+        result for result in results['results']
+        if result.priority_level == priority_level.lower()
+    ]
+
+def filter_by_priority(
+    emails: List[dict],
+    priority_level: str,
+    max_concurrency: Optional[int] = None
+) -> List[PriorityAnalysis]:
+    """Get all emails of a specific priority level."""
+    results = batch_detect_priorities(emails, max_concurrency)
+    return _filter_results(results, priority_level)
+
+async def afilter_by_priority(
+    emails: List[dict],
+    priority_level: str,
+    max_concurrency: Optional[int] = None
+) -> List[PriorityAnalysis]:
+    """
+    Async version of filter_by_priority.
+    """
+    results = await abatch_detect_priorities(emails, max_concurrency)
+    return _filter_results(results, priority_level)
+
+def _recommendations(results: dict) -> dict:
     high_priority = [
         r for r in results['results']
         if r.priority_level == 'high'
@@ -276,3 +782,25 @@ def get_priority_recommendations(emails: List[dict]) -> dict:
             else "No high-priority emails detected"
         ]
     }
+
+def get_priority_recommendations(
+    emails: List[dict],
+    max_concurrency: Optional[int] = None
+) -> dict:
+    """
+    Get recommendations on which emails need immediate attention.
+    
+    Returns high-priority emails sorted by urgency score.
+    """
+    results = batch_detect_priorities(emails, max_concurrency)
+    return _recommendations(results)
+
+async def aget_priority_recommendations(
+    emails: List[dict],
+    max_concurrency: Optional[int] = None
+) -> dict:
+    """
+    Async version of get_priority_recommendations.
+    """
+    results = await abatch_detect_priorities(emails, max_concurrency)
+    return _recommendations(results)
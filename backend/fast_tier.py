@@ -0,0 +1,143 @@
+# fast_tier.py
+import os
+import re
+import threading
+from typing import Optional
+from keywords import CATEGORY_KEYWORDS, KEYWORD_MATCHER
+
+# Rule-based first tier: decides obvious emails locally and only escalates
+# ambiguous ones to the LLM
+FAST_TIER_ENABLED = os.getenv("FAST_TIER_ENABLED", "1") != "0"
+FAST_TIER_THRESHOLD = float(os.getenv("FAST_TIER_THRESHOLD", "0.85"))
+
+# Sender mailbox (local part) patterns and the category they imply
+SENDER_CATEGORY_PATTERNS = [
+    (re.compile(r"^(billing|invoices?|payments?|accounts?[-_.]?payable|receipts?)$"), "Billing"),
+    (re.compile(r"^(support|helpdesk|help|servicedesk)$"), "Support"),
+    (re.compile(r"^(sales|partnerships?|deals)$"), "Sales"),
+    (re.compile(r"^(no[-_.]?reply|do[-_.]?not[-_.]?reply|newsletters?|notifications?|digest|announcements?)$"), "FYI"),
+]
+
+# Automated senders that are almost never urgent
+BULK_SENDER_PATTERN = re.compile(r"^(no[-_.]?reply|do[-_.]?not[-_.]?reply|newsletters?|notifications?|digest|marketing)$")
+
+_SENDER_ADDRESS = re.compile(r"([\w.+-]+)@[\w.-]+")
+
+# Score weights
+SENDER_WEIGHT = 2.0
+KEYWORD_WEIGHT = 1.0
+MAX_KEYWORD_HITS = 3
+
+def _sender_mailbox(sender: str) -> str:
+    match = _SENDER_ADDRESS.search(sender or "")
+    return match.group(1).lower() if match else ""
+
+def _confidence(top: float, runner_up: float) -> float:
+    # Confidence grows with the lead of the best category over the next one
+    return round(min(0.99, 0.45 + 0.12 * (top - runner_up)), 2)
+
+def classify_by_rules(subject: str, sender: str, content: str) -> Optional[dict]:
+    """
+    Score each category from the sender mailbox and content keywords.
+
+    Returns {"category", "confidence", "reasoning"} when the winning
+    category clears FAST_TIER_THRESHOLD, otherwise None so the caller
+    escalates to the LLM.
+    """
+    if not FAST_TIER_ENABLED:
+        return None
+
+    hits = KEYWORD_MATCHER.groups(f"{subject}\n{content}")
+    mailbox = _sender_mailbox(sender)
+    scores = {}
+    signals = {}
+
+    for category in CATEGORY_KEYWORDS:
+        category_hits = hits.get(category, [])
+        scores[category] = KEYWORD_WEIGHT * min(len(category_hits), MAX_KEYWORD_HITS)
+        signals[category] = category_hits
+
+    for pattern, category in SENDER_CATEGORY_PATTERNS:
+        if pattern.match(mailbox):
+            scores[category] += SENDER_WEIGHT
+            signals[category] = [f"sender {mailbox}@"] + signals[category]
+            break
+
+    urgent_hits = hits.get("high_priority", [])
+    scores["Urgent"] = KEYWORD_WEIGHT * 1.5 * min(len(urgent_hits), MAX_KEYWORD_HITS)
+    signals["Urgent"] = urgent_hits
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    (category, top), (_, runner_up) = ranked[0], ranked[1]
+    confidence = _confidence(top, runner_up)
+    if top == 0 or confidence < FAST_TIER_THRESHOLD:
+        return None
+
+    return {
+        "category": category,
+        "confidence": confidence,
+        "reasoning": f"Rule-based match on: {', '.join(signals[category])}"
+    }
+
+def detect_priority_by_rules(subject: str, sender: str, content: str) -> Optional[dict]:
+    """
+    Decide clear-cut priorities locally.
+
+    Bulk senders (noreply@, newsletter@, ...) without urgent signals are
+    low priority; two or more strong urgency keywords without any
+    deferral language are high priority. Everything else returns None.
+    """
+    if not FAST_TIER_ENABLED:
+        return None
+
+    hits = KEYWORD_MATCHER.groups(f"{subject}\n{content}")
+    mailbox = _sender_mailbox(sender)
+    urgent_hits = hits.get("high_priority", [])
+    deferral_hits = hits.get("low", []) + hits.get("delay", [])
+
+    if BULK_SENDER_PATTERN.match(mailbox) and not urgent_hits:
+        confidence = 0.9
+        result = {
+            "priority_level": "low",
+            "urgency_score": 2,
+            "detected_signals": [f"automated sender {mailbox}@"] + deferral_hits,
+            "suggested_action": "Archive after review"
+        }
+    elif len(urgent_hits) >= 2 and not deferral_hits:
+        confidence = round(min(0.99, 0.8 + 0.05 * len(urgent_hits)), 2)
+        result = {
+            "priority_level": "high",
+            "urgency_score": min(10, 7 + len(urgent_hits)),
+            "detected_signals": urgent_hits,
+            "suggested_action": "Respond immediately"
+        }
+    else:
+        return None
+
+    if confidence < FAST_TIER_THRESHOLD:
+        return None
+
+    result["confidence"] = confidence
+    result["reasoning"] = f"Rule-based match on: {', '.join(result['detected_signals'])}"
+    return result
+
+# Per-analyzer counters of which tier answered: rules, cache, near_duplicate, local or llm
+_counter_lock = threading.Lock()
+tier_counters = {}
+
+def record_tier(analyzer: str, tier: str, count: int = 1):
+    with _counter_lock:
+        counters = tier_counters.setdefault(analyzer, {"rules": 0, "cache": 0, "llm": 0})
+        counters[tier] = counters.get(tier, 0) + count
+
+def tier_stats() -> dict:
+    with _counter_lock:
+        stats = {}
+        for analyzer, counters in tier_counters.items():
+            total = sum(counters.values())
+            stats[analyzer] = {
+                **counters,
+                "total": total,
+                "skipped_network_fraction": (total - counters.get("llm", 0)) / total if total else 0.0
+            }
+        return stats
@@ -0,0 +1,228 @@
+# job_queue.py
+import os
+import json
+import time
+import uuid
+import logging
+import sqlite3
+import asyncio
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional
+from concurrency import iter_bounded
+
+# Job persistence and worker pool configuration
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # Jobs processed at the same time
+
+logger = logging.getLogger(__name__)
+
+# Handler result of an email that failed; it gets no checkpoint
+_FAILED = object()
+
+class JobStore:
+    """
+    SQLite table of jobs plus one row per email. An email's result is
+    written as soon as it finishes, so a restarted worker only redoes
+    emails that never completed.
+    """
+
+    def __init__(self, db_path: str = JOB_DB_PATH):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                completed INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_items (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                result TEXT,
+                PRIMARY KEY (job_id, idx)
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+            """
+        )
+        self._db.commit()
+
+    def create_job(self, kind: str, payloads: List[dict]) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, kind, status, total, created_at, updated_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, len(payloads), now, now)
+            )
+            self._db.executemany(
+                "INSERT INTO job_items (job_id, idx, payload) VALUES (?, ?, ?)",
+                [(job_id, idx, json.dumps(payload)) for idx, payload in enumerate(payloads)]
+            )
+            self._db.commit()
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, kind, status, total, completed, error, created_at, updated_at "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ["job_id", "kind", "status", "total", "completed", "error", "created_at", "updated_at"]
+        job = dict(zip(keys, row))
+        job["progress"] = job["completed"] / job["total"] if job["total"] else 1.0
+        return job
+
+    def set_status(self, job_id: str, status: str, error: Optional[str] = None):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, error, time.time(), job_id)
+            )
+            self._db.commit()
+
+    def pending_items(self, job_id: str) -> List[tuple]:
+        """(idx, payload) for every email of the job without a stored result."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT idx, payload FROM job_items WHERE job_id = ? AND result IS NULL ORDER BY idx",
+                (job_id,)
+            ).fetchall()
+        return [(idx, json.loads(payload)) for idx, payload in rows]
+
+    def save_result(self, job_id: str, idx: int, result):
+        """Checkpoint one email's result and bump the job's progress together."""
+        with self._lock:
+            updated = self._db.execute(
+                "UPDATE job_items SET result = ? WHERE job_id = ? AND idx = ? AND result IS NULL",
+                (json.dumps(result), job_id, idx)
+            ).rowcount
+            if updated:
+                self._db.execute(
+                    "UPDATE jobs SET completed = completed + 1, updated_at = ? WHERE id = ?",
+                    (time.time(), job_id)
+                )
+            self._db.commit()
+
+    def results(self, job_id: str, offset: int = 0, limit: int = 100) -> List[tuple]:
+        """(payload, result) of finished emails in input order."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT payload, result FROM job_items WHERE job_id = ? AND result IS NOT NULL "
+                "ORDER BY idx LIMIT ? OFFSET ?",
+                (job_id, limit, offset)
+            ).fetchall()
+        return [(json.loads(payload), json.loads(result)) for payload, result in rows]
+
+    def unfinished_jobs(self) -> List[str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+class JobQueue:
+    """
+    Background worker pool for large batches.
+
+    Each job kind maps to an async handler that processes one payload and
+    returns a JSON-serializable result. Up to `workers` jobs run at once,
+    each with at most max_concurrency payloads in flight. Jobs left queued
+    or running by a previous process are resumed on start(). An email whose
+    handler raises gets no result and the job ends as failed, instead of
+    being checkpointed with a default; resume() runs those emails again.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        handlers: Dict[str, Callable[[dict], Awaitable]],
+        workers: int = JOB_WORKERS,
+        max_concurrency: Optional[int] = None
+    ):
+        self.store = store
+        self.handlers = handlers
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self._queue = None
+        self._tasks = []
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        for job_id in self.store.unfinished_jobs():
+            logger.info("Resuming job %s", job_id)
+            self._queue.put_nowait(job_id)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, kind: str, payloads: List[dict]) -> str:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = await asyncio.to_thread(self.store.create_job, kind, payloads)
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    async def resume(self, job_id: str):
+        """Re-queue a failed job; only its emails without a result run again."""
+        job = await asyncio.to_thread(self.store.get_job, job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if job["status"] != "failed":
+            raise ValueError(f"Job {job_id} is {job['status']}; only failed jobs can be resumed")
+        await asyncio.to_thread(self.store.set_status, job_id, "queued")
+        self._queue.put_nowait(job_id)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.exception("Error in job %s", job_id)
+                self.store.set_status(job_id, "failed", str(e))
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = self.store.get_job(job_id)
+        if job is None or job["status"] in ("completed", "failed"):
+            return
+        handler = self.handlers[job["kind"]]
+        self.store.set_status(job_id, "running")
+
+        pending = await asyncio.to_thread(self.store.pending_items, job_id)
+        failed = []
+
+        async def run(item):
+            idx, payload = item
+            try:
+                return await handler(payload)
+            except Exception as e:
+                # The email keeps no result, so resume() runs it again
+                logger.warning("Job %s: email %s failed: %s", job_id, idx, e)
+                failed.append(idx)
+                return _FAILED
+
+        async for pos, result in iter_bounded(run, pending, self.max_concurrency):
+            if result is not _FAILED:
+                await asyncio.to_thread(self.store.save_result, job_id, pending[pos][0], result)
+
+        if failed:
+            self.store.set_status(job_id, "failed", f"{len(failed)} of {len(pending)} emails failed")
+        else:
+            self.store.set_status(job_id, "completed")
@@ -0,0 +1,153 @@
+# keywords.py
+import re
+from typing import Dict, Iterable, List, NamedTuple
+
+# Key phrases for priority detection
+URGENT_KEYWORDS = [
+    "urgent", "asap", "immediately", "critical", "emergency", "alert",
+    "severe", "crisis", "down", "outage", "failure", "broken", "issue",
+    "must", "cannot wait", "right now", "today", "this hour", "deadline",
+    "overdue", "late", "delayed", "stuck", "blocked", "unblocked needed"
+]
+
+DELAY_KEYWORDS = [
+    "delay", "postpone", "push back", "reschedule", "extend", "defer",
+    "later", "next week", "soon", "eventually", "when possible"
+]
+
+MEDIUM_KEYWORDS = [
+    "should", "need to", "would like", "please review", "feedback",
+    "progress", "update", "check", "follow up", "reminder", "fyi"
+]
+
+LOW_KEYWORDS = [
+    "fyi", "for your information", "heads up", "note", "just so you know",
+    "btw", "by the way", "optional", "whenever", "no rush", "low priority"
+]
+
+# Keywords used by action_item_extractor.calculate_priority
+HIGH_PRIORITY_KEYWORDS = [
+    'urgent', 'asap', 'critical', 'emergency', 'immediately',
+    'important!!', 'crucial', 'blocking', 'stopped', 'down'
+]
+
+MEDIUM_PRIORITY_KEYWORDS = ['important', 'needed', 'required', 'please', 'soon']
+
+# Content keywords that point at a classification category. Used by the
+# rule-based fast tier (fast_tier.py) before escalating to the LLM.
+CATEGORY_KEYWORDS = {
+    "Billing": [
+        "invoice", "payment", "receipt", "billing", "subscription", "refund",
+        "amount due", "past due", "charged", "renewal"
+    ],
+    "Support": [
+        "error", "bug", "not working", "troubleshoot", "password reset",
+        "cannot log in", "can't log in", "crash", "ticket", "help us"
+    ],
+    "Sales": [
+        "pricing", "quote", "demo", "proposal", "contract", "discount",
+        "purchase", "enterprise plan", "volume licensing", "trial"
+    ],
+    "FYI": [
+        "newsletter", "announcement", "unsubscribe", "digest", "summary",
+        "for your information", "heads up", "no action needed", "fyi"
+    ],
+}
+
+class KeywordHit(NamedTuple):
+    keyword: str
+    group: str
+    start: int
+    end: int
+    weight: float
+
+class KeywordMatcher:
+    """
+    Match several keyword lists against a text in a single pass.
+
+    All keywords are compiled once into one case-insensitive regex with
+    whole-word boundaries, so "down" no longer matches "download". A
+    keyword may belong to several groups; every group gets a hit. Keywords
+    nested inside a longer matched phrase ("please" in "please review") are
+    reported too, with their own positions.
+    """
+
+    def __init__(self, groups: Dict[str, List[str]], weights: Dict[str, float] = None):
+        weights = weights or {}
+        self._groups = {}  # keyword -> [(group, weight)]
+        for group, keywords in groups.items():
+            for keyword in keywords:
+                self._groups.setdefault(keyword.lower(), []).append((group, weights.get(group, 1.0)))
+
+        # Longest first so the alternation prefers the longest phrase
+        ordered = sorted(self._groups, key=len, reverse=True)
+        self._pattern = re.compile(
+            r"(?<!\w)(?:" + "|".join(re.escape(keyword) for keyword in ordered) + r")(?!\w)",
+            re.IGNORECASE
+        )
+
+        # Keywords that occur as whole words inside a longer keyword
+        self._nested = {}
+        for keyword in ordered:
+            nested = [
+                (match.group(0).lower(), match.start())
+                for other in ordered if other != keyword and len(other) < len(keyword)
+                for match in re.finditer(r"(?<!\w)" + re.escape(other) + r"(?!\w)", keyword)
+            ]
+            if nested:
+                self._nested[keyword] = nested
+
+    def find_all(self, text: str) -> List[KeywordHit]:
+        """Return every keyword hit in text, ordered by position."""
+        hits = []
+        for match in self._pattern.finditer(text or ""):
+            keyword = match.group(0).lower()
+            matched = [(keyword, match.start())]
+            matched += [(inner, match.start() + offset) for inner, offset in self._nested.get(keyword, [])]
+            for found, start in matched:
+                for group, weight in self._groups[found]:
+                    hits.append(KeywordHit(found, group, start, start + len(found), weight))
+        hits.sort(key=lambda hit: hit.start)
+        return hits
+
+    def groups(self, text: str) -> Dict[str, List[str]]:
+        """Return {group: distinct keywords found} for text."""
+        found = {}
+        for hit in self.find_all(text):
+            keywords = found.setdefault(hit.group, [])
+            if hit.keyword not in keywords:
+                keywords.append(hit.keyword)
+        return found
+
+    def score(self, text: str) -> float:
+        """Sum of the weights of all hits in text."""
+        return sum(hit.weight for hit in self.find_all(text))
+
+    def scan(self, texts: Iterable[str]) -> List[List[KeywordHit]]:
+        """find_all over a whole inbox."""
+        return [self.find_all(text) for text in texts]
+
+# Weights for KEYWORD_MATCHER.score: positive pushes towards urgent,
+# negative towards deferrable
+PRIORITY_WEIGHTS = {
+    "high_priority": 3.0,
+    "urgent": 2.0,
+    "medium": 1.0,
+    "medium_priority": 1.0,
+    "delay": -1.0,
+    "low": -2.0,
+}
+
+# Every list above, compiled once at import
+KEYWORD_MATCHER = KeywordMatcher(
+    {
+        "urgent": URGENT_KEYWORDS,
+        "delay": DELAY_KEYWORDS,
+        "medium": MEDIUM_KEYWORDS,
+        "low": LOW_KEYWORDS,
+        "high_priority": HIGH_PRIORITY_KEYWORDS,
+        "medium_priority": MEDIUM_PRIORITY_KEYWORDS,
+        **CATEGORY_KEYWORDS,
+    },
+    {**PRIORITY_WEIGHTS, **{category: 0.0 for category in CATEGORY_KEYWORDS}}
+)
@@ -0,0 +1,207 @@
+# llm_provider.py
+import os
+import json
+import time
+import threading
+from dotenv import load_dotenv
+from llm_scheduler import scheduler
+from singleflight import llm_singleflight
+from response_cache import hash_text
+from tokens import estimate_tokens
+from metrics import LLM_CALLS, LLM_LATENCY, LLM_TTFT, record_usage
+
+# Load .env
+load_dotenv()
+
+MODEL_NAME = os.getenv("GROQ_MODEL", "openai/gpt-oss-120b")
+
+# Connection pool shared by every feature
+POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "100"))
+POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "20"))
+POOL_KEEPALIVE_EXPIRY = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "60"))
+REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "120"))
+
+# httpx and langchain_groq are imported on first use, so importing the
+# analyzer modules (and app.py) stays cheap for workers and tests
+_lock = threading.Lock()
+_http_clients = None
+
+def get_api_key() -> str:
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise ValueError("GROQ_API_KEY environment variable not set")
+    return api_key
+
+def _http2_available() -> bool:
+    # httpx only speaks HTTP/2 when the optional h2 package is installed
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _get_http_clients():
+    """Create the shared sync/async httpx clients on first use."""
+    global _http_clients
+    with _lock:
+        if _http_clients is None:
+            import httpx
+
+            http2 = os.getenv("LLM_HTTP2", "1") != "0" and _http2_available()
+            limits = httpx.Limits(
+                max_connections=POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=POOL_MAX_KEEPALIVE,
+                keepalive_expiry=POOL_KEEPALIVE_EXPIRY
+            )
+            _http_clients = (
+                httpx.Client(http2=http2, limits=limits, timeout=REQUEST_TIMEOUT),
+                httpx.AsyncClient(http2=http2, limits=limits, timeout=REQUEST_TIMEOUT)
+            )
+        return _http_clients
+
+class LazyLLM:
+    """
+    Per-module, per-temperature view of the shared LLM client.
+
+    model_name and temperature are available immediately (cache keys need
+    them); the underlying ChatGroq is built on first use. invoke, ainvoke
+    and astream go through the shared scheduler (llm_scheduler.py), which
+    rate-limits and retries them, and identical concurrent invoke/ainvoke
+    calls are coalesced into one (singleflight.py); every other attribute
+    is forwarded to the client. Latency, time to first token and token
+    usage are recorded under the view's module name (metrics.py).
+    """
+
+    def __init__(self, temperature: float, module: str = "default"):
+        self.model_name = MODEL_NAME
+        self.temperature = temperature
+        self.module = module
+        self._llm = None
+        self._build_lock = threading.Lock()
+
+    def _client(self):
+        with self._build_lock:
+            if self._llm is None:
+                from langchain_groq import ChatGroq
+
+                http_client, http_async_client = _get_http_clients()
+                self._llm = ChatGroq(
+                    model=self.model_name,
+                    temperature=self.temperature,
+                    api_key=get_api_key(),
+                    http_client=http_client,
+                    http_async_client=http_async_client,
+                    max_retries=0  # Retries are the scheduler's job
+                )
+            return self._llm
+
+    def _flight_key(self, prompt, kwargs: dict) -> str:
+        # The full prompt plus everything that changes the completion
+        return hash_text(json.dumps(
+            [self.model_name, self.temperature, str(prompt), sorted((k, str(v)) for k, v in kwargs.items())]
+        ))
+
+    def _record_call(self, mode: str, start: float, response=None, ok: bool = True):
+        LLM_LATENCY.observe(time.perf_counter() - start, module=self.module, mode=mode)
+        LLM_CALLS.inc(module=self.module, outcome="ok" if ok else "error")
+        if response is not None:
+            record_usage(self.module, response)
+
+    def _timed_invoke(self, prompt, kwargs: dict):
+        start = time.perf_counter()
+        try:
+            response = self._client().invoke(prompt, **kwargs)
+        except Exception:
+            self._record_call("invoke", start, ok=False)
+            raise
+        self._record_call("invoke", start, response)
+        return response
+
+    async def _timed_ainvoke(self, prompt, kwargs: dict):
+        start = time.perf_counter()
+        try:
+            response = await self._client().ainvoke(prompt, **kwargs)
+        except Exception:
+            self._record_call("ainvoke", start, ok=False)
+            raise
+        self._record_call("ainvoke", start, response)
+        return response
+
+    async def _timed_astream(self, prompt, kwargs: dict):
+        start = time.perf_counter()
+        first = True
+        try:
+            async for chunk in self._client().astream(prompt, **kwargs):
+                if first:
+                    LLM_TTFT.observe(time.perf_counter() - start, module=self.module)
+                    first = False
+                # Usage, when reported, arrives on the final chunk
+                record_usage(self.module, chunk)
+                yield chunk
+        except Exception:
+            self._record_call("astream", start, ok=False)
+            raise
+        self._record_call("astream", start)
+
+    def invoke(self, prompt, **kwargs):
+        return llm_singleflight.do(
+            self._flight_key(prompt, kwargs),
+            lambda: scheduler.call(
+                lambda: self._timed_invoke(prompt, kwargs),
+                estimate_tokens(str(prompt))
+            )
+        )
+
+    async def ainvoke(self, prompt, **kwargs):
+        return await llm_singleflight.ado(
+            self._flight_key(prompt, kwargs),
+            lambda: scheduler.acall(
+                lambda: self._timed_ainvoke(prompt, kwargs),
+                estimate_tokens(str(prompt))
+            )
+        )
+
+    async def astream(self, prompt, **kwargs):
+        async for chunk in scheduler.astream(
+            lambda: self._timed_astream(prompt, kwargs),
+            estimate_tokens(str(prompt))
+        ):
+            yield chunk
+
+    def __getattr__(self, name):
+        return getattr(self._client(), name)
+
+# One view per (temperature, module), all sharing the same connection pool
+_llms = {}
+
+def get_llm(temperature: float, module: str = "default") -> LazyLLM:
+    """
+    Return the shared LLM view for a temperature and analyzer module.
+
+    Views are cheap wrappers around the same keep-alive connection pool, so
+    every feature reuses the same sockets and TLS sessions; the module name
+    labels the view's metrics.
+    """
+    with _lock:
+        llm = _llms.get((temperature, module))
+        if llm is None:
+            llm = LazyLLM(temperature, module)
+            _llms[(temperature, module)] = llm
+        return llm
+
+def warm_up():
+    """Build the HTTP pool and every registered view ahead of the first request."""
+    for llm in list(_llms.values()):
+        llm._client()
+
+async def aclose():
+    """Close the shared HTTP clients (called on application shutdown)."""
+    global _http_clients
+    with _lock:
+        clients, _http_clients = _http_clients, None
+        for llm in _llms.values():
+            llm._llm = None
+    if clients is not None:
+        http_client, http_async_client = clients
+        http_client.close()
+        await http_async_client.aclose()
@@ -0,0 +1,427 @@
+# llm_scheduler.py
+import os
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Optional
+
+# Provider quotas; 0 disables the corresponding bucket
+RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "0"))
+TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "0"))
+# Completion tokens reserved per call on top of the prompt estimate; the
+# bucket is corrected with the real usage once the response arrives
+OUTPUT_TOKEN_RESERVE = int(os.getenv("LLM_OUTPUT_TOKEN_RESERVE", "500"))
+
+# Adaptive (AIMD) limit on LLM calls in flight across the whole process
+INITIAL_CONCURRENCY = int(os.getenv("LLM_SCHEDULER_CONCURRENCY", "16"))
+MIN_CONCURRENCY = int(os.getenv("LLM_SCHEDULER_MIN_CONCURRENCY", "1"))
+MAX_CONCURRENCY = int(os.getenv("LLM_SCHEDULER_MAX_CONCURRENCY", "64"))
+
+# Retries of throttled (429), 5xx and connection failures
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "30"))
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """
+    Token bucket refilled at per_minute / 60 per second.
+
+    reserve() takes the tokens immediately (the balance may go negative)
+    and returns how long the caller must wait before using them, so it
+    works the same for threads (time.sleep) and coroutines (asyncio.sleep).
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        with self._lock:
+            self._refill()
+            # A request larger than the bucket waits for a full bucket
+            # instead of forever
+            self._tokens -= min(amount, self.capacity)
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def adjust(self, amount: float):
+        """Give back (positive) or take (negative) tokens after the fact."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit with additive increase / multiplicative decrease.
+
+    Every success raises the limit by 1/limit (about +1 per round of calls);
+    a throttling response halves it, at most once per cooldown so a burst
+    of 429s from the same round counts once. Usable from threads
+    (acquire) and coroutines (aacquire); a released slot is handed
+    directly to the oldest waiter.
+    """
+
+    def __init__(
+        self,
+        initial: int = INITIAL_CONCURRENCY,
+        minimum: int = MIN_CONCURRENCY,
+        maximum: int = MAX_CONCURRENCY,
+        decrease_factor: float = 0.5,
+        cooldown_seconds: float = 1.0
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.decrease_factor = decrease_factor
+        self.cooldown_seconds = cooldown_seconds
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._waiters = deque()  # callables granting a slot to one waiter
+        self._lock = threading.Lock()
+
+    def _grant_locked(self) -> list:
+        grants = []
+        while self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            grants.append(self._waiters.popleft())
+        return grants
+
+    def acquire(self):
+        with self._lock:
+            if not self._waiters and self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+            granted = threading.Event()
+            self._waiters.append(granted.set)
+        granted.wait()
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if not self._waiters and self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+            future = loop.create_future()
+            grant = lambda: loop.call_soon_threadsafe(self._resolve, future)
+            self._waiters.append(grant)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove(grant)
+                    granted = False
+                except ValueError:
+                    granted = True
+            # A slot granted to a cancelled waiter is passed on by _resolve;
+            # one that was already resolved has to be released here
+            if granted and future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def _resolve(self, future: asyncio.Future):
+        if future.cancelled():
+            self.release()
+        elif not future.done():
+            future.set_result(None)
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            grants = self._grant_locked()
+        for grant in grants:
+            grant()
+
+    def on_success(self):
+        with self._lock:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            grants = self._grant_locked()
+        for grant in grants:
+            grant()
+
+    def on_throttle(self):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown_seconds:
+                self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                self._last_decrease = now
+
+def _status_code(exc: Exception) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    """Seconds requested by a Retry-After header (delta-seconds or HTTP date), if any."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or getattr(exc, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def _is_retryable(exc: Exception) -> bool:
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    # Connection resets and timeouts carry no status code
+    name = type(exc).__name__
+    return "Timeout" in name or "Connection" in name
+
+def _usage_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage_metadata", None) or {}
+    total = usage.get("total_tokens")
+    if total is None and "input_tokens" in usage:
+        total = usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+    return total
+
+class LLMScheduler:
+    """
+    Central gate in front of every LLM call (see LazyLLM in llm_provider).
+
+    A call first reserves a request and its estimated tokens from the
+    RPM/TPM buckets, then waits for a slot under the adaptive concurrency
+    limit. 429s shrink the limit; 429s, 5xx and connection errors are
+    retried with jittered exponential backoff, honoring Retry-After; the
+    slot is given back for the backoff and taken again for the retry. The
+    provider call is passed in as a function, so any client (or a local
+    fake) can be scheduled.
+    """
+
+    def __init__(
+        self,
+        rpm: int = RPM_LIMIT,
+        tpm: int = TPM_LIMIT,
+        max_retries: int = MAX_RETRIES,
+        backoff_base: float = BACKOFF_BASE,
+        backoff_max: float = BACKOFF_MAX,
+        limiter: Optional[AdaptiveLimiter] = None
+    ):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = limiter or AdaptiveLimiter()
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=1000)  # Recent queue waits in ms
+        self.waiting = 0
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.server_errors = 0
+        self.failures = 0
+
+    def _reserve(self, cost: int) -> float:
+        delay = 0.0
+        if self.requests is not None:
+            delay = max(delay, self.requests.reserve(1))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.reserve(cost))
+        return delay
+
+    def _settle_tokens(self, cost: int, response):
+        if self.tokens is None:
+            return
+        used = _usage_tokens(response)
+        if used is not None:
+            self.tokens.adjust(cost - used)
+
+    def _record_wait(self, seconds: float):
+        with self._lock:
+            self._waits.append(seconds * 1000)
+
+    def _backoff(self, attempt: int, exc: Exception) -> Optional[float]:
+        """Delay before the next attempt, or None when exc should be raised."""
+        status = _status_code(exc)
+        with self._lock:
+            if status == 429:
+                self.throttled += 1
+            elif status is not None and status >= 500:
+                self.server_errors += 1
+        if status == 429:
+            self.limiter.on_throttle()
+
+        if attempt >= self.max_retries or not _is_retryable(exc):
+            with self._lock:
+                self.failures += 1
+            return None
+
+        with self._lock:
+            self.retries += 1
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        retry_after = _retry_after(exc)
+        if retry_after is not None:
+            delay = min(self.backoff_max, retry_after) + random.uniform(0, self.backoff_base)
+        return delay
+
+    def call(self, func: Callable[[], Any], cost: int = 0) -> Any:
+        """Run a blocking provider call under the scheduler."""
+        cost += OUTPUT_TOKEN_RESERVE
+        attempt = 0
+        while True:
+            queued = time.perf_counter()
+            with self._lock:
+                self.waiting += 1
+            try:
+                time.sleep(self._reserve(cost))
+                self.limiter.acquire()
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+            self._record_wait(time.perf_counter() - queued)
+
+            try:
+                with self._lock:
+                    self.calls += 1
+                response = func()
+            except Exception as e:
+                delay = self._backoff(attempt, e)
+                if delay is None:
+                    raise
+            else:
+                self.limiter.on_success()
+                self._settle_tokens(cost, response)
+                return response
+            finally:
+                # Freed before the backoff below, so a call waiting to
+                # retry does not hold a slot other calls could use
+                self.limiter.release()
+
+            attempt += 1
+            time.sleep(delay)
+
+    async def acall(self, func: Callable[[], Awaitable], cost: int = 0) -> Any:
+        """Async version of call; func returns a fresh awaitable per attempt."""
+        cost += OUTPUT_TOKEN_RESERVE
+        attempt = 0
+        while True:
+            queued = time.perf_counter()
+            with self._lock:
+                self.waiting += 1
+            try:
+                await asyncio.sleep(self._reserve(cost))
+                await self.limiter.aacquire()
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+            self._record_wait(time.perf_counter() - queued)
+
+            try:
+                with self._lock:
+                    self.calls += 1
+                response = await func()
+            except Exception as e:
+                delay = self._backoff(attempt, e)
+                if delay is None:
+                    raise
+            else:
+                self.limiter.on_success()
+                self._settle_tokens(cost, response)
+                return response
+            finally:
+                # Freed before the backoff below, so a call waiting to
+                # retry does not hold a slot other calls could use
+                self.limiter.release()
+
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def astream(self, func: Callable[[], Any], cost: int = 0):
+        """
+        Schedule a streaming call. The slot is held until the stream ends;
+        failures before the first chunk are retried like acall (without
+        holding the slot during the backoff), later ones are raised (part
+        of the reply has already been delivered).
+        """
+        cost += OUTPUT_TOKEN_RESERVE
+        attempt = 0
+        while True:
+            queued = time.perf_counter()
+            with self._lock:
+                self.waiting += 1
+            try:
+                await asyncio.sleep(self._reserve(cost))
+                await self.limiter.aacquire()
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+            self._record_wait(time.perf_counter() - queued)
+
+            started = False
+            try:
+                with self._lock:
+                    self.calls += 1
+                async for chunk in func():
+                    started = True
+                    yield chunk
+            except Exception as e:
+                delay = None if started else self._backoff(attempt, e)
+                if delay is None:
+                    raise
+            else:
+                self.limiter.on_success()
+                return
+            finally:
+                self.limiter.release()
+
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            stats = {
+                "concurrency_limit": int(self.limiter.limit),
+                "in_flight": self.limiter.in_flight,
+                "waiting": self.waiting,
+                "calls": self.calls,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "server_errors": self.server_errors,
+                "failures": self.failures,
+                "rpm_limit": self.rpm or None,
+                "tpm_limit": self.tpm or None
+            }
+
+        def percentile(pct: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(len(waits) * pct / 100))], 1)
+
+        stats["queue_wait_ms"] = {
+            "samples": len(waits),
+            "p50": percentile(50),
+            "p95": percentile(95),
+            "p99": percentile(99),
+            "max": round(waits[-1], 1) if waits else 0.0
+        }
+        return stats
+
+# Shared scheduler for every LLM view
+scheduler = LLMScheduler()
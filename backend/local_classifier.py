@@ -0,0 +1,362 @@
+# local_classifier.py
+"""
+Local email classifier trained from stored LLM classifications.
+
+Hashed TF-IDF features (subject, body, bigrams and sender) feed a softmax
+regression written in NumPy. email_classifier.py asks it after the rules
+and the response cache, and only accepts its answer when the top
+probability clears LOCAL_CLASSIFIER_THRESHOLD. NumPy is optional: without
+it, or without a trained model file, the tier is skipped.
+
+Train and evaluate from the backend directory:
+
+    python local_classifier.py train --json local_classifier_report.json
+    python local_classifier.py evaluate --threshold 0.95
+"""
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import random
+import argparse
+import threading
+from collections import Counter
+from typing import List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # The tier is disabled without NumPy
+    np = None
+
+LOCAL_CLASSIFIER_ENABLED = os.getenv("LOCAL_CLASSIFIER_ENABLED", "1") != "0"
+LOCAL_CLASSIFIER_PATH = os.getenv("LOCAL_CLASSIFIER_PATH", "local_classifier.npz")
+LOCAL_CLASSIFIER_THRESHOLD = float(os.getenv("LOCAL_CLASSIFIER_THRESHOLD", "0.9"))
+
+# Hashed feature space; collisions are rare at this size for inbox vocabularies
+DEFAULT_FEATURES = 2 ** 18
+MIN_TRAINING_EXAMPLES = 50
+
+_TOKEN = re.compile(r"[a-z0-9$%#]+(?:'[a-z]+)?")
+_SENDER_ADDRESS = re.compile(r"([\w.+-]+)@([\w.-]+)")
+
+def _feature_names(subject: str, sender: str, content: str) -> Counter:
+    subject_tokens = _TOKEN.findall((subject or "").lower())
+    body_tokens = _TOKEN.findall((content or "").lower())
+    names = Counter(f"w:{token}" for token in subject_tokens + body_tokens)
+    names.update(f"s:{token}" for token in subject_tokens)
+    names.update(f"b:{first} {second}" for first, second in zip(body_tokens, body_tokens[1:]))
+    match = _SENDER_ADDRESS.search((sender or "").lower())
+    if match:
+        names[f"from:{match.group(1)}"] += 1
+        names[f"domain:{match.group(2)}"] += 1
+    return names
+
+def _hashed_counts(subject: str, sender: str, content: str, n_features: int) -> dict:
+    """{feature index: count}; crc32 keeps indexes stable across processes."""
+    counts = {}
+    for name, count in _feature_names(subject, sender, content).items():
+        idx = zlib.crc32(name.encode()) % n_features
+        counts[idx] = counts.get(idx, 0) + count
+    return counts
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+class LocalClassifier:
+    """Softmax regression over hashed, L2-normalized TF-IDF vectors."""
+
+    def __init__(self, categories: List[str], weights, bias, idf, metadata: Optional[dict] = None):
+        self.categories = list(categories)
+        self.weights = weights  # (n_features, n_categories)
+        self.bias = bias
+        self.idf = idf
+        self.metadata = metadata or {}
+
+    @property
+    def n_features(self) -> int:
+        return self.weights.shape[0]
+
+    def _vector(self, subject: str, sender: str, content: str) -> tuple:
+        counts = _hashed_counts(subject, sender, content, self.n_features)
+        indexes = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = (1 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))) * self.idf[indexes]
+        norm = np.sqrt((values ** 2).sum())
+        return indexes, values / norm if norm else values
+
+    def predict_proba(self, subject: str, sender: str, content: str):
+        indexes, values = self._vector(subject, sender, content)
+        return _softmax(values @ self.weights[indexes] + self.bias)
+
+    def classify(self, subject: str, sender: str, content: str, threshold: float) -> Optional[dict]:
+        """{"category", "confidence", "reasoning"}, or None below the threshold."""
+        probabilities = self.predict_proba(subject, sender, content)
+        best = int(probabilities.argmax())
+        confidence = float(probabilities[best])
+        if confidence < threshold:
+            return None
+        return {
+            "category": self.categories[best],
+            "confidence": round(confidence, 2),
+            "reasoning": f"Local model trained on {self.metadata.get('examples', 0)} LLM-labelled emails"
+        }
+
+    @classmethod
+    def train(
+        cls,
+        examples: List[dict],
+        categories: List[str],
+        n_features: int = DEFAULT_FEATURES,
+        epochs: int = 300,
+        learning_rate: float = 0.05,
+        l2: float = 1e-5,
+        metadata: Optional[dict] = None
+    ) -> "LocalClassifier":
+        """
+        Fit on examples ({"subject", "sender", "content", "category"}) with
+        full-batch Adam. The feature matrix stays sparse (row, column, value
+        triplets), so memory grows with the examples, not the hash space.
+        """
+        label_index = {category: idx for idx, category in enumerate(categories)}
+        examples = [example for example in examples if example["category"] in label_index]
+        n_examples, n_categories = len(examples), len(categories)
+
+        rows, cols, counts = [], [], []
+        for row, example in enumerate(examples):
+            for idx, count in _hashed_counts(example["subject"], example["sender"], example["content"], n_features).items():
+                rows.append(row)
+                cols.append(idx)
+                counts.append(count)
+        rows = np.array(rows, dtype=np.int64)
+        cols = np.array(cols, dtype=np.int64)
+        labels = np.array([label_index[example["category"]] for example in examples], dtype=np.int64)
+
+        # Each (row, col) pair is unique, so column counts are document frequencies
+        document_frequency = np.bincount(cols, minlength=n_features)
+        idf = np.log((1 + n_examples) / (1 + document_frequency)) + 1
+        values = (1 + np.log(np.array(counts, dtype=np.float64))) * idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=values ** 2, minlength=n_examples))
+        values /= norms[rows]
+
+        targets = np.zeros((n_examples, n_categories))
+        targets[np.arange(n_examples), labels] = 1.0
+
+        weights = np.zeros((n_features, n_categories))
+        bias = np.zeros(n_categories)
+        moments = [np.zeros_like(weights), np.zeros_like(weights), np.zeros_like(bias), np.zeros_like(bias)]
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+
+        for step in range(1, epochs + 1):
+            logits = np.stack([
+                np.bincount(rows, weights=values * weights[cols, k], minlength=n_examples)
+                for k in range(n_categories)
+            ], axis=1) + bias
+            error = (_softmax(logits) - targets) / n_examples
+            weight_grad = np.stack([
+                np.bincount(cols, weights=values * error[rows, k], minlength=n_features)
+                for k in range(n_categories)
+            ], axis=1) + l2 * weights
+            bias_grad = error.sum(axis=0)
+
+            for param, grad, first, second in (
+                (weights, weight_grad, moments[0], moments[1]),
+                (bias, bias_grad, moments[2], moments[3])
+            ):
+                first *= beta1
+                first += (1 - beta1) * grad
+                second *= beta2
+                second += (1 - beta2) * grad ** 2
+                param -= learning_rate * (first / (1 - beta1 ** step)) / (np.sqrt(second / (1 - beta2 ** step)) + eps)
+
+        return cls(
+            categories,
+            weights.astype(np.float32),
+            bias.astype(np.float32),
+            idf.astype(np.float32),
+            {**(metadata or {}), "examples": n_examples, "trained_at": time.time()}
+        )
+
+    def save(self, path: str):
+        # Written beside the target and renamed, so a running server never
+        # loads a half-written file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                weights=self.weights,
+                bias=self.bias,
+                idf=self.idf,
+                categories=np.array(self.categories),
+                metadata=np.array(json.dumps(self.metadata))
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalClassifier":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                [str(category) for category in data["categories"]],
+                data["weights"],
+                data["bias"],
+                data["idf"],
+                json.loads(str(data["metadata"]))
+            )
+
+# Model loaded from LOCAL_CLASSIFIER_PATH; reloaded when the file changes,
+# so retraining takes effect without a restart
+_lock = threading.Lock()
+_loaded = {"mtime": None, "model": None}
+
+def get_model() -> Optional[LocalClassifier]:
+    if not LOCAL_CLASSIFIER_ENABLED or np is None:
+        return None
+    try:
+        mtime = os.stat(LOCAL_CLASSIFIER_PATH).st_mtime
+    except OSError:
+        return None
+    with _lock:
+        if _loaded["mtime"] != mtime:
+            _loaded["mtime"] = mtime
+            try:
+                _loaded["model"] = LocalClassifier.load(LOCAL_CLASSIFIER_PATH)
+            except Exception as e:
+                print(f"Error loading local classifier: {str(e)}")
+                _loaded["model"] = None
+        return _loaded["model"]
+
+def classify_locally(subject: str, sender: str, content: str, prompt_version: str) -> Optional[dict]:
+    """
+    The local model's answer when it is confident enough, else None. A model
+    trained on labels from another prompt version is not used.
+    """
+    model = get_model()
+    if model is None or model.metadata.get("prompt_version") != prompt_version:
+        return None
+    return model.classify(subject, sender, content, LOCAL_CLASSIFIER_THRESHOLD)
+
+def evaluate(model: LocalClassifier, examples: List[dict], threshold: float) -> dict:
+    """Agreement with the LLM labels, overall and above the threshold, plus per-email latency."""
+    latencies_us = []
+    correct = covered = covered_correct = 0
+    by_category = {category: {"examples": 0, "correct": 0} for category in model.categories}
+    for example in examples:
+        start = time.perf_counter()
+        probabilities = model.predict_proba(example["subject"], example["sender"], example["content"])
+        latencies_us.append((time.perf_counter() - start) * 1e6)
+
+        best = int(probabilities.argmax())
+        hit = model.categories[best] == example["category"]
+        correct += hit
+        if probabilities[best] >= threshold:
+            covered += 1
+            covered_correct += hit
+        if example["category"] in by_category:
+            by_category[example["category"]]["examples"] += 1
+            by_category[example["category"]]["correct"] += hit
+
+    latencies_us.sort()
+    total = len(examples)
+    return {
+        "examples": total,
+        "threshold": threshold,
+        "accuracy": correct / total if total else 0.0,
+        # Share of emails the tier would answer, and how often it agrees with the LLM there
+        "coverage": covered / total if total else 0.0,
+        "accuracy_above_threshold": covered_correct / covered if covered else 0.0,
+        "by_category": {
+            category: {**counts, "accuracy": counts["correct"] / counts["examples"] if counts["examples"] else 0.0}
+            for category, counts in by_category.items()
+        },
+        "latency_us": {
+            "p50": latencies_us[total // 2] if total else 0.0,
+            "p99": latencies_us[min(total - 1, int(total * 0.99))] if total else 0.0,
+        },
+    }
+
+def _load_examples(db_path: str) -> tuple:
+    """(prompt_version, categories, examples) from the classification store."""
+    from classification_store import ClassificationStore
+    from email_classifier import CLASSIFICATION_CATEGORIES, CLASSIFICATION_PROMPT_VERSION
+    from email_normalizer import normalize_with_report
+
+    store = ClassificationStore(CLASSIFICATION_PROMPT_VERSION, db_path)
+    examples = store.training_examples()
+    # The classifier sees normalized bodies at inference time, so train on them too
+    for example in examples:
+        example["content"] = normalize_with_report(example["content"])[0]
+    return CLASSIFICATION_PROMPT_VERSION, CLASSIFICATION_CATEGORIES, examples
+
+def _print_report(title: str, report: dict):
+    print(f"{title}: {report['examples']} emails, accuracy {report['accuracy']:.1%}, "
+          f"coverage at {report['threshold']} {report['coverage']:.1%} "
+          f"(accuracy there {report['accuracy_above_threshold']:.1%}), "
+          f"p50 {report['latency_us']['p50']:.0f} us, p99 {report['latency_us']['p99']:.0f} us")
+    for category, counts in report["by_category"].items():
+        print(f"  {category:8} {counts['correct']:5}/{counts['examples']:<5} {counts['accuracy']:.1%}")
+
+def main():
+    from classification_store import CLASSIFICATION_DB_PATH
+
+    parser = argparse.ArgumentParser(description="Train or evaluate the local email classifier")
+    parser.add_argument("command", choices=["train", "evaluate"])
+    parser.add_argument("--db", default=CLASSIFICATION_DB_PATH, help="classification store with LLM labels")
+    parser.add_argument("--model", default=LOCAL_CLASSIFIER_PATH, help="model file to write or evaluate")
+    parser.add_argument("--threshold", type=float, default=LOCAL_CLASSIFIER_THRESHOLD)
+    parser.add_argument("--test-fraction", type=float, default=0.2, help="held-out share for the report")
+    parser.add_argument("--features", type=int, default=DEFAULT_FEATURES)
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--learning-rate", type=float, default=0.05)
+    parser.add_argument("--l2", type=float, default=1e-5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    if np is None:
+        sys.exit("NumPy is required: pip install numpy")
+
+    prompt_version, categories, examples = _load_examples(args.db)
+    report = {"prompt_version": prompt_version, "labelled_examples": len(examples)}
+
+    if args.command == "evaluate":
+        model = LocalClassifier.load(args.model)
+        if model.metadata.get("prompt_version") != prompt_version:
+            print("Warning: the model was trained on labels from another prompt version")
+        report["evaluation"] = evaluate(model, examples, args.threshold)
+        _print_report("Evaluation", report["evaluation"])
+    else:
+        if len(examples) < MIN_TRAINING_EXAMPLES:
+            sys.exit(f"Only {len(examples)} LLM-labelled emails in {args.db}; "
+                     f"at least {MIN_TRAINING_EXAMPLES} are needed")
+
+        def fit(training_examples):
+            return LocalClassifier.train(
+                training_examples, categories, args.features, args.epochs,
+                args.learning_rate, args.l2, {"prompt_version": prompt_version}
+            )
+
+        shuffled = list(examples)
+        random.Random(args.seed).shuffle(shuffled)
+        holdout = int(len(shuffled) * args.test_fraction)
+        if holdout:
+            start = time.perf_counter()
+            model = fit(shuffled[holdout:])
+            report["train_seconds"] = time.perf_counter() - start
+            report["holdout"] = evaluate(model, shuffled[:holdout], args.threshold)
+            _print_report("Held-out", report["holdout"])
+
+        # The saved model is refit on every example
+        model = fit(shuffled)
+        model.save(args.model)
+        report["model"] = args.model
+        print(f"Model trained on {len(shuffled)} emails written to {args.model}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+# metrics.py
+import math
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Prometheus text exposition format, written by hand so the backend does not
+# need prometheus_client. Metrics are process-local.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers cache hits (ms) up to long summaries (a minute)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> tuple:
+        return tuple(str(labels.get(label, "")) for label in self.labelnames)
+
+    def _labels(self, key: tuple, **extra) -> Dict[str, str]:
+        return {**dict(zip(self.labelnames, key)), **extra}
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return self.header() + [
+            f"{self.name}{_format_labels(self._labels(key))} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series = {}  # key -> [bucket counts, sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * len(self.buckets), 0.0, 0]
+                self._series[key] = series
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][idx] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        lines = self.header()
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = self._labels(key, le=_format_value(float(bound)))
+                lines.append(f"{self.name}_bucket{_format_labels(labels)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self._labels(key))} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self._labels(key))} {count}")
+        return lines
+
+# A collector returns (name, kind, documentation, [(labels, value)]) tuples
+# read from existing stats at scrape time
+Collector = Callable[[], List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                print(f"Error collecting metrics: {str(e)}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+# HTTP (recorded by the middleware in app.py)
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests by route, method and status code.", ("route", "method", "status")
+)
+HTTP_LATENCY = registry.histogram(
+    "http_request_duration_seconds",
+    "Time until the response headers are sent, by route (streams are timed to their first byte).",
+    ("route", "method")
+)
+HTTP_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled, by route.", ("route",)
+)
+
+# LLM calls (recorded by LazyLLM in llm_provider.py)
+LLM_CALLS = registry.counter(
+    "llm_calls_total", "Provider calls by analyzer module and outcome (retries count separately).",
+    ("module", "outcome")
+)
+LLM_LATENCY = registry.histogram(
+    "llm_call_duration_seconds", "Provider call latency by analyzer module, excluding scheduler queueing.",
+    ("module", "mode")
+)
+LLM_TTFT = registry.histogram(
+    "llm_time_to_first_token_seconds", "Time to the first streamed chunk by analyzer module.", ("module",)
+)
+LLM_TOKENS = registry.counter(
+    "llm_tokens_total", "Tokens reported by the provider, by analyzer module and direction (input/output).",
+    ("module", "direction")
+)
+JSON_PARSE_FAILURES = registry.counter(
+    "llm_json_parse_failures_total",
+    "Model replies that could not be parsed and were replaced by a default result, by analyzer module.",
+    ("module",)
+)
+
+def record_parse_failure(module: str):
+    JSON_PARSE_FAILURES.inc(module=module)
+
+def record_usage(module: str, response) -> Optional[dict]:
+    """Count the token usage a LangChain message reports (usage_metadata)."""
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return None
+    LLM_TOKENS.inc(usage.get("input_tokens", 0), module=module, direction="input")
+    LLM_TOKENS.inc(usage.get("output_tokens", 0), module=module, direction="output")
+    return usage
@@ -0,0 +1,169 @@
+# near_duplicate.py
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# Reuse the analysis of an email that differs from an earlier one only by
+# ids, numbers or timestamps (alert storms, newsletters, automated invoices)
+NEAR_DUPLICATE_ENABLED = os.getenv("NEAR_DUPLICATE_ENABLED", "1") != "0"
+# Largest Hamming distance between 64-bit SimHash fingerprints that still
+# counts as the same email
+NEAR_DUPLICATE_MAX_DISTANCE = int(os.getenv("NEAR_DUPLICATE_MAX_DISTANCE", "3"))
+NEAR_DUPLICATE_MAX_ENTRIES = int(os.getenv("NEAR_DUPLICATE_MAX_ENTRIES", "50000"))
+
+# Shorter emails are left alone: a single changed word can flip their meaning
+MIN_SHINGLES = 8
+SHINGLE_SIZE = 3
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_HEX_ID = re.compile(r"^[0-9a-f]{8,}$")
+
+def _tokens(text: str) -> List[str]:
+    # Anything carrying a digit (ids, amounts, dates, times) or a long hex id
+    # is masked, so emails that differ only there get the same shingles
+    return [
+        "#" if any(char.isdigit() for char in token) or _HEX_ID.match(token) else token
+        for token in _TOKEN.findall((text or "").lower())
+    ]
+
+def _hash64(shingle: str) -> str:
+    digest = hashlib.blake2b(shingle.encode(), digest_size=8).digest()
+    return format(int.from_bytes(digest, "big"), "064b")
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash of the text's word shingles; None if the text is too short."""
+    tokens = _tokens(text)
+    shingles = {" ".join(tokens[idx:idx + SHINGLE_SIZE]) for idx in range(len(tokens) - SHINGLE_SIZE + 1)}
+    if len(shingles) < MIN_SHINGLES:
+        return None
+    bits = [_hash64(shingle) for shingle in shingles]
+    fingerprint = 0
+    # Each fingerprint bit is the majority vote of that bit over all shingles
+    for column in zip(*bits):
+        fingerprint = (fingerprint << 1) | (column.count("1") * 2 > len(bits))
+    return fingerprint
+
+def partition_key(sender: str, *extra: Optional[str]) -> str:
+    """Emails are only compared with others from the same sender (and context)."""
+    return "\n".join([(sender or "").strip().lower()] + [value or "" for value in extra])
+
+class NearDuplicateIndex:
+    """
+    SimHash fingerprints of analyzed emails with their results, banded for
+    LSH: the 64 bits are split into max_distance + 1 bands, so any two
+    fingerprints within max_distance share at least one whole band. A lookup
+    only compares against emails in the matching band buckets, not the whole
+    index. The oldest entries are evicted beyond max_entries.
+    """
+
+    def __init__(
+        self,
+        max_distance: int = NEAR_DUPLICATE_MAX_DISTANCE,
+        max_entries: int = NEAR_DUPLICATE_MAX_ENTRIES,
+        enabled: bool = NEAR_DUPLICATE_ENABLED
+    ):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.enabled = enabled
+        bands = max_distance + 1
+        width = 64 // bands
+        # (shift, mask) per band; the last band takes the leftover bits
+        self._bands = [
+            (idx * width, (1 << (width if idx < bands - 1 else 64 - width * (bands - 1))) - 1)
+            for idx in range(bands)
+        ]
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # entry id -> (partition, fingerprint, value)
+        self._buckets = {}  # (partition, band, band bits) -> {entry ids}
+        self._next_id = 0
+        self.lookups = 0
+        self.hits = 0
+        self.candidates_checked = 0
+
+    def _bucket_keys(self, partition: str, fingerprint: int) -> List[tuple]:
+        return [
+            (partition, band, (fingerprint >> shift) & mask)
+            for band, (shift, mask) in enumerate(self._bands)
+        ]
+
+    def lookup(self, partition: str, text: str) -> Optional[dict]:
+        """The stored value of the closest near-duplicate, or None."""
+        if not self.enabled:
+            return None
+        fingerprint = simhash(text)
+        if fingerprint is None:
+            return None
+
+        with self._lock:
+            self.lookups += 1
+            candidates = set()
+            for key in self._bucket_keys(partition, fingerprint):
+                candidates.update(self._buckets.get(key, ()))
+            self.candidates_checked += len(candidates)
+
+            best_id, best_distance = None, self.max_distance + 1
+            for entry_id in candidates:
+                distance = bin(self._entries[entry_id][1] ^ fingerprint).count("1")
+                if distance < best_distance:
+                    best_id, best_distance = entry_id, distance
+            if best_id is None:
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            return dict(self._entries[best_id][2])
+
+    def add(self, partition: str, text: str, value: dict):
+        if not self.enabled:
+            return
+        fingerprint = simhash(text)
+        if fingerprint is None:
+            return
+
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (partition, fingerprint, value)
+            for key in self._bucket_keys(partition, fingerprint):
+                self._buckets.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        entry_id, (partition, fingerprint, _) = self._entries.popitem(last=False)
+        for key in self._bucket_keys(partition, fingerprint):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                # Stays far below the entry count while the banding is doing its job
+                "avg_candidates_per_lookup": self.candidates_checked / self.lookups if self.lookups else 0.0
+            }
+
+def group_near_duplicates(items: List[Tuple[str, str]]) -> Dict[int, int]:
+    """
+    Group a batch before it is analyzed. items are (partition, text) pairs;
+    returns {index: index of the earlier near-duplicate whose result it can
+    reuse}. Indexes missing from the result have to be analyzed.
+    """
+    batch_index = NearDuplicateIndex(max_entries=max(1, len(items)))
+    followers = {}
+    for idx, (partition, text) in enumerate(items):
+        match = batch_index.lookup(partition, text)
+        if match is not None:
+            followers[idx] = match["leader"]
+        else:
+            batch_index.add(partition, text, {"leader": idx})
+    return followers
@@ -0,0 +1,187 @@
+# response_cache.py
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+# Cache configuration
+CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+CACHE_DB_PATH = os.getenv("LLM_CACHE_DB_PATH")  # Optional on-disk tier, e.g. "llm_cache.sqlite3"
+CACHE_DB_MAX_ENTRIES = int(os.getenv("LLM_CACHE_DB_MAX_ENTRIES", "200000"))
+
+# How many disk writes happen between size/TTL sweeps of the SQLite tier
+_DB_PRUNE_INTERVAL = 500
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def normalize_text(text: Optional[str]) -> str:
+    """Collapse whitespace so cosmetic differences do not miss the cache."""
+    return " ".join((text or "").split())
+
+def make_cache_key(
+    namespace: str,
+    inputs: list,
+    model: str,
+    temperature: float,
+    template: str
+) -> str:
+    """
+    Build a content-addressed key from the normalized inputs, the model
+    settings and the prompt template. Editing a prompt changes its hash, so
+    stale answers are never served after a prompt change.
+    """
+    payload = json.dumps(
+        {
+            "namespace": namespace,
+            "inputs": [normalize_text(value) for value in inputs],
+            "model": model,
+            "temperature": temperature,
+            "template": hash_text(template),
+        },
+        sort_keys=True,
+    )
+    return hash_text(payload)
+
+class ResponseCache:
+    """
+    Two-tier cache for parsed LLM results: an in-memory LRU in front of an
+    optional SQLite table that survives restarts. Values must be
+    JSON-serializable.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        ttl_seconds: float = CACHE_TTL_SECONDS,
+        db_path: Optional[str] = CACHE_DB_PATH,
+        db_max_entries: int = CACHE_DB_MAX_ENTRIES,
+        enabled: bool = CACHE_ENABLED
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_max_entries = db_max_entries
+        self.enabled = enabled
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_writes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)"
+            )
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, expires_at = json.loads(row[0]), row[1]
+                    if expires_at > now:
+                        self._db.execute(
+                            "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key)
+                        )
+                        self._db.commit()
+                        self._remember(key, expires_at, value)
+                        self.disk_hits += 1
+                        return value
+                    self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Any):
+        if not self.enabled:
+            return
+
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, value)
+
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), expires_at, now)
+                )
+                self._db_writes += 1
+                if self._db_writes % _DB_PRUNE_INTERVAL == 0:
+                    self._prune_db(now)
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "memory_entries": len(self._memory),
+                "disk_enabled": self._db is not None,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+            }
+
+    def _remember(self, key: str, expires_at: float, value: Any):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _prune_db(self, now: float):
+        """Drop expired rows, then the least recently used rows over the limit."""
+        self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        count = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        if count > self.db_max_entries:
+            self._db.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                (count - self.db_max_entries,)
+            )
+
+# Shared cache used by the deterministic (temperature=0) analyzers
+response_cache = ResponseCache()
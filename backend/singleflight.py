@@ -0,0 +1,102 @@
+# singleflight.py
+import os
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable
+
+SINGLEFLIGHT_ENABLED = os.getenv("LLM_SINGLEFLIGHT_ENABLED", "1") != "0"
+
+class _Call:
+    """A blocking call in progress that duplicate callers wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: while a call for a key is in
+    flight, duplicate callers wait for its result instead of making their
+    own. Nothing is kept once the call finishes, so this is not a cache.
+    Blocking callers (do) and coroutines (ado) are coalesced separately.
+    """
+
+    def __init__(self, enabled: bool = SINGLEFLIGHT_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> _Call
+        self._tasks = {}  # (event loop id, key) -> asyncio.Task
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        if not self.enabled:
+            return func()
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key: str, func: Callable[[], Awaitable]) -> Any:
+        if not self.enabled:
+            return await func()
+
+        task_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            if task is None:
+                task = asyncio.ensure_future(func())
+                self._tasks[task_key] = task
+                task.add_done_callback(lambda done: self._finish(task_key, done))
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        # Shielded so one caller going away (e.g. a closed browser tab) does
+        # not cancel the call the other callers are waiting on
+        return await asyncio.shield(task)
+
+    def _finish(self, task_key: tuple, task: asyncio.Task):
+        with self._lock:
+            self._tasks.pop(task_key, None)
+        # Mark the exception as retrieved in case every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.executed + self.coalesced
+            return {
+                "enabled": self.enabled,
+                "in_flight": len(self._calls) + len(self._tasks),
+                "executed_calls": self.executed,
+                "coalesced_calls": self.coalesced,
+                "saved_fraction": self.coalesced / total if total else 0.0
+            }
+
+# Shared by every LLM view (see LazyLLM in llm_provider)
+llm_singleflight = SingleFlight()
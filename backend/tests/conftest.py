@@ -0,0 +1,19 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+# The backend is a set of flat top-level modules run from the backend
+# directory; make them importable wherever pytest is started from
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """Route every LLM view to the benchmark's deterministic fake, with no latency."""
+    import llm_provider
+    from benchmarks.fake_llm import FakeLLM, LatencyModel
+
+    fake = FakeLLM(LatencyModel("fixed:0"))
+    monkeypatch.setattr(llm_provider.LazyLLM, "_client", lambda self: fake)
+    return fake
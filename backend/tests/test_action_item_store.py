@@ -0,0 +1,78 @@
+# tests/test_action_item_store.py
+import sqlite3
+
+import pytest
+
+from action_item_extractor import ActionItem
+from action_item_store import ActionItemStore
+
+def _items(*titles: str, priority: str = "medium") -> list:
+    return [ActionItem(title=title, priority=priority, confidence=0.8, reasoning="") for title in titles]
+
+def test_reextracting_replaces_pending_items_of_the_same_source(tmp_path):
+    store = ActionItemStore(str(tmp_path / "items.sqlite3"))
+    store.save_items(7, "Subject", _items("a", "b"), source="alice")
+    store.save_items(7, "Subject", _items("c"), source="bob")
+    store.save_items(7, "Subject", _items("d"), source="alice")
+
+    alice, _, _ = store.query(source="alice")
+    bob, _, _ = store.query(source="bob")
+    assert [item["title"] for item in alice] == ["d"]
+    assert [item["title"] for item in bob] == ["c"]
+    assert store.stats()["total_action_items"] == 2
+
+def test_confirmed_items_survive_reextraction(tmp_path):
+    store = ActionItemStore(str(tmp_path / "items.sqlite3"))
+    first = store.save_items(1, "Subject", _items("keep", "drop"))
+    store.update_status(first[0].id, "confirmed")
+    store.save_items(1, "Subject", _items("new"))
+
+    items, total, _ = store.query(email_id=1)
+    assert sorted(item["title"] for item in items) == ["keep", "new"]
+    assert total == 2
+    assert store.stats()["by_status"] == {"pending": 1, "confirmed": 1, "rejected": 0}
+
+def test_keyset_pages_cover_every_item_once(tmp_path):
+    store = ActionItemStore(str(tmp_path / "items.sqlite3"))
+    for email_id in range(7):
+        store.save_items(email_id, "Subject", _items(f"item {email_id}", priority="high" if email_id % 2 else "low"))
+
+    titles, cursor = [], None
+    while True:
+        items, total, cursor = store.query(priority="high", cursor=cursor, limit=2)
+        titles += [item["title"] for item in items]
+        if cursor is None:
+            break
+
+    assert total == 3
+    assert titles == ["item 5", "item 3", "item 1"]
+
+def test_counters_match_the_table_after_reopening(tmp_path):
+    db_path = str(tmp_path / "items.sqlite3")
+    store = ActionItemStore(db_path)
+    saved = store.save_items(1, "Subject", _items("a", "b", priority="high") + _items("c", priority="low"))
+    store.update_status(saved[2].id, "rejected")
+
+    stats = ActionItemStore(db_path).stats()
+    assert stats == store.stats()
+    assert stats["by_priority"] == {"high": 2, "medium": 0, "low": 1}
+    assert stats["average_confidence"] == pytest.approx(0.8)
+
+def test_tables_without_a_source_column_are_migrated(tmp_path):
+    db_path = str(tmp_path / "items.sqlite3")
+    db = sqlite3.connect(db_path)
+    db.execute(
+        "CREATE TABLE action_items (id INTEGER PRIMARY KEY AUTOINCREMENT, email_id INTEGER, "
+        "email_subject TEXT, title TEXT NOT NULL, description TEXT, due_date TEXT, priority TEXT NOT NULL, "
+        "suggested_assignee TEXT, status TEXT NOT NULL, confidence REAL NOT NULL, reasoning TEXT, "
+        "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+    )
+    db.execute(
+        "INSERT INTO action_items (email_id, title, priority, status, confidence, created_at, updated_at) "
+        "VALUES (1, 'old', 'low', 'pending', 0.5, 0, 0)"
+    )
+    db.commit()
+    db.close()
+
+    items, _, _ = ActionItemStore(db_path).query()
+    assert [(item["title"], item["source"]) for item in items] == [("old", "default")]
@@ -0,0 +1,69 @@
+# tests/test_classification_store.py
+from classification_store import ClassificationStore
+
+def _entry(key: str, category: str, tier: str = "llm", content: str = "Body") -> dict:
+    return {
+        "email_key": key,
+        "subject": f"Subject {key}",
+        "sender": "a@example.com",
+        "content": content,
+        "category": category,
+        "confidence": 0.9,
+        "tier": tier,
+    }
+
+def test_counters_follow_writes_and_reclassification(tmp_path):
+    store = ClassificationStore("v1", str(tmp_path / "store.sqlite3"))
+    store.record_many("threads", [_entry("1", "Sales"), _entry("2", "Billing"), _entry("3", "Sales")])
+    store.record_many("threads", [_entry("3", "Support")])
+
+    stats = store.stats("threads")
+    assert stats["total_emails"] == 3
+    assert (stats["sales"], stats["billing"], stats["support"]) == (1, 1, 1)
+    assert store.stats("other")["total_emails"] == 0
+
+def test_lookup_misses_on_edited_content(tmp_path):
+    store = ClassificationStore("v1", str(tmp_path / "store.sqlite3"))
+    store.record_many("threads", [_entry("1", "Sales", content="Send a quote")])
+
+    assert store.lookup("threads", "1", "Subject 1", "a@example.com", "Send  a quote")["category"] == "Sales"
+    assert store.lookup("threads", "1", "Subject 1", "a@example.com", "Send an invoice") is None
+
+def test_new_prompt_version_invalidates_stored_rows(tmp_path):
+    db_path = str(tmp_path / "store.sqlite3")
+    ClassificationStore("v1", db_path).record_many("threads", [_entry("1", "Sales")])
+
+    reopened = ClassificationStore("v1", db_path)
+    assert reopened.stats("threads")["total_emails"] == 1
+
+    upgraded = ClassificationStore("v2", db_path)
+    assert upgraded.stats("threads")["total_emails"] == 0
+    assert upgraded.lookup("threads", "1", "Subject 1", "a@example.com", "Body") is None
+    # Reclassifying under the new version does not subtract the stale row
+    upgraded.record_many("threads", [_entry("1", "Support")])
+    assert upgraded.stats("threads")["support"] == 1
+    assert upgraded.stats("threads")["total_emails"] == 1
+
+def test_prune_drops_missing_emails(tmp_path):
+    store = ClassificationStore("v1", str(tmp_path / "store.sqlite3"))
+    store.record_many("threads", [_entry("1", "Sales"), _entry("2", "Billing")])
+    store.prune("threads", ["2"])
+
+    stats = store.stats("threads")
+    assert (stats["total_emails"], stats["sales"], stats["billing"]) == (1, 0, 1)
+
+def test_training_examples_only_use_llm_labels_of_current_prompt(tmp_path):
+    path = str(tmp_path / "store.sqlite3")
+    ClassificationStore("v0", path).record_many("threads", [_entry("9", "Urgent")])
+    store = ClassificationStore("v1", path)
+    store.record_many("threads", [
+        _entry("1", "Sales", tier="llm"),
+        _entry("2", "Billing", tier="cache"),
+        _entry("3", "Support", tier="rules"),
+        _entry("4", "FYI", tier="local"),
+    ])
+
+    examples = store.training_examples()
+    assert [example["category"] for example in examples] == ["Sales", "Billing"]
+    assert set(examples[0]) == {"subject", "sender", "content", "category", "confidence"}
+    assert store.training_examples(min_confidence=0.95) == []
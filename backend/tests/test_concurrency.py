@@ -0,0 +1,115 @@
+# tests/test_concurrency.py
+import time
+import asyncio
+import threading
+
+from concurrency import gather_bounded, iter_bounded, map_bounded
+
+class InFlight:
+    """Counts concurrent calls and remembers the peak."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def enter(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def leave(self):
+        with self._lock:
+            self.current -= 1
+
+def test_gather_bounded_keeps_order_and_limit():
+    tracker = InFlight()
+
+    async def work(item):
+        tracker.enter()
+        # Later items finish first, so completion order differs from input order
+        await asyncio.sleep(0.001 * (10 - item))
+        tracker.leave()
+        return item * 2
+
+    results = asyncio.run(gather_bounded(work, range(10), max_concurrency=3))
+
+    assert results == [item * 2 for item in range(10)]
+    assert tracker.peak == 3
+
+def test_gather_bounded_empty():
+    async def work(item):
+        return item
+
+    assert asyncio.run(gather_bounded(work, [], max_concurrency=2)) == []
+
+def test_iter_bounded_yields_every_index_within_limit():
+    tracker = InFlight()
+
+    async def work(item):
+        tracker.enter()
+        await asyncio.sleep(0.001 * (item % 3))
+        tracker.leave()
+        return item + 100
+
+    async def collect():
+        return [pair async for pair in iter_bounded(work, range(12), max_concurrency=4)]
+
+    pairs = asyncio.run(collect())
+
+    assert sorted(pairs) == [(idx, idx + 100) for idx in range(12)]
+    assert tracker.peak == 4
+
+def test_iter_bounded_pulls_items_lazily():
+    pulled = []
+
+    def items():
+        for item in range(100):
+            pulled.append(item)
+            yield item
+
+    async def work(item):
+        return item
+
+    async def first():
+        async for pair in iter_bounded(work, items(), max_concurrency=2):
+            return pair
+
+    asyncio.run(first())
+
+    assert len(pulled) <= 3
+
+def test_iter_bounded_cancels_pending_calls_when_consumer_stops():
+    cancelled = []
+
+    async def work(item):
+        try:
+            await asyncio.sleep(0 if item == 0 else 10)
+        except asyncio.CancelledError:
+            cancelled.append(item)
+            raise
+        return item
+
+    async def first():
+        stream = iter_bounded(work, range(3), max_concurrency=3)
+        pair = await stream.__anext__()
+        await stream.aclose()
+        # Let the cancelled tasks run their handlers
+        await asyncio.sleep(0)
+        return pair
+
+    assert asyncio.run(first()) == (0, 0)
+    assert sorted(cancelled) == [1, 2]
+
+def test_map_bounded_keeps_order_and_limit():
+    tracker = InFlight()
+
+    def work(item):
+        tracker.enter()
+        time.sleep(0.002)
+        tracker.leave()
+        return item * item
+
+    assert map_bounded(work, range(8), max_concurrency=2) == [item * item for item in range(8)]
+    assert tracker.peak <= 2
+    assert map_bounded(work, [], max_concurrency=2) == []
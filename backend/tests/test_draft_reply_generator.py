@@ -0,0 +1,90 @@
+# tests/test_draft_reply_generator.py
+import json
+import uuid
+
+import pytest
+
+import draft_reply_generator
+from draft_reply_generator import TONES, generate_all_tone_variants, generate_draft_reply, _parse_tone_variants
+from response_cache import ResponseCache
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(draft_reply_generator, "draft_cache", ResponseCache(db_path=None, enabled=True))
+
+def _thread() -> str:
+    # Unique per test so the model calls are not shared through other caches
+    return f"From: Sarah <sarah@example.com>\nDate: Jan 10, 2026\nCan we move the review? ({uuid.uuid4().hex})"
+
+def test_parse_tone_variants_keeps_tones_with_a_body():
+    reply = "Here you go:\n" + json.dumps({
+        "professional": {"subject": "Re: Review", "body": "Dear team, " + "x" * 120},
+        "friendly": {"body": "Hi all!"},
+        "short": {"subject": "Re: Review", "body": ""},
+        "apologetic": "not an object"
+    })
+
+    drafts = _parse_tone_variants(reply, TONES, "Review")
+
+    assert list(drafts) == ["professional", "friendly"]
+    assert drafts["professional"].subject == "Re: Review"
+    assert drafts["professional"].preview.endswith("...") and len(drafts["professional"].preview) == 103
+    assert drafts["friendly"].subject == "Re: Review"
+    assert drafts["friendly"].tone == "friendly"
+
+def test_parse_tone_variants_without_json():
+    assert _parse_tone_variants("Sorry, I cannot help with that.", TONES, "Review") == {}
+    with pytest.raises(json.JSONDecodeError):
+        _parse_tone_variants("{not json}", TONES, "Review")
+
+def test_all_tones_come_from_one_call(fake_llm, fresh_cache):
+    result = generate_all_tone_variants("Review", "sarah@example.com", _thread())
+
+    assert [draft.tone for draft in result["drafts"]] == TONES
+    assert all(draft.tier == "llm" for draft in result["drafts"])
+    assert fake_llm.calls == 1
+
+def test_tones_missing_from_the_reply_are_generated_one_by_one(fake_llm, fresh_cache, monkeypatch):
+    reply = fake_llm.reply
+    monkeypatch.setattr(
+        fake_llm, "reply",
+        lambda prompt: json.dumps({"professional": {"subject": "Re: Review", "body": "Dear team"}})
+        if "one for EACH tone" in prompt else reply(prompt)
+    )
+
+    result = generate_all_tone_variants("Review", "sarah@example.com", _thread())
+
+    assert [draft.tone for draft in result["drafts"]] == TONES
+    assert result["drafts"][0].body == "Dear team"
+    assert fake_llm.calls == 1 + 3
+
+def test_unparseable_reply_falls_back_to_every_tone(fake_llm, fresh_cache, monkeypatch):
+    reply = fake_llm.reply
+    monkeypatch.setattr(fake_llm, "reply", lambda prompt: "{broken" + "}" if "one for EACH tone" in prompt else reply(prompt))
+
+    result = generate_all_tone_variants("Review", "sarah@example.com", _thread())
+
+    assert [draft.tone for draft in result["drafts"]] == TONES
+    assert all(draft.body != draft_reply_generator.FALLBACK_BODY for draft in result["drafts"])
+    assert fake_llm.calls == 1 + len(TONES)
+
+def test_switching_tones_is_served_from_the_draft_cache(fake_llm, fresh_cache):
+    thread = _thread()
+    generate_all_tone_variants("Review", "sarah@example.com", thread)
+
+    for tone in TONES:
+        assert generate_draft_reply("Review", "sarah@example.com", thread, tone=tone).tier == "cache"
+    assert fake_llm.calls == 1
+
+def test_cached_tone_is_not_requested_again(fake_llm, fresh_cache, monkeypatch):
+    thread = _thread()
+    generate_draft_reply("Review", "sarah@example.com", thread, tone="short")
+    prompts = []
+    reply = fake_llm.reply
+    monkeypatch.setattr(fake_llm, "reply", lambda prompt: prompts.append(prompt) or reply(prompt))
+
+    result = generate_all_tone_variants("Review", "sarah@example.com", thread)
+
+    assert result["drafts"][TONES.index("short")].tier == "cache"
+    assert len(prompts) == 1
+    assert "short:" not in prompts[0] and "professional:" in prompts[0]
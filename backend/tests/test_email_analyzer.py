@@ -0,0 +1,73 @@
+# tests/test_email_analyzer.py
+import json
+import uuid
+
+import pytest
+
+import email_analyzer
+from email_analyzer import _parse_analysis, analyze_email, batch_analyze_emails
+from response_cache import ResponseCache
+
+@pytest.fixture
+def analyzer(fake_llm, monkeypatch):
+    monkeypatch.setattr(email_analyzer, "response_cache", ResponseCache(db_path=None, enabled=True))
+    return fake_llm
+
+def _email(marker: str) -> tuple:
+    return "Contract renewal", "client@example.com", f"Please send the renewal terms by Friday. {marker}"
+
+def test_parse_analysis_reads_all_three_parts():
+    reply = "Result:\n" + json.dumps({
+        "classification": {"category": "Sales", "confidence": 0.8, "reasoning": "Renewal"},
+        "priority": {"priority_level": "high", "urgency_score": 8, "confidence": 0.7, "reasoning": "Deadline"},
+        "action_items": [{"title": "Send terms", "priority": "high", "confidence": 0.9}]
+    })
+
+    analysis = _parse_analysis(reply, email_id=7)
+
+    assert (analysis.email_id, analysis.classification.email_id) == (7, 7)
+    assert analysis.classification.category == "Sales"
+    assert analysis.priority.priority_level == "high"
+    assert [item.title for item in analysis.action_items] == ["Send terms"]
+
+def test_parse_analysis_defaults_unknown_category_and_missing_parts():
+    analysis = _parse_analysis('{"classification": {"category": "Spam"}}', email_id=1)
+
+    assert analysis.classification.category == "FYI"
+    assert analysis.action_items == []
+
+def test_cached_analysis_is_rebuilt_with_the_new_email_id(analyzer):
+    subject, sender, content = _email(uuid.uuid4().hex)
+
+    first = analyze_email(subject, sender, content, email_id=1)
+    second = analyze_email(subject, sender, content, email_id=2)
+
+    assert analyzer.calls == 1
+    assert (first.tier, second.tier) == ("llm", "cache")
+    assert (second.email_id, second.classification.email_id) == (2, 2)
+    assert second.classification.category == first.classification.category
+    assert second.priority == first.priority
+    assert second.action_items == first.action_items
+
+def test_failed_analysis_is_not_cached(analyzer, monkeypatch):
+    monkeypatch.setattr(analyzer, "reply", lambda prompt: "no json")
+    subject, sender, content = _email(uuid.uuid4().hex)
+
+    failed = analyze_email(subject, sender, content, email_id=3)
+    analyze_email(subject, sender, content, email_id=3)
+
+    assert failed.classification.confidence == 0.0
+    assert failed.action_items == []
+    assert analyzer.calls == 2
+
+def test_batch_keeps_order_and_ids(analyzer):
+    marker = uuid.uuid4().hex
+    emails = [
+        {"id": idx, "subject": f"Topic {idx}", "sender": "a@example.com", "content": f"Question {idx} {marker}"}
+        for idx in range(3)
+    ]
+
+    results = batch_analyze_emails(emails)
+
+    assert [result.email_id for result in results] == [0, 1, 2]
+    assert analyzer.calls == 3
@@ -0,0 +1,128 @@
+# tests/test_email_normalizer.py
+import uuid
+
+import pytest
+
+import email_normalizer
+from email_normalizer import normalization_stats, normalize_content, normalize_emails, normalize_with_report
+
+@pytest.fixture(autouse=True)
+def fresh_counters(monkeypatch):
+    monkeypatch.setattr(email_normalizer, "NORMALIZATION_ENABLED", True)
+    monkeypatch.setattr(email_normalizer, "normalization_counters", {})
+
+def test_cuts_quoted_history_after_reply_header():
+    text = (
+        "Can you send the report by Friday?\n\n"
+        "On Mon, Jan 5, 2026 at 9:00 AM Mike <mike@example.com> wrote:\n"
+        "> Here is last week's report.\n"
+        "> Thanks"
+    )
+
+    assert normalize_with_report(text)[0] == "Can you send the report by Friday?"
+
+def test_cuts_outlook_quote_block_and_inline_quotes():
+    outlook = "Approved.\n\nFrom: Sarah <sarah@example.com>\nSent: Monday\nTo: Team\nSubject: Budget\n\nOld text"
+    inline = "> earlier line\nMy answer is yes."
+
+    assert normalize_with_report(outlook)[0] == "Approved."
+    assert normalize_with_report(inline)[0] == "My answer is yes."
+
+def test_strips_signature_sign_off_footer_and_disclaimer():
+    text = (
+        "Please review the contract.\n\n"
+        "Best regards,\nJane Doe\nHead of Sales\n\n"
+        "Sent from my iPhone"
+    )
+    delimited = "Invoice attached.\n-- \nJane\n+1 555 0100"
+    disclaimer = "Payment is due.\n\nThis email is confidential and intended solely for the addressee."
+
+    assert normalize_with_report(text)[0] == "Please review the contract."
+    assert normalize_with_report(delimited)[0] == "Invoice attached."
+    assert normalize_with_report(disclaimer)[0] == "Payment is due."
+
+def test_sign_off_words_early_in_the_body_are_kept():
+    text = "Thanks\n" + "\n".join(f"Point {idx} of the plan." for idx in range(8))
+
+    assert normalize_with_report(text)[0].startswith("Thanks\nPoint 0")
+
+def test_thread_mode_keeps_from_headers_only():
+    thread = (
+        "From: Sarah <sarah@example.com>\nTo: Team\nDate: Monday\n\nCan we meet Wednesday?\n\n"
+        "---\n"
+        "From: Mike <mike@example.com>\nCc: Lisa\n\nWednesday works.\n\nCheers"
+    )
+
+    assert normalize_with_report(thread, thread=True)[0] == (
+        "From: Sarah <sarah@example.com>\nCan we meet Wednesday?\n\n---\n"
+        "From: Mike <mike@example.com>\nWednesday works."
+    )
+
+def test_never_returns_an_empty_body():
+    text = "> only quoted text"
+
+    normalized, report = normalize_with_report(text)
+    assert normalized == text
+    assert report["saved_tokens"] == 0
+
+def test_every_call_is_counted():
+    quoted = "Status update for the week.\n\nThanks\nJane\n\n> quoted " + "x" * 200
+    clean = "Status update for the week."
+
+    assert normalize_content(quoted, "priority") == clean
+    # Text that matches an earlier output (or is already clean) is still an
+    # email the analyzer prompted for
+    assert normalize_content(clean, "priority") == clean
+    assert normalize_content(clean, "priority") == clean
+    stats = normalization_stats()["priority"]
+    assert stats["emails"] == 3
+    assert stats["tokens_saved"] > 0
+
+def test_disabled_normalization_passes_text_through(monkeypatch):
+    monkeypatch.setattr(email_normalizer, "NORMALIZATION_ENABLED", False)
+
+    assert normalize_content("Hi\n> quoted", "classification") == "Hi\n> quoted"
+    assert "classification" not in normalization_stats()
+
+def test_normalize_emails_copies_dicts():
+    emails = [{"id": 1, "content": "Yes.\n> quoted"}]
+
+    assert normalize_emails(emails, "classification") == [{"id": 1, "content": "Yes."}]
+    assert emails[0]["content"] == "Yes.\n> quoted"
+
+def test_packed_priority_fallback_counts_each_email_once(fake_llm, monkeypatch):
+    from benchmarks.fake_llm import FakeLLM
+    from email_priority_detector import detect_priorities_packed
+
+    # The packed reply leaves every email out, so each one is retried alone
+    reply = FakeLLM.reply
+    monkeypatch.setattr(
+        fake_llm, "reply",
+        lambda prompt: "[]" if "Analyze EACH" in prompt else reply(fake_llm, prompt)
+    )
+    marker = uuid.uuid4().hex
+    emails = [
+        {"id": idx, "subject": f"Question {idx}", "sender": f"person{idx}@example.com",
+         "content": f"Could we talk about topic {idx} ({marker})?\n\n> quoted text"}
+        for idx in range(3)
+    ]
+
+    results = detect_priorities_packed(emails)
+
+    assert [result.tier for result in results] == ["llm"] * 3
+    assert normalization_stats()["priority"]["emails"] == 3
+
+def test_dashed_threads_keep_every_message():
+    pytest.importorskip("fastapi")
+    from app import DUMMY_THREADS
+
+    for thread in DUMMY_THREADS:
+        normalized = normalize_content(thread["content"], "classification")
+        senders = [line for line in thread["content"].split("\n") if line.startswith("From:")]
+        assert [line for line in normalized.split("\n") if line.startswith("From:")] == senders
+        # The last message survives too, not just its header
+        assert thread["content"].rstrip().split("\n")[-1].strip() in normalized
+
+def test_outlook_header_block_without_separator_is_still_cut():
+    text = "Sounds good.\n\nFrom: Mike <mike@example.com>\nSent: Monday\nTo: Sarah\n\nOld message"
+    assert normalize_with_report(text)[0] == "Sounds good."
@@ -0,0 +1,61 @@
+# tests/test_email_priority_detector.py
+import uuid
+
+import pytest
+
+import email_priority_detector
+from email_priority_detector import batch_detect_priorities, filter_by_priority, get_priority_recommendations
+from near_duplicate import NearDuplicateIndex
+from response_cache import ResponseCache
+
+@pytest.fixture
+def detector(fake_llm, monkeypatch):
+    monkeypatch.setattr(email_priority_detector, "priority_memo", ResponseCache(db_path=None, enabled=True))
+    monkeypatch.setattr(email_priority_detector, "priority_index", NearDuplicateIndex(enabled=True))
+    monkeypatch.setattr(email_priority_detector, "response_cache", ResponseCache(db_path=None, enabled=True))
+    return fake_llm
+
+def _report(idx: int, marker: str) -> dict:
+    return {
+        "id": idx,
+        "subject": "Weekly report",
+        "sender": "reports@example.com",
+        "content": f"Report {idx} for the team: the summary of the week is attached with notes from each group {marker}"
+    }
+
+def test_filter_then_recommendations_call_the_model_once_per_email(detector):
+    marker = uuid.uuid4().hex
+    emails = [
+        {"id": idx, "subject": f"Topic {idx}", "sender": f"person{idx}@example.com",
+         "content": f"Could we go over item {chr(97 + idx)} of the plan together? {marker} {chr(97 + idx) * 3}"}
+        for idx in range(4)
+    ]
+
+    high = filter_by_priority(emails, "high")
+    recommendations = get_priority_recommendations(emails)
+
+    assert detector.calls == len(emails)
+    assert recommendations["count"] == len(high)
+    assert [result.email_id for result in recommendations["high_priority_emails"]] == \
+        [result.email_id for result in sorted(high, key=lambda r: r.urgency_score, reverse=True)]
+
+def test_duplicate_emails_in_a_batch_are_detected_once(detector):
+    email = _report(1, uuid.uuid4().hex)
+
+    results = batch_detect_priorities([email, {**email, "id": 2}])["results"]
+
+    assert detector.calls == 1
+    assert [result.email_id for result in results] == [1, 2]
+    assert results[1].priority_level == results[0].priority_level
+
+def test_memoized_near_duplicate_is_reported_as_a_cache_hit(detector):
+    marker = uuid.uuid4().hex
+    batch_detect_priorities([_report(1, marker)])
+    # A near-duplicate reuses the first email's detection...
+    reused = batch_detect_priorities([_report(2, marker)])["results"][0]
+    assert (reused.tier, reused.reused_from) == ("near_duplicate", 1)
+
+    # ...and is served from the memo afterwards, which is not a reuse
+    memoized = batch_detect_priorities([_report(2, marker)])["results"][0]
+    assert (memoized.tier, memoized.reused_from, memoized.email_id) == ("cache", None, 2)
+    assert detector.calls == 1
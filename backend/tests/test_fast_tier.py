@@ -0,0 +1,49 @@
+# tests/test_fast_tier.py
+import fast_tier
+from fast_tier import classify_by_rules, detect_priority_by_rules, record_tier, tier_stats
+
+def test_billing_sender_with_billing_keywords_is_decided_locally():
+    result = classify_by_rules(
+        "Invoice for January",
+        "billing@paymentservice.com",
+        "Your invoice is ready. The amount due must be paid by the renewal date."
+    )
+
+    assert result["category"] == "Billing"
+    assert result["confidence"] >= fast_tier.FAST_TIER_THRESHOLD
+    assert "sender billing@" in result["reasoning"]
+
+def test_ambiguous_email_escalates():
+    assert classify_by_rules("Quick question", "jane@example.com", "Can we talk tomorrow?") is None
+    # Billing and sales signals in equal measure
+    assert classify_by_rules("Quote", "jane@example.com", "Please send a quote and the invoice.") is None
+
+def test_bulk_sender_without_urgency_is_low_priority():
+    result = detect_priority_by_rules("Weekly digest", "noreply@news.example.com", "Here is what happened this week.")
+
+    assert result["priority_level"] == "low"
+    assert result["detected_signals"][0] == "automated sender noreply@"
+
+def test_strong_urgency_without_deferral_is_high_priority():
+    result = detect_priority_by_rules("URGENT: server down", "ops@example.com", "Production is down, fix ASAP.")
+
+    assert result["priority_level"] == "high"
+    assert {"urgent", "down", "asap"} <= set(result["detected_signals"])
+
+def test_deferral_language_escalates():
+    assert detect_priority_by_rules("Urgent-ish", "ops@example.com", "Critical fix, but no rush, next week is fine.") is None
+
+def test_disabled_tier_never_answers(monkeypatch):
+    monkeypatch.setattr(fast_tier, "FAST_TIER_ENABLED", False)
+
+    assert classify_by_rules("Invoice", "billing@example.com", "Invoice and payment receipt") is None
+    assert detect_priority_by_rules("Digest", "noreply@example.com", "Weekly digest") is None
+
+def test_tier_stats_report_skipped_network_fraction(monkeypatch):
+    monkeypatch.setattr(fast_tier, "tier_counters", {})
+    record_tier("classification", "rules", 3)
+    record_tier("classification", "llm")
+
+    stats = tier_stats()["classification"]
+    assert stats["total"] == 4
+    assert stats["skipped_network_fraction"] == 0.75
@@ -0,0 +1,115 @@
+# tests/test_job_queue.py
+import asyncio
+
+import pytest
+
+from job_queue import JobQueue, JobStore
+
+async def _run_job(store: JobStore, handler, payloads) -> str:
+    queue = JobQueue(store, {"echo": handler}, workers=1, max_concurrency=2)
+    await queue.start()
+    job_id = await queue.submit("echo", payloads)
+    await queue._queue.join()
+    await queue.stop()
+    return job_id
+
+def test_job_checkpoints_every_result(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+
+    async def handler(payload):
+        return {"doubled": payload["n"] * 2}
+
+    job_id = asyncio.run(_run_job(store, handler, [{"n": n} for n in range(5)]))
+
+    job = store.get_job(job_id)
+    assert (job["status"], job["completed"], job["progress"]) == ("completed", 5, 1.0)
+    assert [result for _, result in store.results(job_id)] == [{"doubled": n * 2} for n in range(5)]
+
+def test_failed_email_stays_pending(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+
+    async def handler(payload):
+        if payload["n"] == 2:
+            raise RuntimeError("provider unavailable")
+        return payload["n"]
+
+    job_id = asyncio.run(_run_job(store, handler, [{"n": n} for n in range(4)]))
+
+    job = store.get_job(job_id)
+    assert job["status"] == "failed"
+    assert job["completed"] == 3
+    assert "1 of 4" in job["error"]
+    assert store.pending_items(job_id) == [(2, {"n": 2})]
+
+def test_restart_resumes_only_unfinished_emails(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(db_path)
+    # A previous process finished one email, then died mid-job
+    job_id = store.create_job("echo", [{"n": n} for n in range(3)])
+    store.set_status(job_id, "running")
+    store.save_result(job_id, 0, "done before the crash")
+    seen = []
+
+    async def handler(payload):
+        seen.append(payload["n"])
+        return payload["n"]
+
+    async def restart():
+        queue = JobQueue(JobStore(db_path), {"echo": handler}, workers=1)
+        await queue.start()
+        await queue._queue.join()
+        await queue.stop()
+
+    asyncio.run(restart())
+
+    assert sorted(seen) == [1, 2]
+    job = store.get_job(job_id)
+    assert (job["status"], job["completed"]) == ("completed", 3)
+    assert [result for _, result in store.results(job_id)] == ["done before the crash", 1, 2]
+
+def test_unknown_job_kind_is_rejected(tmp_path):
+    async def submit():
+        queue = JobQueue(JobStore(str(tmp_path / "jobs.sqlite3")), {}, workers=1)
+        await queue.start()
+        try:
+            await queue.submit("missing", [{}])
+        finally:
+            await queue.stop()
+
+    with pytest.raises(ValueError, match="missing"):
+        asyncio.run(submit())
+
+def test_resume_reruns_only_failed_emails(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    seen = []
+    outage = {"active": True}
+
+    async def handler(payload):
+        seen.append(payload["n"])
+        if payload["n"] == 1 and outage["active"]:
+            raise RuntimeError("provider unavailable")
+        return payload["n"]
+
+    async def scenario():
+        queue = JobQueue(store, {"echo": handler}, workers=1)
+        await queue.start()
+        job_id = await queue.submit("echo", [{"n": n} for n in range(3)])
+        await queue._queue.join()
+        failed = store.get_job(job_id)
+
+        outage["active"] = False
+        seen.clear()
+        await queue.resume(job_id)
+        await queue._queue.join()
+        with pytest.raises(ValueError, match="completed"):
+            await queue.resume(job_id)
+        await queue.stop()
+        return job_id, failed
+
+    job_id, failed = asyncio.run(scenario())
+
+    assert failed["status"] == "failed"
+    assert seen == [1]
+    job = store.get_job(job_id)
+    assert (job["status"], job["completed"], job["error"]) == ("completed", 3, None)
+    assert [result for _, result in store.results(job_id)] == [0, 1, 2]
@@ -0,0 +1,41 @@
+# tests/test_keywords.py
+from keywords import KEYWORD_MATCHER, KeywordMatcher
+
+def test_matches_whole_words_only():
+    matcher = KeywordMatcher({"urgent": ["down", "late"]})
+
+    assert matcher.groups("Please download the latest translation") == {}
+    assert matcher.groups("The site is down and we are late.") == {"urgent": ["down", "late"]}
+
+def test_matching_is_case_insensitive_with_positions():
+    matcher = KeywordMatcher({"urgent": ["asap"]})
+
+    hits = matcher.find_all("Reply ASAP please")
+    assert [(hit.keyword, hit.start, hit.end) for hit in hits] == [("asap", 6, 10)]
+
+def test_longest_phrase_wins_and_nested_keywords_are_reported():
+    matcher = KeywordMatcher({"medium": ["please review"], "polite": ["please"]})
+
+    hits = matcher.find_all("please review the draft")
+    assert [(hit.keyword, hit.group, hit.start) for hit in hits] == [
+        ("please review", "medium", 0),
+        ("please", "polite", 0),
+    ]
+
+def test_keyword_in_several_groups_hits_each_group():
+    matcher = KeywordMatcher({"medium": ["fyi"], "low": ["fyi"]})
+
+    assert matcher.groups("FYI: the office is closed") == {"medium": ["fyi"], "low": ["fyi"]}
+
+def test_score_sums_group_weights():
+    matcher = KeywordMatcher({"urgent": ["urgent"], "low": ["no rush"]}, {"urgent": 2.0, "low": -2.0})
+
+    assert matcher.score("urgent, urgent") == 4.0
+    assert matcher.score("urgent but no rush") == 0.0
+    assert matcher.score("") == 0.0
+
+def test_scan_and_shared_matcher():
+    results = KEYWORD_MATCHER.scan(["Invoice attached", "Our download page"])
+
+    assert "Billing" in {hit.group for hit in results[0]}
+    assert "urgent" not in {hit.group for hit in results[1]}
@@ -0,0 +1,229 @@
+# tests/test_llm_scheduler.py
+import time
+import asyncio
+from email.utils import formatdate
+
+import pytest
+
+import llm_scheduler
+from llm_scheduler import AdaptiveLimiter, LLMScheduler, TokenBucket, _is_retryable, _retry_after
+
+class Response:
+    def __init__(self, headers=None, usage=None):
+        self.headers = headers or {}
+        self.usage_metadata = usage
+
+class ProviderError(Exception):
+    """Shaped like the provider SDK's HTTP errors: status_code plus response.headers."""
+
+    def __init__(self, status_code: int, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = Response(headers)
+
+class APIConnectionError(Exception):
+    pass
+
+class FakeProvider:
+    """Fails with the given errors in turn, then answers."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return Response(usage={"total_tokens": 10})
+
+class Sleeps:
+    """Backoff sleeps as (seconds, slots in flight while sleeping), recorded instead of waited."""
+
+    def __init__(self):
+        self.limiter = None
+        self.calls = []
+
+    def record(self, seconds: float):
+        if seconds:
+            self.calls.append((seconds, self.limiter.in_flight))
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorder = Sleeps()
+
+    async def fake_asleep(seconds):
+        recorder.record(seconds)
+
+    monkeypatch.setattr(llm_scheduler.time, "sleep", recorder.record)
+    monkeypatch.setattr(llm_scheduler.asyncio, "sleep", fake_asleep)
+    return recorder
+
+def _scheduler(sleeps: Sleeps, **kwargs) -> LLMScheduler:
+    options = {"rpm": 0, "tpm": 0, "max_retries": 3, "backoff_base": 0.1, "backoff_max": 30}
+    options.update(kwargs)
+    scheduler = LLMScheduler(limiter=AdaptiveLimiter(initial=4, minimum=1, maximum=8), **options)
+    sleeps.limiter = scheduler.limiter
+    return scheduler
+
+def test_token_bucket_reserve_and_refill(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(llm_scheduler.time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(per_minute=60)
+
+    assert bucket.reserve(60) == 0.0
+    # Empty bucket: one token per second
+    assert bucket.reserve(3) == pytest.approx(3.0)
+    now[0] += 3
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    # Unused estimate handed back
+    bucket.adjust(1)
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+def test_token_bucket_caps_oversized_requests(monkeypatch):
+    monkeypatch.setattr(llm_scheduler.time, "monotonic", lambda: 0.0)
+    bucket = TokenBucket(per_minute=60)
+
+    assert bucket.reserve(1000) == 0.0
+    assert bucket.reserve(1000) == pytest.approx(60.0)
+
+def test_limiter_halves_on_throttle_once_per_cooldown(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(llm_scheduler.time, "monotonic", lambda: now[0])
+    limiter = AdaptiveLimiter(initial=16, minimum=2, maximum=64, cooldown_seconds=1.0)
+
+    limiter.on_throttle()
+    limiter.on_throttle()
+    assert limiter.limit == 8
+
+    now[0] += 1
+    for _ in range(5):
+        limiter.on_throttle()
+        now[0] += 1
+    assert limiter.limit == 2
+
+def test_limiter_recovers_additively():
+    limiter = AdaptiveLimiter(initial=4, minimum=1, maximum=5)
+
+    # About +1 per round of `limit` successes
+    for _ in range(4):
+        limiter.on_success()
+    assert 4.9 < limiter.limit < 5.0
+    for _ in range(10):
+        limiter.on_success()
+    assert limiter.limit == 5
+
+def test_limiter_hands_released_slot_to_waiter():
+    async def scenario():
+        limiter = AdaptiveLimiter(initial=1, minimum=1, maximum=1)
+        await limiter.aacquire()
+        waiter = asyncio.ensure_future(limiter.aacquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        limiter.release()
+        await asyncio.wait_for(waiter, 1)
+        assert limiter.in_flight == 1
+
+    asyncio.run(scenario())
+
+def test_retry_after_parsing():
+    assert _retry_after(ProviderError(429, {"retry-after": "7"})) == 7.0
+    assert _retry_after(ProviderError(429, {"Retry-After": "-3"})) == 0.0
+    assert _retry_after(ProviderError(429, {"retry-after": formatdate(time.time() + 20, usegmt=True)})) == pytest.approx(20, abs=1.5)
+    assert _retry_after(ProviderError(429, {"retry-after": "soon"})) is None
+    assert _retry_after(ProviderError(429)) is None
+    assert _retry_after(ValueError("no response")) is None
+
+def test_retryable_errors():
+    assert _is_retryable(ProviderError(429))
+    assert _is_retryable(ProviderError(503))
+    assert _is_retryable(APIConnectionError("reset"))
+    assert not _is_retryable(ProviderError(400))
+    assert not _is_retryable(ValueError("bad prompt"))
+
+def test_call_retries_throttling_without_holding_a_slot(sleeps):
+    scheduler = _scheduler(sleeps)
+    provider = FakeProvider(ProviderError(429, {"retry-after": "2"}), ProviderError(503))
+
+    assert scheduler.call(provider).usage_metadata == {"total_tokens": 10}
+    assert provider.calls == 3
+    # Retry-After is honored and no slot is held while backing off
+    assert 2.0 <= sleeps.calls[0][0] <= 2.1
+    assert [in_flight for _, in_flight in sleeps.calls] == [0, 0]
+    assert scheduler.limiter.in_flight == 0
+    assert scheduler.limiter.limit < 4
+    stats = scheduler.stats()
+    assert (stats["calls"], stats["retries"], stats["throttled"], stats["server_errors"]) == (3, 2, 1, 1)
+
+def test_call_gives_up_after_max_retries(sleeps):
+    scheduler = _scheduler(sleeps, max_retries=2)
+    provider = FakeProvider(*[ProviderError(500) for _ in range(5)])
+
+    with pytest.raises(ProviderError):
+        scheduler.call(provider)
+    assert provider.calls == 3
+    assert scheduler.stats()["failures"] == 1
+    assert scheduler.limiter.in_flight == 0
+
+def test_call_raises_non_retryable_errors_at_once(sleeps):
+    scheduler = _scheduler(sleeps)
+    provider = FakeProvider(ProviderError(400))
+
+    with pytest.raises(ProviderError):
+        scheduler.call(provider)
+    assert provider.calls == 1
+    assert sleeps.calls == []
+
+def test_acall_retries_and_releases_slot_during_backoff(sleeps):
+    scheduler = _scheduler(sleeps)
+    provider = FakeProvider(ProviderError(429), APIConnectionError("reset"))
+
+    async def call():
+        return provider()
+
+    response = asyncio.run(scheduler.acall(call))
+
+    assert response.usage_metadata == {"total_tokens": 10}
+    assert provider.calls == 3
+    assert [in_flight for _, in_flight in sleeps.calls] == [0, 0]
+    assert scheduler.limiter.in_flight == 0
+
+def test_astream_retries_failures_before_the_first_chunk(sleeps):
+    scheduler = _scheduler(sleeps)
+    provider = FakeProvider(ProviderError(503))
+
+    def stream():
+        async def chunks():
+            provider()
+            yield "a"
+            yield "b"
+        return chunks()
+
+    async def collect():
+        return [chunk async for chunk in scheduler.astream(stream)]
+
+    assert asyncio.run(collect()) == ["a", "b"]
+    assert provider.calls == 2
+    assert [in_flight for _, in_flight in sleeps.calls] == [0]
+    assert scheduler.limiter.in_flight == 0
+
+def test_astream_raises_failures_after_the_first_chunk(sleeps):
+    scheduler = _scheduler(sleeps)
+    received = []
+
+    def stream():
+        async def chunks():
+            yield "a"
+            raise ProviderError(503)
+        return chunks()
+
+    async def collect():
+        async for chunk in scheduler.astream(stream):
+            received.append(chunk)
+
+    with pytest.raises(ProviderError):
+        asyncio.run(collect())
+    assert received == ["a"]
+    assert sleeps.calls == []
+    assert scheduler.limiter.in_flight == 0
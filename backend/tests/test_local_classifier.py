@@ -0,0 +1,73 @@
+# tests/test_local_classifier.py
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import local_classifier
+from local_classifier import LocalClassifier, evaluate
+
+CATEGORIES = ["Billing", "Sales"]
+
+def _examples() -> list:
+    billing = [
+        ("Invoice overdue", "Your invoice payment is overdue, please pay the outstanding balance"),
+        ("Refund request", "Please refund the duplicate charge on my invoice"),
+        ("Payment failed", "The card payment for the invoice failed, update billing details"),
+    ]
+    sales = [
+        ("Pricing question", "Can you send a quote for the enterprise plan pricing"),
+        ("Demo request", "We would like a product demo and a quote for fifty seats"),
+        ("Upgrade plan", "Interested in upgrading, what does the enterprise pricing include"),
+    ]
+    return [
+        {"subject": subject, "sender": f"{category.lower()}@example.com", "content": content, "category": category}
+        for category, pairs in (("Billing", billing), ("Sales", sales))
+        for subject, content in pairs
+    ]
+
+@pytest.fixture(scope="module")
+def model():
+    return LocalClassifier.train(_examples(), CATEGORIES, n_features=2 ** 12, epochs=200, metadata={"prompt_version": "v1"})
+
+def test_trained_model_separates_categories(model):
+    assert model.metadata["examples"] == 6
+    assert model.metadata["prompt_version"] == "v1"
+    result = model.classify("Overdue invoice", "billing@example.com", "The invoice payment is overdue", threshold=0.0)
+    assert result["category"] == "Billing"
+    assert model.classify("Quote", "sales@example.com", "Please send a quote for enterprise pricing", 0.0)["category"] == "Sales"
+
+def test_classify_returns_none_below_threshold(model):
+    assert model.classify("Hello", "someone@else.org", "Unrelated words entirely", threshold=0.999) is None
+
+def test_unknown_categories_are_ignored_in_training():
+    examples = _examples() + [{"subject": "x", "sender": "", "content": "y", "category": "Urgent"}]
+    trained = LocalClassifier.train(examples, CATEGORIES, n_features=2 ** 10, epochs=5)
+    assert trained.metadata["examples"] == 6
+
+def test_save_and_load_round_trip(model, tmp_path):
+    path = str(tmp_path / "model.npz")
+    model.save(path)
+    loaded = LocalClassifier.load(path)
+
+    assert loaded.categories == CATEGORIES
+    assert loaded.metadata == model.metadata
+    args = ("Refund", "billing@example.com", "Refund the invoice charge")
+    assert np.allclose(loaded.predict_proba(*args), model.predict_proba(*args))
+
+def test_classify_locally_requires_matching_prompt_version(model, tmp_path, monkeypatch):
+    path = str(tmp_path / "model.npz")
+    model.save(path)
+    monkeypatch.setattr(local_classifier, "LOCAL_CLASSIFIER_PATH", path)
+    monkeypatch.setattr(local_classifier, "LOCAL_CLASSIFIER_THRESHOLD", 0.0)
+    monkeypatch.setattr(local_classifier, "_loaded", {"mtime": None, "model": None})
+
+    args = ("Invoice overdue", "billing@example.com", "Please pay the overdue invoice")
+    assert local_classifier.classify_locally(*args, prompt_version="v1")["category"] == "Billing"
+    assert local_classifier.classify_locally(*args, prompt_version="v2") is None
+
+def test_evaluate_reports_accuracy_and_coverage(model):
+    report = evaluate(model, _examples(), threshold=0.0)
+    assert report["examples"] == 6
+    assert report["accuracy"] == 1.0
+    assert report["coverage"] == 1.0
+    assert report["by_category"]["Sales"]["examples"] == 3
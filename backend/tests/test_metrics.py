@@ -0,0 +1,65 @@
+# tests/test_metrics.py
+from metrics import Registry
+
+def test_counter_renders_help_type_and_labelled_samples():
+    registry = Registry()
+    counter = registry.counter("jobs_total", "Jobs by outcome.", ("outcome",))
+    counter.inc(outcome="ok")
+    counter.inc(2, outcome="ok")
+    counter.inc(outcome="failed")
+
+    assert registry.render().splitlines() == [
+        "# HELP jobs_total Jobs by outcome.",
+        "# TYPE jobs_total counter",
+        'jobs_total{outcome="failed"} 1',
+        'jobs_total{outcome="ok"} 3',
+    ]
+
+def test_gauge_set_and_dec():
+    registry = Registry()
+    gauge = registry.gauge("in_flight", "Requests in flight.")
+    gauge.set(5)
+    gauge.dec(2)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE in_flight gauge" in lines
+    assert "in_flight 3" in lines
+
+def test_histogram_buckets_are_cumulative_with_sum_and_count():
+    registry = Registry()
+    histogram = registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.5, 0.1, 1.0))
+    for value in (0.05, 0.2, 0.3, 2.0):
+        histogram.observe(value, route="/a")
+
+    assert registry.render().splitlines() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="0.5"} 3',
+        'latency_seconds_bucket{route="/a",le="1"} 3',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a"} 2.55',
+        'latency_seconds_count{route="/a"} 4',
+    ]
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    counter = registry.counter("errors_total", "Errors.", ("message",))
+    counter.inc(message='say "hi"\\\n')
+
+    assert 'errors_total{message="say \\"hi\\"\\\\\\n"} 1' in registry.render().splitlines()
+
+def test_collectors_are_rendered_and_failures_skipped():
+    registry = Registry()
+
+    def broken():
+        raise RuntimeError("boom")
+
+    registry.register_collector(broken)
+    registry.register_collector(lambda: [("cache_entries", "gauge", "Cached entries.", [({"tier": "memory"}, 7.0)])])
+
+    assert registry.render() == (
+        "# HELP cache_entries Cached entries.\n"
+        "# TYPE cache_entries gauge\n"
+        'cache_entries{tier="memory"} 7\n'
+    )
@@ -0,0 +1,148 @@
+# tests/test_near_duplicate.py
+import uuid
+
+import pytest
+
+import near_duplicate
+from near_duplicate import NearDuplicateIndex, group_near_duplicates, partition_key, simhash
+
+ALERT = (
+    "Alert {id} fired on host web-{host} at {time}: disk usage on the data volume "
+    "crossed the warning threshold and the cleanup job will run within the hour"
+)
+
+def _alert(alert_id: int, host: int = 1, time: str = "10:15") -> str:
+    return ALERT.format(id=alert_id, host=host, time=time)
+
+def test_ids_numbers_and_hex_ids_are_masked():
+    assert simhash(_alert(1001, 3, "10:15")) == simhash(_alert(2002, 7, "23:59"))
+    assert near_duplicate._tokens("Order deadbeef01 for 42 items") == ["order", "#", "for", "#", "items"]
+
+def test_short_texts_have_no_fingerprint():
+    assert simhash("Yes, works for me") is None
+    assert simhash("") is None
+
+def test_lookup_finds_near_duplicates_within_distance():
+    index = NearDuplicateIndex(max_distance=3, max_entries=10, enabled=True)
+    index.add("ops", _alert(1), {"category": "Urgent"})
+
+    assert index.lookup("ops", _alert(2, 5, "11:00")) == {"category": "Urgent"}
+    assert index.lookup("ops", "A completely different message about the quarterly budget review meeting next week") is None
+    stats = index.stats()
+    assert (stats["entries"], stats["lookups"], stats["hits"]) == (1, 2, 1)
+
+def test_lookup_returns_a_copy():
+    index = NearDuplicateIndex(enabled=True)
+    index.add("ops", _alert(1), {"category": "Urgent"})
+    index.lookup("ops", _alert(2))["category"] = "FYI"
+
+    assert index.lookup("ops", _alert(3))["category"] == "Urgent"
+
+def test_partitions_are_isolated():
+    index = NearDuplicateIndex(enabled=True)
+    index.add(partition_key("Alerts@Example.com"), _alert(1), {"category": "Urgent"})
+
+    assert index.lookup(partition_key(" alerts@example.com "), _alert(2)) is not None
+    assert index.lookup(partition_key("other@example.com"), _alert(2)) is None
+    assert index.lookup(partition_key("alerts@example.com", "VIP"), _alert(2)) is None
+
+def test_oldest_entries_are_evicted():
+    index = NearDuplicateIndex(max_entries=1, enabled=True)
+    index.add("a", _alert(1), {"category": "Urgent"})
+    index.add("b", _alert(1), {"category": "FYI"})
+
+    assert index.lookup("a", _alert(2)) is None
+    assert index.lookup("b", _alert(2)) == {"category": "FYI"}
+    assert index.stats()["entries"] == 1
+
+def test_disabled_index_stores_nothing():
+    index = NearDuplicateIndex(enabled=False)
+    index.add("ops", _alert(1), {"category": "Urgent"})
+
+    assert index.lookup("ops", _alert(1)) is None
+    assert index.stats()["lookups"] == 0
+
+def test_group_near_duplicates_points_followers_at_first_email():
+    items = [
+        ("ops", _alert(1)),
+        ("ops", "Lunch on Friday? We could try the new place near the office if everyone is free around noon"),
+        ("ops", _alert(2)),
+        ("other", _alert(3)),
+        ("ops", _alert(4)),
+    ]
+
+    assert group_near_duplicates(items) == {2: 0, 4: 0}
+
+@pytest.fixture
+def isolated_classifier(fake_llm, monkeypatch):
+    import email_classifier
+    import local_classifier
+
+    monkeypatch.setattr(email_classifier, "classification_index", NearDuplicateIndex(enabled=True))
+    monkeypatch.setattr(local_classifier, "LOCAL_CLASSIFIER_ENABLED", False)
+    return email_classifier
+
+def test_followers_are_classified_themselves_when_the_leader_fails(isolated_classifier, fake_llm, monkeypatch):
+    # The first (leader's) reply is not JSON; later calls answer normally
+    reply = fake_llm.reply
+    calls = []
+
+    def failing_first(prompt):
+        calls.append(prompt)
+        return "no json here" if len(calls) == 1 else reply(prompt)
+
+    monkeypatch.setattr(fake_llm, "reply", failing_first)
+    marker = uuid.uuid4().hex
+    emails = [
+        {"id": idx, "subject": "Disk alert", "sender": "monitor@example.com", "content": f"{_alert(idx)} {marker}"}
+        for idx in (1, 2, 3)
+    ]
+
+    results = isolated_classifier.classify_emails(emails, max_concurrency=1)
+
+    assert results[0].confidence == 0.0
+    assert [result.tier for result in results[1:]] == ["llm", "near_duplicate"]
+    assert results[2].reused_from in (1, 2)
+    assert all(result.confidence > 0 for result in results[1:])
+    assert [result.email_id for result in results] == [1, 2, 3]
+
+def test_followers_reuse_a_successful_leader(isolated_classifier):
+    marker = uuid.uuid4().hex
+    emails = [
+        {"id": idx, "subject": "Disk alert", "sender": "monitor@example.com", "content": f"{_alert(idx)} {marker}"}
+        for idx in (1, 2)
+    ]
+
+    results = isolated_classifier.classify_emails(emails)
+
+    assert results[1].tier == "near_duplicate"
+    assert results[1].reused_from == 1
+    assert results[1].category == results[0].category
+
+def test_priority_followers_are_detected_themselves_when_the_leader_fails(fake_llm, monkeypatch):
+    import email_priority_detector
+    from response_cache import ResponseCache
+
+    monkeypatch.setattr(email_priority_detector, "priority_index", NearDuplicateIndex(enabled=True))
+    monkeypatch.setattr(email_priority_detector, "priority_memo", ResponseCache(db_path=None, enabled=True))
+    reply = fake_llm.reply
+    calls = []
+
+    def failing_first(prompt):
+        calls.append(prompt)
+        return "no json here" if len(calls) == 1 else reply(prompt)
+
+    monkeypatch.setattr(fake_llm, "reply", failing_first)
+    marker = uuid.uuid4().hex
+    emails = [
+        {"id": idx, "subject": "Weekly report", "sender": "reports@example.com",
+         "content": f"Report {idx} for the team: the summary of the week is attached with notes from each group {marker}"}
+        for idx in (1, 2)
+    ]
+
+    results = email_priority_detector.batch_detect_priorities(emails, max_concurrency=1)["results"]
+
+    assert "parsing_error" in results[0].detected_signals
+    assert results[1].tier == "llm"
+    assert results[1].reused_from is None
+    assert "parsing_error" not in results[1].detected_signals
@@ -0,0 +1,67 @@
+# tests/test_response_cache.py
+import response_cache
+from response_cache import ResponseCache, make_cache_key
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+def _cache(monkeypatch, clock, **kwargs) -> ResponseCache:
+    monkeypatch.setattr(response_cache.time, "time", clock)
+    options = {"max_entries": 10, "ttl_seconds": 60, "db_path": None, "enabled": True}
+    options.update(kwargs)
+    return ResponseCache(**options)
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = Clock()
+    cache = _cache(monkeypatch, clock)
+    cache.set("key", {"category": "Sales"})
+
+    clock.now += 59
+    assert cache.get("key") == {"category": "Sales"}
+
+    clock.now += 2
+    assert cache.get("key") is None
+    assert cache.stats()["memory_entries"] == 0
+
+def test_lru_evicts_least_recently_used(monkeypatch):
+    cache = _cache(monkeypatch, Clock(), max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # Reading "a" makes "b" the least recently used entry
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_disk_tier_survives_a_new_instance(monkeypatch, tmp_path):
+    clock = Clock()
+    db_path = str(tmp_path / "cache.sqlite3")
+    _cache(monkeypatch, clock, db_path=db_path).set("key", ["a", 1])
+
+    reopened = _cache(monkeypatch, clock, db_path=db_path)
+    assert reopened.get("key") == ["a", 1]
+    assert reopened.stats()["disk_hits"] == 1
+
+    clock.now += 120
+    assert _cache(monkeypatch, clock, db_path=db_path).get("key") is None
+
+def test_disabled_cache_stores_nothing(monkeypatch):
+    cache = _cache(monkeypatch, Clock(), enabled=False)
+    cache.set("key", 1)
+
+    assert cache.get("key") is None
+
+def test_cache_key_ignores_whitespace_but_not_prompt_or_model():
+    key = make_cache_key("classification", ["Hi  there\n", "a@b.com"], "model-a", 0, "PROMPT")
+
+    assert key == make_cache_key("classification", ["Hi there", "a@b.com"], "model-a", 0, "PROMPT")
+    assert key != make_cache_key("classification", ["Hi there", "a@b.com"], "model-a", 0, "PROMPT v2")
+    assert key != make_cache_key("classification", ["Hi there", "a@b.com"], "model-b", 0, "PROMPT")
+    assert key != make_cache_key("priority", ["Hi there", "a@b.com"], "model-a", 0, "PROMPT")
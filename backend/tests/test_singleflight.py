@@ -0,0 +1,133 @@
+# tests/test_singleflight.py
+import time
+import asyncio
+import threading
+
+import pytest
+
+from singleflight import SingleFlight
+
+def test_concurrent_coroutines_share_one_call():
+    flight = SingleFlight(enabled=True)
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"category": "Sales"}
+
+    async def scenario():
+        return await asyncio.gather(*(flight.ado("key", work) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+
+    assert results == [{"category": "Sales"}] * 5
+    assert len(calls) == 1
+    stats = flight.stats()
+    assert (stats["executed_calls"], stats["coalesced_calls"], stats["in_flight"]) == (1, 4, 0)
+
+def test_different_keys_and_finished_calls_are_not_shared():
+    flight = SingleFlight(enabled=True)
+    calls = []
+
+    async def work():
+        calls.append(1)
+        return len(calls)
+
+    async def scenario():
+        first = await asyncio.gather(flight.ado("a", work), flight.ado("b", work))
+        # Nothing is kept once a call finishes
+        again = await flight.ado("a", work)
+        return first, again
+
+    assert asyncio.run(scenario()) == ([1, 2], 3)
+
+def test_error_reaches_every_waiting_coroutine():
+    flight = SingleFlight(enabled=True)
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    async def scenario():
+        return await asyncio.gather(*(flight.ado("key", work) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(scenario())
+
+    assert [str(error) for error in errors] == ["provider down"] * 3
+    assert flight.stats()["in_flight"] == 0
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    flight = SingleFlight(enabled=True)
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def scenario():
+        leaving = asyncio.ensure_future(flight.ado("key", work))
+        staying = asyncio.ensure_future(flight.ado("key", work))
+        await asyncio.sleep(0.005)
+        leaving.cancel()
+        return await staying
+
+    assert asyncio.run(scenario()) == "done"
+
+def test_blocking_callers_share_one_call():
+    flight = SingleFlight(enabled=True)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(1)
+        return "answer"
+
+    def caller():
+        results.append(flight.do("key", work))
+
+    leader = threading.Thread(target=caller)
+    leader.start()
+    started.wait(1)
+    followers = [threading.Thread(target=caller) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    deadline = time.monotonic() + 1
+    while flight.stats()["coalesced_calls"] < 3 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(1)
+
+    assert results == ["answer"] * 4
+    assert len(calls) == 1
+
+def test_blocking_error_is_raised_and_cleared():
+    flight = SingleFlight(enabled=True)
+
+    def work():
+        raise ValueError("bad reply")
+
+    with pytest.raises(ValueError):
+        flight.do("key", work)
+    assert flight.stats()["in_flight"] == 0
+
+def test_disabled_runs_every_call():
+    flight = SingleFlight(enabled=False)
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return 1
+
+    async def scenario():
+        await asyncio.gather(*(flight.ado("key", work) for _ in range(3)))
+
+    asyncio.run(scenario())
+
+    assert len(calls) == 3
+    assert flight.do("key", lambda: "direct") == "direct"
@@ -0,0 +1,112 @@
+# tests/test_thread_summarizer.py
+import asyncio
+
+import pytest
+
+import thread_summarizer
+from response_cache import ResponseCache
+from thread_summarizer import asummarize_thread, summarize_thread, summary_mode_stats
+
+def _thread(count: int, body: str = "Message {idx} about the launch plan.") -> str:
+    return "\n\n---\n".join(
+        f"From: Person {idx} <p{idx}@example.com>\nDate: Jan {idx + 1}, 2026\n{body.format(idx=idx)}"
+        for idx in range(count)
+    )
+
+@pytest.fixture
+def prompts(fake_llm, monkeypatch):
+    """Prompts sent to the model, with a fresh summary store and mode counters."""
+    monkeypatch.setattr(thread_summarizer, "summary_store", ResponseCache(db_path=None, enabled=True))
+    monkeypatch.setattr(thread_summarizer, "summary_mode_counts", {mode: 0 for mode in summary_mode_stats()})
+    sent = []
+    reply = fake_llm.reply
+
+    def recording(prompt):
+        sent.append(prompt)
+        return reply(prompt)
+
+    monkeypatch.setattr(fake_llm, "reply", recording)
+    return sent
+
+def test_unchanged_thread_is_served_from_the_store(prompts):
+    thread = _thread(3)
+
+    first = summarize_thread(thread)
+    second = summarize_thread(thread)
+
+    assert second == first
+    assert len(prompts) == 1
+    assert summary_mode_stats()["full"] == 1
+    assert summary_mode_stats()["cached"] == 1
+
+def test_appended_message_sends_only_previous_summary_and_new_message(prompts):
+    previous = summarize_thread(_thread(3))
+    prompts.clear()
+
+    asyncio.run(asummarize_thread(_thread(4)))
+
+    assert len(prompts) == 1
+    prompt = prompts[0]
+    assert prompt.lstrip().startswith("Below is the summary of an email thread so far")
+    assert previous in prompt
+    assert "Message 3 about the launch plan." in prompt
+    assert all(f"Message {idx} " not in prompt for idx in range(3))
+    assert summary_mode_stats()["incremental"] == 1
+
+def test_edited_message_is_summarized_in_full(prompts):
+    summarize_thread(_thread(3))
+    prompts.clear()
+
+    summarize_thread(_thread(3, body="Edited message {idx}."))
+
+    assert len(prompts) == 1
+    assert prompts[0].lstrip().startswith("Summarize the following email thread")
+
+def test_long_thread_is_chunked_on_message_boundaries_and_reduced(prompts, fake_llm, monkeypatch):
+    monkeypatch.setattr(thread_summarizer, "SUMMARY_TOKEN_BUDGET", 100)
+    # Partial summaries of 45 tokens: four of them need a second reduce round
+    # (two groups of two), whose two results then fit one final reduce
+    # (distinct, so identical concurrent calls are not coalesced)
+    monkeypatch.setattr(fake_llm, "reply", lambda prompt: prompts.append(prompt) or str(len(prompts)).rjust(180, "p"))
+    body = "Message {idx}: " + "we still need to agree on the rollout date and owners. " * 2
+    thread = _thread(8, body=body)
+    messages = thread_summarizer.parse_thread_messages(thread)
+
+    summarize_thread(thread)
+
+    openings = [prompt.lstrip().split("\n", 1)[0] for prompt in prompts]
+    chunk_prompts = [prompt for prompt, opening in zip(prompts, openings) if opening.startswith("This is part")]
+    reduce_prompts = [prompt for prompt, opening in zip(prompts, openings) if opening.startswith("The following")]
+    assert len(chunk_prompts) == 4
+    assert len(reduce_prompts) == 3
+    assert len(prompts) == 7
+    # Every message lands whole in exactly one chunk, in order (chunks run
+    # concurrently, so prompts are recorded in completion order)
+    for message in messages:
+        assert sum(message.raw in prompt for prompt in chunk_prompts) == 1
+    parts = {prompt.lstrip().split(" of ", 1)[0]: prompt for prompt in chunk_prompts}
+    assert messages[0].raw in parts["This is part 1"] and messages[-1].raw in parts["This is part 4"]
+    # The final prompt merges the two second-round summaries
+    assert prompts[-1].count("p" * 170) == 2
+    assert summary_mode_stats()["map_reduce"] == 1
+
+def test_reduce_groups_stop_when_summaries_fit_or_cannot_shrink(monkeypatch):
+    monkeypatch.setattr(thread_summarizer, "SUMMARY_TOKEN_BUDGET", 100)
+    small, medium, large = "s" * 40, "m" * 180, "l" * 360
+
+    assert thread_summarizer._reduce_groups([small, small]) is None
+    assert thread_summarizer._reduce_groups([large]) is None
+    # Each summary is over half the budget, so grouping would not shrink them
+    assert thread_summarizer._reduce_groups([large, large, large]) is None
+    assert thread_summarizer._reduce_groups([medium] * 4) == [[medium, medium], [medium, medium]]
+
+def test_oversized_single_message_is_split_on_lines(monkeypatch):
+    monkeypatch.setattr(thread_summarizer, "SUMMARY_TOKEN_BUDGET", 100)
+    line = "x" * 150 + "\n"
+    messages = thread_summarizer.parse_thread_messages(_thread(1, body=line * 6))
+
+    chunks = thread_summarizer._chunk_messages(messages)
+
+    assert len(chunks) > 1
+    assert all(thread_summarizer.estimate_tokens(chunk) <= 100 for chunk in chunks)
+    assert "".join(chunks) == messages[0].raw
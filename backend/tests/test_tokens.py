@@ -0,0 +1,28 @@
+# tests/test_tokens.py
+from tokens import CHARS_PER_TOKEN, estimate_tokens, pack_by_token_budget
+
+def test_estimate_tokens_rounds_up():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens(None) == 0
+    assert estimate_tokens("a") == 1
+    assert estimate_tokens("a" * CHARS_PER_TOKEN) == 1
+    assert estimate_tokens("a" * (CHARS_PER_TOKEN + 1)) == 2
+
+def test_pack_keeps_order_within_budget():
+    groups = pack_by_token_budget([3, 4, 2, 5, 1], cost=lambda item: item, budget=7)
+
+    assert groups == [[3, 4], [2, 5], [1]]
+    assert [item for group in groups for item in group] == [3, 4, 2, 5, 1]
+
+def test_pack_gives_oversized_item_its_own_group():
+    groups = pack_by_token_budget([2, 20, 2], cost=lambda item: item, budget=5)
+
+    assert groups == [[2], [20], [2]]
+
+def test_pack_respects_max_items():
+    groups = pack_by_token_budget(list(range(7)), cost=lambda item: 0, budget=100, max_items=3)
+
+    assert groups == [[0, 1, 2], [3, 4, 5], [6]]
+
+def test_pack_empty():
+    assert pack_by_token_budget([], cost=lambda item: 1, budget=10) == []
@@ -0,0 +1,373 @@
+# thread_summarizer.py
+import os
+import re
+import time
+import threading
+from collections import deque
+from pydantic import BaseModel
+from typing import AsyncIterator, List, Optional, Tuple
+from llm_provider import get_llm
+from response_cache import ResponseCache, hash_text, make_cache_key, normalize_text
+from concurrency import gather_bounded, map_bounded
+from tokens import estimate_tokens, pack_by_token_budget
+
+# Shared LLM view for thread summaries
+llm = get_llm(temperature=1, module="summary")
+
+# Summaries keyed by the messages they cover. In memory by default; set
+# SUMMARY_DB_PATH to keep them across restarts. Incremental summaries depend
+# on it, so it stays on when LLM_CACHE_ENABLED turns the response cache off.
+summary_store = ResponseCache(db_path=os.getenv("SUMMARY_DB_PATH"), enabled=True)
+
+# Largest thread (in estimated tokens) summarized with a single prompt;
+# anything bigger is chunked on message boundaries and map-reduced
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "6000"))
+
+# How each summary request was served: cached, incremental or full, plus
+# how many of them needed map-reduce
+_mode_lock = threading.Lock()
+summary_mode_counts = {"cached": 0, "incremental": 0, "full": 0, "map_reduce": 0}
+
+class ThreadMessage(BaseModel):
+    """One message of a thread in the DUMMY_THREADS format"""
+    sender: Optional[str] = None
+    recipient: Optional[str] = None
+    date: Optional[str] = None
+    body: str
+    raw: str
+
+# Messages are separated by a line containing only ---
+_MESSAGE_SEPARATOR = re.compile(r"^\s*-{3,}\s*$", re.MULTILINE)
+_HEADER = re.compile(r"^(From|To|Date):\s*(.*)$", re.IGNORECASE)
+
+SUMMARY_PROMPT = """
+Summarize the following email thread at the top level:
+- Highlight Decisions
+- Highlight Action Items
+- Highlight Open Questions
+
+Email Thread:
+{thread_content}
+"""
+
+INCREMENTAL_SUMMARY_PROMPT = """
+Below is the summary of an email thread so far, followed by new messages
+that were added to the thread. Update the summary to cover the whole thread:
+- Highlight Decisions
+- Highlight Action Items
+- Highlight Open Questions
+
+Resolve questions that the new messages answer and keep everything from the
+previous summary that is still relevant.
+
+Summary so far:
+{previous_summary}
+
+New messages:
+{new_messages}
+"""
+
+CHUNK_SUMMARY_PROMPT = """
+This is part {part} of {parts} of a long email thread. Summarize this part:
+- Highlight Decisions
+- Highlight Action Items (with owners and due dates when mentioned)
+- Highlight Open Questions
+
+Be concise and keep names and dates exactly as written.
+
+Email Thread (part {part} of {parts}):
+{chunk}
+"""
+
+REDUCE_SUMMARY_PROMPT = """
+The following are summaries of consecutive parts of one long email thread,
+in order. Merge them into a single top-level summary of the whole thread:
+- Highlight Decisions
+- Highlight Action Items
+- Highlight Open Questions
+
+Remove duplicates, and drop open questions that a later part answers.
+
+{previous_summary_section}Partial summaries:
+{partial_summaries}
+"""
+
+def parse_thread_messages(thread_content: str) -> List[ThreadMessage]:
+    """
+    Split a thread into messages on "---" lines and read the From/To/Date
+    headers at the top of each message.
+    """
+    messages = []
+    for block in _MESSAGE_SEPARATOR.split(thread_content):
+        raw = block.strip()
+        if not raw:
+            continue
+        headers = {}
+        lines = raw.splitlines()
+        while lines:
+            match = _HEADER.match(lines[0].strip())
+            if not match:
+                break
+            headers[match.group(1).lower()] = match.group(2).strip()
+            lines.pop(0)
+        messages.append(ThreadMessage(
+            sender=headers.get("from"),
+            recipient=headers.get("to"),
+            date=headers.get("date"),
+            body="\n".join(lines).strip(),
+            raw=raw
+        ))
+    return messages
+
+def _render_messages(messages: List[ThreadMessage]) -> str:
+    return "\n\n---\n".join(message.raw for message in messages)
+
+def _prefix_keys(messages: List[ThreadMessage]) -> List[str]:
+    """
+    Store key for every prefix of the thread: keys[k] covers messages[:k + 1].
+    Each key chains the previous one, so it identifies the exact sequence.
+    """
+    keys = []
+    chained = ""
+    for message in messages:
+        chained = hash_text(chained + hash_text(normalize_text(message.raw)))
+        keys.append(make_cache_key(
+            "thread-summary",
+            [chained],
+            llm.model_name,
+            llm.temperature,
+            SUMMARY_PROMPT + INCREMENTAL_SUMMARY_PROMPT + CHUNK_SUMMARY_PROMPT + REDUCE_SUMMARY_PROMPT
+        ))
+    return keys
+
+def _plan_summary(thread_content: str) -> Tuple[Optional[str], Optional[str], List[ThreadMessage], Optional[str]]:
+    """
+    Decide how much of the thread has to be sent to the model.
+    
+    Returns (cached_summary, previous_summary, new_messages, store_key):
+    cached_summary when the exact thread was summarized before; otherwise
+    the messages still to summarize, together with the stored summary of
+    the longest earlier prefix of the thread (if any).
+    """
+    messages = parse_thread_messages(thread_content)
+    if not messages:
+        return None, None, [], None
+    
+    keys = _prefix_keys(messages)
+    for covered in range(len(messages), 0, -1):
+        previous_summary = summary_store.get(keys[covered - 1])
+        if previous_summary is None:
+            continue
+        if covered == len(messages):
+            _count_mode("cached")
+            return previous_summary, None, [], keys[-1]
+        _count_mode("incremental")
+        return None, previous_summary, messages[covered:], keys[-1]
+    
+    _count_mode("full")
+    return None, None, messages, keys[-1]
+
+def _count_mode(mode: str):
+    with _mode_lock:
+        summary_mode_counts[mode] += 1
+
+def summary_mode_stats() -> dict:
+    with _mode_lock:
+        return dict(summary_mode_counts)
+
+def _remember_summary(store_key: Optional[str], summary: str):
+    if store_key is not None and summary:
+        summary_store.set(store_key, summary)
+
+def _fits_budget(previous_summary: Optional[str], thread_text: str) -> bool:
+    return estimate_tokens(thread_text) + estimate_tokens(previous_summary or "") <= SUMMARY_TOKEN_BUDGET
+
+def _direct_prompt(previous_summary: Optional[str], thread_text: str) -> str:
+    if previous_summary is None:
+        return SUMMARY_PROMPT.format(thread_content=thread_text)
+    return INCREMENTAL_SUMMARY_PROMPT.format(
+        previous_summary=previous_summary,
+        new_messages=thread_text
+    )
+
+def _split_oversized(text: str) -> List[str]:
+    """Split a single message that exceeds the budget on line boundaries."""
+    lines = text.splitlines(keepends=True)
+    groups = pack_by_token_budget(lines, estimate_tokens, SUMMARY_TOKEN_BUDGET)
+    return ["".join(group) for group in groups]
+
+def _chunk_messages(messages: List[ThreadMessage]) -> List[str]:
+    """Group whole messages into chunks that each fit SUMMARY_TOKEN_BUDGET."""
+    pieces = []
+    for message in messages:
+        if estimate_tokens(message.raw) > SUMMARY_TOKEN_BUDGET:
+            pieces.extend(_split_oversized(message.raw))
+        else:
+            pieces.append(message.raw)
+    groups = pack_by_token_budget(pieces, estimate_tokens, SUMMARY_TOKEN_BUDGET)
+    return ["\n\n---\n".join(group) for group in groups]
+
+def _chunk_prompts(messages: List[ThreadMessage]) -> List[str]:
+    chunks = _chunk_messages(messages)
+    return [
+        CHUNK_SUMMARY_PROMPT.format(part=idx + 1, parts=len(chunks), chunk=chunk)
+        for idx, chunk in enumerate(chunks)
+    ]
+
+def _reduce_groups(partial_summaries: List[str]) -> Optional[List[List[str]]]:
+    """
+    Group partial summaries for another reduce round when they do not fit
+    the budget together; None when a single final reduce is enough (or no
+    further shrinking is possible).
+    """
+    if len(partial_summaries) <= 1 or estimate_tokens("\n\n".join(partial_summaries)) <= SUMMARY_TOKEN_BUDGET:
+        return None
+    groups = pack_by_token_budget(partial_summaries, estimate_tokens, SUMMARY_TOKEN_BUDGET)
+    return groups if len(groups) < len(partial_summaries) else None
+
+def _reduce_prompt(previous_summary: Optional[str], partial_summaries: List[str]) -> str:
+    previous_section = (
+        f"Summary of the earlier part of the thread:\n{previous_summary}\n\n"
+        if previous_summary else ""
+    )
+    return REDUCE_SUMMARY_PROMPT.format(
+        previous_summary_section=previous_section,
+        partial_summaries="\n\n=====\n\n".join(partial_summaries)
+    )
+
+def _prepare_prompt(previous_summary: Optional[str], messages: List[ThreadMessage], thread_content: str) -> str:
+    """
+    Return the final prompt to send. Threads over SUMMARY_TOKEN_BUDGET are
+    first summarized chunk by chunk in parallel (map); the returned prompt
+    then merges the partial summaries (reduce).
+    """
+    thread_text = _render_messages(messages) if messages else thread_content
+    if _fits_budget(previous_summary, thread_text):
+        return _direct_prompt(previous_summary, thread_text)
+    
+    _count_mode("map_reduce")
+    partials = [r.content for r in map_bounded(llm.invoke, _chunk_prompts(messages))]
+    groups = _reduce_groups(partials)
+    while groups:
+        partials = [r.content for r in map_bounded(llm.invoke, [_reduce_prompt(None, g) for g in groups])]
+        groups = _reduce_groups(partials)
+    return _reduce_prompt(previous_summary, partials)
+
+async def _aprepare_prompt(previous_summary: Optional[str], messages: List[ThreadMessage], thread_content: str) -> str:
+    """
+    Async version of _prepare_prompt.
+    """
+    thread_text = _render_messages(messages) if messages else thread_content
+    if _fits_budget(previous_summary, thread_text):
+        return _direct_prompt(previous_summary, thread_text)
+    
+    _count_mode("map_reduce")
+    partials = [r.content for r in await gather_bounded(llm.ainvoke, _chunk_prompts(messages))]
+    groups = _reduce_groups(partials)
+    while groups:
+        partials = [r.content for r in await gather_bounded(llm.ainvoke, [_reduce_prompt(None, g) for g in groups])]
+        groups = _reduce_groups(partials)
+    return _reduce_prompt(previous_summary, partials)
+
+def summarize_thread(thread_content: str) -> str:
+    """
+    Summarize an email thread (decisions, action items, open questions).
+    
+    Summaries are stored per message prefix: an unchanged thread is served
+    from the store, and a thread with new messages appended sends only the
+    previous summary plus the new messages. Anything larger than
+    SUMMARY_TOKEN_BUDGET is summarized with map-reduce.
+    """
+    cached_summary, previous_summary, messages, store_key = _plan_summary(thread_content)
+    if cached_summary is not None:
+        return cached_summary
+    
+    prompt = _prepare_prompt(previous_summary, messages, thread_content)
+    response = llm.invoke(prompt)
+    _remember_summary(store_key, response.content)
+    return response.content
+
+async def asummarize_thread(thread_content: str) -> str:
+    """
+    Async version of summarize_thread built on ainvoke.
+    """
+    cached_summary, previous_summary, messages, store_key = _plan_summary(thread_content)
+    if cached_summary is not None:
+        return cached_summary
+    
+    prompt = await _aprepare_prompt(previous_summary, messages, thread_content)
+    response = await llm.ainvoke(prompt)
+    _remember_summary(store_key, response.content)
+    return response.content
+
+class StreamTimings:
+    """Rolling time-to-first-token and total-duration samples for streamed summaries."""
+
+    def __init__(self, max_samples: int = 1000):
+        self._lock = threading.Lock()
+        self.ttft_ms = deque(maxlen=max_samples)
+        self.total_ms = deque(maxlen=max_samples)
+        self.streams = 0
+
+    def record(self, ttft_ms: float, total_ms: float):
+        with self._lock:
+            self.streams += 1
+            self.ttft_ms.append(ttft_ms)
+            self.total_ms.append(total_ms)
+
+    @staticmethod
+    def _percentile(samples: list, pct: float) -> float:
+        if not samples:
+            return 0.0
+        ordered = sorted(samples)
+        return round(ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))], 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            ttft, total = list(self.ttft_ms), list(self.total_ms)
+            return {
+                "streams": self.streams,
+                "ttft_p50_ms": self._percentile(ttft, 50),
+                "ttft_p95_ms": self._percentile(ttft, 95),
+                "total_p50_ms": self._percentile(total, 50),
+                "total_p95_ms": self._percentile(total, 95),
+            }
+
+stream_timings = StreamTimings()
+
+async def astream_summary(thread_content: str) -> AsyncIterator[dict]:
+    """
+    Stream a thread summary as it is generated.
+
+    Yields {"type": "token", "text": ...} for every chunk from the model,
+    then a final {"type": "done", "ttft_ms": ..., "total_ms": ...}.
+    Time to first token is measured from the request to the first
+    non-empty chunk.
+    """
+    start = time.perf_counter()
+    ttft_ms = None
+    cached_summary, previous_summary, messages, store_key = _plan_summary(thread_content)
+
+    if cached_summary is not None:
+        ttft_ms = (time.perf_counter() - start) * 1000
+        yield {"type": "token", "text": cached_summary}
+    else:
+        # For oversized threads the map step runs first; only the final
+        # reduce is streamed
+        prompt = await _aprepare_prompt(previous_summary, messages, thread_content)
+        parts = []
+        async for chunk in llm.astream(prompt):
+            text = chunk.content
+            if not text:
+                continue
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - start) * 1000
+            parts.append(text)
+            yield {"type": "token", "text": text}
+        _remember_summary(store_key, "".join(parts))
+
+    total_ms = (time.perf_counter() - start) * 1000
+    if ttft_ms is None:
+        ttft_ms = total_ms
+    stream_timings.record(ttft_ms, total_ms)
+    yield {"type": "done", "ttft_ms": round(ttft_ms, 1), "total_ms": round(total_ms, 1)}
@@ -0,0 +1,44 @@
+# tokens.py
+import math
+from typing import Any, Callable, List, Optional
+
+# Rough characters-per-token ratio for English email text. Good enough to
+# size prompts locally without a tokenizer download or a network call.
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of model tokens in text."""
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def pack_by_token_budget(
+    items: List[Any],
+    cost: Callable[[Any], int],
+    budget: int,
+    max_items: Optional[int] = None
+) -> List[List[Any]]:
+    """
+    Split items into consecutive groups whose summed cost stays within budget.
+
+    An item that is larger than the budget on its own gets a group to itself
+    rather than being dropped. Order is preserved.
+    """
+    groups = []
+    current = []
+    current_cost = 0
+
+    for item in items:
+        item_cost = cost(item)
+        full = max_items is not None and len(current) >= max_items
+        if current and (full or current_cost + item_cost > budget):
+            groups.append(current)
+            current = []
+            current_cost = 0
+        current.append(item)
+        current_cost += item_cost
+
+    if current:
+        groups.append(current)
+
+    return groups